@@ -1,19 +1,43 @@
 import apiAxios from '@/axios'
+import type { AxiosResponse } from 'axios'
+
+export type CatalogueResource = 'catalogue' | 'constraints' | 'pricing_rules'
+
+// Catalogue version a payload was built from, as announced on /catalogue/events.
+export function catalogue_version_of(response: AxiosResponse): string | undefined {
+  return response.headers['x-catalogue-version'] ?? undefined
+}
 
 export async function get_full_catalogue() {
   const response = await apiAxios.get('/catalogue/full')
 
-  return response.data || []
+  return { data: response.data || [], version: catalogue_version_of(response) }
 }
 
 export async function get_constraints() {
   const response = await apiAxios.get('/catalogue/constraints')
 
-  return response.data || {}
+  return { data: response.data || {}, version: catalogue_version_of(response) }
 }
 
 export async function get_pricing_rules() {
   const response = await apiAxios.get('/catalogue/pricing_rules')
 
-  return response.data || {}
+  return { data: response.data || {}, version: catalogue_version_of(response) }
+}
+
+export interface CatalogueChange {
+  version: string
+  revision: number
+  changed: CatalogueResource[] | null
+}
+
+export function subscribe_to_catalogue_changes(onChange: (change: CatalogueChange) => void) {
+  const source = new EventSource(`${import.meta.env.VITE_BASE_URL}/catalogue/events`, { withCredentials: true })
+
+  source.addEventListener('catalogue', (event) => {
+    onChange(JSON.parse((event as MessageEvent).data))
+  })
+
+  return () => source.close()
 }
@@ -1,7 +1,13 @@
 import { ref, computed, watch } from 'vue'
 import { defineStore } from 'pinia'
 import type { BikeComponent, PricingRule, Selector } from '@/types'
-import { get_full_catalogue, get_constraints, get_pricing_rules } from '@/api/catalogue_api'
+import {
+  get_full_catalogue,
+  get_constraints,
+  get_pricing_rules,
+  subscribe_to_catalogue_changes,
+} from '@/api/catalogue_api'
+import type { CatalogueChange, CatalogueResource } from '@/api/catalogue_api'
 
 type SelectionMap = Record<string, BikeComponent | undefined>
 
@@ -9,6 +15,9 @@ export const useCatalogueStore = defineStore('catalogue', () => {
   const catalogue = ref<Record<string, BikeComponent[]>>({})
   const constraints = ref<Record<string, Record<string, string[]>>>({})
   const pricingRules = ref<PricingRule[]>([])
+  // Catalogue version each payload was fetched at, and the latest one announced.
+  const loadedVersions = ref<Partial<Record<CatalogueResource, string>>>({})
+  const catalogueVersion = ref<string | undefined>(undefined)
 
   const selectedComponents = ref<SelectionMap>({
     frame_type: undefined,
@@ -20,16 +29,18 @@ export const useCatalogueStore = defineStore('catalogue', () => {
 
   async function fetchCatalogue() {
     try {
-      const data = await get_full_catalogue()
+      const { data, version } = await get_full_catalogue()
       catalogue.value = data
+      loadedVersions.value.catalogue = version
     } catch (error) {
       console.error(error)
     }
   }
 
   async function fetchConstraints() {
-    const response = await get_constraints()
-    constraints.value = response
+    const { data, version } = await get_constraints()
+    constraints.value = data
+    loadedVersions.value.constraints = version
   }
 
   function setSelectedComponent(category: keyof SelectionMap, component: BikeComponent) {
@@ -76,8 +87,39 @@ export const useCatalogueStore = defineStore('catalogue', () => {
   })
 
   async function fetchPricingRules() {
-    const response = await get_pricing_rules()
-    pricingRules.value = response
+    const { data, version } = await get_pricing_rules()
+    pricingRules.value = data
+    loadedVersions.value.pricing_rules = version
+  }
+
+  const fetchers: Record<CatalogueResource, () => Promise<void>> = {
+    catalogue: fetchCatalogue,
+    constraints: fetchConstraints,
+    pricing_rules: fetchPricingRules,
+  }
+
+  async function refreshOnChange(change: CatalogueChange) {
+    // Payloads are compared by the version they were fetched at, so a change
+    // made before the stream connected is caught by its first event, which
+    // only carries the version. A payload the event reports unchanged since
+    // the version it was fetched at is kept.
+    const previous = catalogueVersion.value
+    catalogueVersion.value = change.version
+
+    for (const resource of Object.keys(fetchers) as CatalogueResource[]) {
+      const loaded = loadedVersions.value[resource]
+      if (loaded === undefined || loaded === change.version) continue
+
+      if (change.changed !== null && !change.changed.includes(resource) && loaded === previous) {
+        loadedVersions.value[resource] = change.version
+      } else {
+        await fetchers[resource]()
+      }
+    }
+  }
+
+  function watchCatalogueChanges() {
+    return subscribe_to_catalogue_changes(refreshOnChange)
   }
 
   const getComponentPrice = computed(() => (component: BikeComponent) => {
@@ -96,7 +138,7 @@ export const useCatalogueStore = defineStore('catalogue', () => {
       if (activeRule.effect.type === 'FIXED_PRICE') {
         return activeRule.effect.value
       }
-      if (activeRule.effect.type === 'PERCENTAGE_DISCOUNT') {
+      if (activeRule.effect.type === 'PERCENT_OFF') {
         return component.price * (1 - activeRule.effect.value / 100)
       }
     }
@@ -137,5 +179,6 @@ export const useCatalogueStore = defineStore('catalogue', () => {
     fetchConstraints,
     setSelectedComponent,
     fetchPricingRules,
+    watchCatalogueChanges,
   }
 })
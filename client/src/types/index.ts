@@ -20,7 +20,7 @@ export interface Selector {
 }
 
 export interface Effect {
-  type: 'FIXED_PRICE' | 'PERCENTAGE_DISCOUNT'
+  type: 'FIXED_PRICE' | 'PERCENT_OFF'
   target_category: string
   target_id: string
   value: number
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+from server.services.catalogue_events import CatalogueEventBroadcaster
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.storage.json_store import DATA_PATH, PRICING_RULES_FILE
+
+class EventStreamClient:
+    # Drives /catalogue/events through the ASGI interface directly, so
+    # thousands of streams fit in one process without sockets.
+
+    def __init__(self, app):
+        self.app = app
+        self.events: List[float] = []
+        self.started = asyncio.Event()
+        self.disconnect = asyncio.Event()
+        self.status = None
+        self._request_sent = False
+
+    async def receive(self) -> Dict:
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: Dict) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body":
+            arrived = time.perf_counter()
+            self.events.extend(arrived for _ in range(message.get("body", b"").count(b"event: catalogue")))
+            self.started.set()
+
+    async def run(self) -> None:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/catalogue/events", "raw_path": b"/catalogue/events", "query_string": b"",
+            "root_path": "", "headers": [(b"host", b"loadtest"), (b"accept", b"text/event-stream")],
+            "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+        }
+        await self.app(scope, self.receive, self.send)
+        self.started.set()
+
+def percentile(samples: List[float], fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def touch_pricing_rules(data_path: Path, number: int) -> None:
+    file_path = data_path / PRICING_RULES_FILE
+    rules = json.loads(file_path.read_text())
+    rules.append({
+        "rule_id": f"LOAD{number:04d}",
+        "selectors": [{"category": "frame_type", "id": "T-DIAMOND"}],
+        "effect": {"target_category": "chain", "type": "AMOUNT_OFF", "value": 1},
+    })
+    file_path.write_text(json.dumps(rules))
+
+async def run_load_test(connections: int, changes: int) -> Dict[str, float]:
+    from server.controllers import api_configurator
+    from server.main import app
+
+    data_path = Path(tempfile.mkdtemp())
+    for source in DATA_PATH.glob("*.json"):
+        shutil.copy(source, data_path / source.name)
+
+    # The app serves a scratch copy of the catalogue through a provider and
+    # broadcaster of its own, so the load test can edit it freely.
+    original = api_configurator.catalogue_provider, api_configurator.catalogue_events
+    provider = CatalogueProvider(data_path=data_path, check_interval=3600)
+    broadcaster = CatalogueEventBroadcaster(max_subscribers=connections)
+    provider.subscribe(broadcaster.publish)
+    api_configurator.catalogue_provider, api_configurator.catalogue_events = provider, broadcaster
+    provider.get_snapshot()
+
+    clients = [EventStreamClient(app) for _ in range(connections)]
+    tasks = []
+    results: Dict[str, float] = {"connections": connections}
+
+    try:
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        opened = time.perf_counter()
+        for client in clients:
+            tasks.append(asyncio.create_task(client.run()))
+        for client in clients:
+            await client.started.wait()
+        results["open_seconds"] = time.perf_counter() - opened
+        results["bytes_per_connection"] = (tracemalloc.get_traced_memory()[0] - memory_before) / connections
+        tracemalloc.stop()
+
+        if any(client.status != 200 for client in clients):
+            raise RuntimeError("Not every stream was accepted.")
+
+        fan_out: List[float] = []
+        for number in range(changes):
+            touch_pricing_rules(data_path, number)
+            published = time.perf_counter()
+            provider.reload()
+
+            while any(len(client.events) < number + 2 for client in clients):
+                await asyncio.sleep(0.001)
+            fan_out.extend(client.events[number + 1] - published for client in clients)
+
+        results["fan_out_p50_ms"] = percentile(fan_out, 0.5) * 1000
+        results["fan_out_p99_ms"] = percentile(fan_out, 0.99) * 1000
+        results["fan_out_max_ms"] = max(fan_out) * 1000
+    finally:
+        for client in clients:
+            client.disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        results["open_after_disconnect"] = broadcaster.subscribers
+        api_configurator.catalogue_provider, api_configurator.catalogue_events = original
+        shutil.rmtree(data_path)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Hold many idle /catalogue/events streams and time how fast a change reaches all of them.")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=5)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load_test(args.connections, args.changes))
+    print(f"{results['connections']} streams opened in {results['open_seconds']:.2f}s, {results['bytes_per_connection'] / 1024:.1f} KiB each")
+    print(f"Change fan-out: p50 {results['fan_out_p50_ms']:.1f}ms, p99 {results['fan_out_p99_ms']:.1f}ms, max {results['fan_out_max_ms']:.1f}ms")
+    print(f"Streams still open after disconnect: {results['open_after_disconnect']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict
+from server.components.abc_components import BikeComponent
+
+CATEGORIES = ["frame_type", "frame_finish", "wheels", "rim_color", "chain"]
+
+@dataclass
+class LegacyBikeComponent:
+    id: str
+    name: str
+    
+    category: str
+    price: float = 0.00
+
+def legacy_from_record(item: Dict) -> LegacyBikeComponent:
+    # Mirrors the previous model: a __dict__ per instance, category strings as
+    # parsed, and any extra catalogue keys set as instance attributes.
+    component = LegacyBikeComponent(id=item["id"], name=item["name"], category=item["category"], price=item["price"])
+    for key, value in item.items():
+        if key not in ("id", "name", "category", "price"):
+            setattr(component, key, value)
+    return component
+
+def synthetic_catalogue(items: int, extras_ratio: float, seed: int = 42) -> bytes:
+    rng = random.Random(seed)
+    records = []
+
+    for index in range(items):
+        category = CATEGORIES[index % len(CATEGORIES)]
+        record = {
+            "id": f"SKU-{index:07d}",
+            "category": category,
+            "name": f"Component {index}",
+            "price": round(rng.uniform(5, 500), 2),
+        }
+        if rng.random() < extras_ratio:
+            record["weight_g"] = rng.randint(100, 5000)
+        records.append(record)
+
+    return json.dumps(records).encode()
+
+def measure(catalogue: bytes, build: Callable[[Dict], object]) -> float:
+    # Counts what stays alive once the parsed JSON is dropped, the way the
+    # gateway keeps only the component objects, including their strings.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    components = [build(record) for record in json.loads(catalogue)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    # The list holding the components is not part of the per-component cost.
+    list_overhead = sys.getsizeof(components)
+    return (after - before - list_overhead) / len(components)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per component for the legacy and slotted catalogue models.")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--extras-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    catalogue = synthetic_catalogue(args.items, args.extras_ratio)
+    legacy = measure(catalogue, legacy_from_record)
+    slotted = measure(catalogue, BikeComponent.from_record)
+
+    print(f"components:      {args.items}")
+    print(f"legacy model:    {legacy:8.1f} bytes/component")
+    print(f"slotted model:   {slotted:8.1f} bytes/component")
+    print(f"saving:          {100 * (1 - slotted / legacy):8.1f} %")
+
+if __name__ == "__main__":
+    main()
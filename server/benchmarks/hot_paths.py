@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+import httpx
+from server.benchmarks.synthetic import SCALES, Scale, StaticCatalogueStore, random_selections, synthetic_source
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.catalogue_provider import CatalogueProvider
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+SELECTION_POOL = 512
+
+Result = Dict[str, float]
+
+def summarize(samples: List[int], elapsed: float) -> Result:
+    samples = sorted(samples)
+    return {
+        "calls": len(samples),
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[min(len(samples) - 1, len(samples) * 99 // 100)] / 1000,
+    }
+
+async def measure(call: Callable[[int], Awaitable], iterations: int, warmup: int) -> Result:
+    # Every call is timed on its own for the percentiles; throughput is the
+    # number of calls over the wall time of the whole loop.
+    for index in range(warmup):
+        await call(index)
+
+    samples = []
+    gc.collect()
+    started = time.perf_counter()
+
+    for index in range(iterations):
+        call_started = time.perf_counter_ns()
+        await call(index)
+        samples.append(time.perf_counter_ns() - call_started)
+
+    return summarize(samples, time.perf_counter() - started)
+
+async def bench_scale(scale: Scale, iterations: int, warmup: int) -> Dict[str, Result]:
+    store = StaticCatalogueStore(synthetic_source(scale))
+    results: Dict[str, Result] = {}
+
+    async def build(_):
+        CatalogueGateway(store=store)
+    results["gateway_build"] = await measure(build, max(3, iterations // 1000), 1)
+
+    gateway = CatalogueGateway(store=store)
+    selections = random_selections(gateway.components_by_category, SELECTION_POOL)
+    component_selections = [{category: gateway.components_by_id[cid] for category, cid in selection.items()} for selection in selections]
+    component_lists = [list(selection.values()) for selection in component_selections]
+    applicator = gateway.pricing_rule_applicator
+
+    async def check_compatibility(index):
+        await gateway.check_compatibility_of_selection(component_selections[index % SELECTION_POOL])
+
+    async def apply_rules(index):
+        applicator.apply_rules(component_lists[index % SELECTION_POOL])
+
+    async def get_constraints(_):
+        await gateway.get_compatibility_constraints()
+
+    async def build_constraints(_):
+        gateway._build_compatibility_constraints()
+
+    async def id_to_category_map(_):
+        await gateway.build_id_to_category_map()
+
+    results["check_compatibility_of_selection"] = await measure(check_compatibility, iterations, warmup)
+    results["apply_rules"] = await measure(apply_rules, iterations, warmup)
+    results["get_compatibility_constraints"] = await measure(get_constraints, iterations, warmup)
+    results["build_compatibility_constraints"] = await measure(build_constraints, max(3, iterations // 100), 1)
+    results["build_id_to_category_map"] = await measure(id_to_category_map, iterations, warmup)
+
+    results["price_check"] = await bench_price_check(store, selections, iterations, warmup)
+
+    return results
+
+async def bench_price_check(store: StaticCatalogueStore, selections: List[Dict[str, str]], iterations: int, warmup: int) -> Result:
+    from server.controllers import api_configurator
+    from server.main import app
+
+    # The app serves the synthetic catalogue through its usual provider. The
+    # quote cache is switched off for the services built on it: the selection
+    # pool is smaller than warmup plus iterations, so with it every later
+    # call would time a cache hit instead of a quote.
+    original_provider, original_cache = api_configurator.catalogue_provider, api_configurator.quote_cache
+    api_configurator.catalogue_provider = CatalogueProvider(check_interval=3600, store=store)
+    api_configurator.quote_cache = None
+
+    bodies = [{"component_ids": list(selection.values()), "client_total": 0} for selection in selections]
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def price_check(index):
+                response = await client.post("/price/check", json=bodies[index % len(bodies)])
+                response.raise_for_status()
+
+            return await measure(price_check, max(1, iterations // 4), warmup)
+    finally:
+        api_configurator.catalogue_provider, api_configurator.quote_cache = original_provider, original_cache
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[str]:
+    # p99 is reported but too noisy to gate on; p50 and throughput are.
+    regressions = []
+
+    for case, result in results.items():
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        if result["p50_us"] > reference["p50_us"] * (1 + tolerance):
+            regressions.append(f"{case}: p50 {result['p50_us']:.1f}us vs baseline {reference['p50_us']:.1f}us")
+        if result["ops_per_sec"] < reference["ops_per_sec"] / (1 + tolerance):
+            regressions.append(f"{case}: {result['ops_per_sec']:.0f} ops/s vs baseline {reference['ops_per_sec']:.0f} ops/s")
+
+    return regressions
+
+def print_results(results: Dict[str, Result], baseline: Dict[str, Result]) -> None:
+    print(f"{'case':<60} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'p50 vs base':>12}")
+    for case, result in results.items():
+        reference = baseline.get(case)
+        delta = f"{100 * (result['p50_us'] / reference['p50_us'] - 1):+.1f}%" if reference and reference["p50_us"] else "-"
+        print(f"{case:<60} {result['ops_per_sec']:>12.0f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {delta:>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and p50/p99 latency of the configurator and pricing hot paths.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 3], choices=sorted(SCALES))
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before the run fails (0.25 = 25%%)")
+    parser.add_argument("--allow-missing-baseline", action="store_true", help="report instead of failing when there is no baseline")
+    args = parser.parse_args()
+
+    results: Dict[str, Result] = {}
+    for scale_number in args.scales:
+        scale = SCALES[scale_number]
+        print(f"scale {scale_number}: {scale.label()}")
+        for case, result in asyncio.run(bench_scale(scale, args.iterations, args.warmup)).items():
+            results[f"{case}@{scale.label()}"] = result
+
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": {**baseline, **results},
+        }, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    # A gate that silently passes without a baseline gates nothing.
+    if not baseline:
+        print(f"ERROR: No baseline at {args.baseline}; run with --save-baseline to record one.")
+        if not args.allow_missing_baseline:
+            sys.exit(1)
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline.")
+
+if __name__ == "__main__":
+    main()
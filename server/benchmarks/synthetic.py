@@ -0,0 +1,97 @@
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Dict, List
+from server.services.storage import CatalogueSource, CatalogueStore
+
+PRICING_EFFECTS = ("FIXED_PRICE", "PERCENT_OFF", "AMOUNT_OFF", "COMBO_PRICE")
+
+@dataclass(frozen=True)
+class Scale:
+    skus: int
+    categories: int
+    rules: int
+
+    def label(self) -> str:
+        return f"{self.skus}sku-{self.categories}cat-{self.rules}rules"
+
+# Each step multiplies SKUs and rules by ten, and categories every other step.
+SCALES: Dict[int, Scale] = {
+    1: Scale(skus=100, categories=10, rules=10),
+    2: Scale(skus=1_000, categories=10, rules=100),
+    3: Scale(skus=10_000, categories=100, rules=1_000),
+    4: Scale(skus=100_000, categories=100, rules=10_000),
+}
+
+class StaticCatalogueStore(CatalogueStore):
+    # Serves a catalogue generated in memory, so benchmarks never touch disk.
+
+    def __init__(self, source: CatalogueSource):
+        self.source = source
+
+    def source_stamp(self):
+        return self.source.version
+
+    def read_sources(self) -> CatalogueSource:
+        return self.source
+
+def synthetic_source(scale: Scale, seed: int = 42) -> CatalogueSource:
+    rng = random.Random(seed)
+    categories = [f"category_{index:03d}" for index in range(scale.categories)]
+
+    components = [
+        {
+            "id": f"{categories[index % scale.categories]}-{index // scale.categories:06d}",
+            "category": categories[index % scale.categories],
+            "name": f"Component {index}",
+            "price": round(rng.uniform(5, 500), 2),
+        }
+        for index in range(scale.skus)
+    ]
+    ids_by_category: Dict[str, List[str]] = {}
+    for component in components:
+        ids_by_category.setdefault(component["category"], []).append(component["id"])
+
+    compatibility_rules = []
+    for number in range(scale.rules):
+        selector_category, affects_category = rng.sample(categories, 2)
+        affected_ids = ids_by_category[affects_category]
+        kind = rng.choice(("include", "exclude"))
+        # Includes keep most of the category so random selections stay
+        # mostly valid; excludes name a few components.
+        size = max(1, len(affected_ids) * 3 // 4) if kind == "include" else min(len(affected_ids), 2)
+        compatibility_rules.append({
+            "rule_id": f"R{number:05d}",
+            "affects_category": affects_category,
+            "conditions": [{
+                "selector": {"category": selector_category, "id": rng.choice(ids_by_category[selector_category])},
+                "result_set": {affects_category: {kind: rng.sample(affected_ids, size)}},
+            }],
+        })
+
+    pricing_rules = []
+    for number in range(scale.rules):
+        effect_type = rng.choice(PRICING_EFFECTS)
+        selector_categories = rng.sample(categories, rng.choice((1, 2)))
+        effect = {"type": effect_type, "value": rng.choice((5, 10, 25, 50))}
+        if effect_type != "COMBO_PRICE":
+            effect["target_category"] = rng.choice(selector_categories)
+        pricing_rules.append({
+            "rule_id": f"P{number:05d}",
+            "selectors": [{"category": category, "id": rng.choice(ids_by_category[category])} for category in selector_categories],
+            "effect": effect,
+        })
+
+    return CatalogueSource(
+        version=hashlib.sha256(f"synthetic:{scale.label()}:{seed}".encode()).hexdigest()[:16],
+        components=components,
+        compatibility_rules=compatibility_rules,
+        pricing_rules=pricing_rules,
+    )
+
+def random_selections(components_by_category: Dict[str, list], count: int, seed: int = 7) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [
+        {category: rng.choice(components).id for category, components in components_by_category.items()}
+        for _ in range(count)
+    ]
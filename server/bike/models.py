@@ -1,17 +1,30 @@
-from typing import List
+from types import MappingProxyType
+from typing import Mapping, Tuple
 from server.components.abc_components import BikeComponent
 from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(frozen=True)
 class Bike:
-    frame_type: BikeComponent
-    frame_finish: BikeComponent
-    wheels: BikeComponent
-    chain: BikeComponent
-    rim_color: BikeComponent
+    # One component per catalogue category, keyed by category name and kept
+    # in catalogue order, so new categories need no change here.
+    #
+    # Quoted bikes are shared by every request that hits the quote cache, so
+    # they are immutable: the components are a read-only view of the dict the
+    # bike was built with, which the bike takes over, and errors are a tuple.
+    components: Mapping[str, BikeComponent] = field(default_factory=dict)
 
     is_valid: bool = True
     price: float = 0.00 
-    compatibility_errors: List[str] = field(default_factory=list)
-        
-    
\ No newline at end of file
+    compatibility_errors: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if not isinstance(self.components, MappingProxyType):
+            object.__setattr__(self, "components", MappingProxyType(self.components))
+        if not isinstance(self.compatibility_errors, tuple):
+            object.__setattr__(self, "compatibility_errors", tuple(self.compatibility_errors))
+
+    def __getattr__(self, name: str) -> BikeComponent:
+        # Keeps bike.frame_type style access working for every category.
+        if name != "components" and name in self.components:
+            return self.components[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
@@ -1,10 +1,44 @@
+import sys
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
 
-@dataclass
+CORE_FIELDS = ("id", "name", "category", "price")
+
+@dataclass(frozen=True, slots=True)
 class BikeComponent(ABC):
     id: str
     name: str
     
     category: str
-    price: float = 0.00
\ No newline at end of file
+    price: float = 0.00
+
+    # Catalogue attributes beyond the core fields. Most components have none,
+    # so this stays None instead of costing an empty dict per component.
+    extras: Optional[Mapping[str, Any]] = field(default=None, repr=False, hash=False)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            extras = object.__getattribute__(self, "extras")
+        except AttributeError:
+            extras = None
+        if extras and name in extras:
+            return extras[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @classmethod
+    def from_record(cls, item: Dict[str, Any]) -> "BikeComponent":
+        extras = {k: v for k, v in item.items() if k not in CORE_FIELDS}
+        return cls(
+            id=item["id"],
+            name=item["name"],
+            category=sys.intern(item["category"]),
+            price=item["price"],
+            extras=extras or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"id": self.id, "name": self.name, "category": self.category, "price": self.price}
+        if self.extras:
+            data.update(self.extras)
+        return data
@@ -1,18 +1,18 @@
 from server.components.abc_components import BikeComponent
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FrameFinish(BikeComponent):
     id: str
     name: str
     
-    price: float
+    price: float = 0.00
     category: str= "frame_finish"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FrameType(BikeComponent):
     id: str
     name: str
     
-    price: float
+    price: float = 0.00
     category: str= "frame_type"
\ No newline at end of file
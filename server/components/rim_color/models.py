@@ -1,10 +1,10 @@
 from server.components.abc_components import BikeComponent
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Rim(BikeComponent):
     id:str
     name: str
     
-    price: float
+    price: float = 0.00
     category: str = "rim_color"
\ No newline at end of file
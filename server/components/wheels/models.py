@@ -1,10 +1,10 @@
 from server.components.abc_components import BikeComponent
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Wheel(BikeComponent):
     id:str
     name: str
     
-    price: float
+    price: float = 0.00
     category: str = "wheels"
\ No newline at end of file
@@ -1,86 +1,360 @@
-from fastapi import APIRouter, Depends
-from typing import Dict, Union, Annotated, List
-from collections import defaultdict
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import AsyncIterator, Dict, Iterator, Optional, Union, Annotated, List
+import asyncio
+import json
+import os
+import tempfile
+from hmac import compare_digest
+from pathlib import Path
+from weakref import WeakKeyDictionary
+from server.controllers.payload_response import payload_response
+from server.services.catalogue_events import CatalogueEventBroadcaster, SubscriberLimitReached, SubscriberSlot
 from server.services.catalogue_gateway import CatalogueGateway
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.encoded_payload import encode_json
+from server.services.metrics import metrics
+from server.services.profiler import RequestProfiler
+from server.services.storage import open_catalogue_store
+from server.services.quote_cache import QuoteCache
 from server.services.pricing.price_strategy import StandardPricingStrategy
 from server.services.pricing.price_calculator import PriceCalculator
 from server.services.pricing.pricing_rule_applicator import PricingRuleApplicator
+from server.services.pricing.price_table import open_price_table
 from server.services.bike_configurator import BikeConfiguratorService
+from server.services.step_options import StepOptionsService
 
 router = APIRouter()
 
+catalogue_store = open_catalogue_store(
+  os.getenv("CATALOGUE_BACKEND", "json"),
+  db_path=os.getenv("CATALOGUE_DB_PATH"),
+  snapshot_path=os.getenv("CATALOGUE_SNAPSHOT_PATH")
+)
+catalogue_provider = CatalogueProvider(check_interval=float(os.getenv("CATALOGUE_CHECK_INTERVAL", "1.0")), store=catalogue_store)
+
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "10000"))
+quote_cache = QuoteCache(maxsize=QUOTE_CACHE_SIZE, ttl=float(os.getenv("QUOTE_CACHE_TTL", "300"))) if QUOTE_CACHE_SIZE > 0 else None
+
+def invalidate_quotes(snapshot: CatalogueGateway) -> None:
+  # Rule-only edits keep every quote that holds none of the affected IDs.
+  if snapshot.affected_component_ids is None:
+    quote_cache.invalidate_all(snapshot.revision)
+  else:
+    quote_cache.invalidate(snapshot.affected_component_ids, snapshot.revision)
+
+if quote_cache is not None:
+  catalogue_provider.subscribe(invalidate_quotes, before_swap=True)
+
+catalogue_events = CatalogueEventBroadcaster(
+  max_subscribers=int(os.getenv("CATALOGUE_EVENTS_MAX_SUBSCRIBERS", "10000")),
+  heartbeat=float(os.getenv("CATALOGUE_EVENTS_HEARTBEAT", "15"))
+)
+catalogue_provider.subscribe(catalogue_events.publish)
+
+async def watch_catalogue_changes() -> None:
+  # Changes are otherwise only noticed when a request resolves the
+  # catalogue, so idle event streams would never hear about them. A reload
+  # reads the store, so it runs off the loop, and a failed check must not
+  # end the watcher.
+  while True:
+    await asyncio.sleep(max(catalogue_provider.check_interval, 0.1))
+    if catalogue_events.subscribers:
+      try:
+        await asyncio.to_thread(catalogue_provider.get_snapshot)
+      except Exception as e:
+        print(f"ERROR: catalogue change check failed: {e}")
+
+request_profiler = RequestProfiler(
+  output_dir=Path(os.getenv("PROFILER_OUTPUT_DIR") or Path(__file__).resolve().parent.parent / "profiles"),
+  token=os.getenv("PROFILER_TOKEN", ""),
+  sample_rate=float(os.getenv("PROFILER_SAMPLE_RATE", "0.01")),
+  interval=float(os.getenv("PROFILER_INTERVAL", "0.001")),
+  max_profiles=int(os.getenv("PROFILER_MAX_PROFILES", "200"))
+)
+
+PRICE_TABLE_PATH = os.getenv("PRICE_TABLE_PATH", "")
+
+PRICE_CHECK_BATCH_LIMIT = int(os.getenv("PRICE_CHECK_BATCH_LIMIT", "1000"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_SPOOL_BYTES = 8 * 1024 * 1024
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+PriceCheckPayload = Dict[str, Union[List[str], float, int]]
+
 # --- Dependency Injectors ---
 
-def get_catalogue_gateway() -> CatalogueGateway:
-  return CatalogueGateway()
+# Everything below is stateless or per-snapshot, so it is built once and
+# shared by all requests instead of being constructed for each of them.
+standard_price_strategy = StandardPricingStrategy()
+price_calculator = PriceCalculator(strategy=standard_price_strategy)
+configurator_services: "WeakKeyDictionary[CatalogueGateway, BikeConfiguratorService]" = WeakKeyDictionary()
+step_options_services: "WeakKeyDictionary[CatalogueGateway, StepOptionsService]" = WeakKeyDictionary()
+
+async def get_catalogue_gateway() -> CatalogueGateway:
+  # A due source check stats the store and may rebuild the snapshot, so it
+  # runs in a worker thread instead of stalling every request on the loop.
+  return catalogue_provider.peek() or await asyncio.to_thread(catalogue_provider.get_snapshot)
 
-def get_standard_price_strategy() -> StandardPricingStrategy:
-  return StandardPricingStrategy()
+async def get_standard_price_strategy() -> StandardPricingStrategy:
+  return standard_price_strategy
 
-def get_price_calculator() -> PriceCalculator:
-  return PriceCalculator(strategy=get_standard_price_strategy())
+async def get_price_calculator() -> PriceCalculator:
+  return price_calculator
 
 async def get_pricing_rules_applicator(gateway: CatalogueGateway = Depends(get_catalogue_gateway)) -> PricingRuleApplicator:
-  return PricingRuleApplicator(pricing_rules=await gateway.get_pricing_rules())
+  return gateway.pricing_rule_applicator
 
-def get_bike_configurator_service(
+async def get_bike_configurator_service(
   gateway: CatalogueGateway = Depends(get_catalogue_gateway),
   pc: PriceCalculator = Depends(get_price_calculator),
   pra: PricingRuleApplicator = Depends(get_pricing_rules_applicator)
 ) -> BikeConfiguratorService:
-  return BikeConfiguratorService(
-    catalogue_gateway=gateway,
-    price_calculator= pc,
-    pricing_rules_app= pra
-  )
+  service = configurator_services.get(gateway)
+  
+  if service is None:
+    # Opening the price table maps and validates a file: not on the loop.
+    price_table = await asyncio.to_thread(open_price_table, PRICE_TABLE_PATH, gateway.version, gateway.rule_changes_since)
+    service = configurator_services.setdefault(gateway, BikeConfiguratorService(
+      catalogue_gateway=gateway,
+      price_calculator= pc,
+      pricing_rules_app= pra,
+      quote_cache=quote_cache,
+      price_table=price_table
+    ))
+    
+  return service
+
+async def get_step_options_service(
+  gateway: CatalogueGateway = Depends(get_catalogue_gateway),
+  pra: PricingRuleApplicator = Depends(get_pricing_rules_applicator)
+) -> StepOptionsService:
+  service = step_options_services.get(gateway)
+  
+  if service is None:
+    service = step_options_services[gateway] = StepOptionsService(gateway=gateway, rule_applicator=pra)
+    
+  return service
 
 ConfigService = Annotated[BikeConfiguratorService, Depends(get_bike_configurator_service)]
 
 # --- API Endpoints ---
 
 @router.get("/catalogue/full")
-async def get_full_catalogue(gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
-  return await gateway.get_all_components()
+async def get_full_catalogue(request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
+  return payload_response(request, await gateway.get_all_components_payload(), gateway.version)
 
 @router.get("/catalogue/category/{category}")
-async def get_catalogue_category(category: str, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
-  return await gateway.get_components_by_category(category)
+async def get_catalogue_category(category: str, request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
+  return payload_response(request, await gateway.get_components_by_category_payload(category), gateway.version)
 
 @router.get("/catalogue/constraints")
-async def get_cataloue_constraints(gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
-  return await gateway.get_compatibility_constraints()
+async def get_cataloue_constraints(request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
+  return payload_response(request, await gateway.get_compatibility_constraints_payload(), gateway.version)
 
 @router.get("/catalogue/pricing_rules")
-async def get_pricing_rules(gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
-  return await gateway.get_pricing_rules()
+async def get_pricing_rules(request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
+  return payload_response(request, await gateway.get_pricing_rules_payload(), gateway.version)
 
-@router.post("/price/check")
-async def price_check(payload: Dict[str, Union[List[str], float, int]], gateway: CatalogueGateway = Depends(get_catalogue_gateway), bike_conf: BikeConfiguratorService = Depends(get_bike_configurator_service)):
+@router.get("/catalogue/next_options")
+async def get_next_options(
+  request: Request,
+  component_ids: List[str] = Query(default=[]),
+  category: Optional[str] = None,
+  gateway: CatalogueGateway = Depends(get_catalogue_gateway),
+  step_options: StepOptionsService = Depends(get_step_options_service)
+):
+  if category is not None and category not in gateway.category_index.categories:
+    raise HTTPException(status_code=404, detail=f"Unknown category '{category}'.")
+  
+  selection_ids = await gateway.resolve_selection(component_ids)
+  
+  payload = await gateway.run_lookup(step_options.next_options_payload, selection_ids, category)
+  return payload_response(request, payload)
 
-  id_to_category_map = await gateway.build_id_to_category_map()
+class SubscriberStreamingResponse(StreamingResponse):
+  # Gives the stream's subscriber slot back however the response ends,
+  # including when the client is gone before the stream is first read and
+  # the stream's own cleanup never runs.
+  def __init__(self, content: AsyncIterator[bytes], slot: SubscriberSlot, **kwargs):
+    super().__init__(content, **kwargs)
+    self.slot = slot
   
-  selection_ids = defaultdict(str)
+  async def __call__(self, scope, receive, send) -> None:
+    try:
+      await super().__call__(scope, receive, send)
+    finally:
+      self.slot.release()
+
+@router.get("/catalogue/events")
+async def get_catalogue_events(request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway)):
+  try:
+    slot = catalogue_events.reserve()
+  except SubscriberLimitReached as e:
+    raise HTTPException(status_code=503, detail=str(e))
   
-  for id in payload.get("component_ids", []):
-    category_name = id_to_category_map.get(id)
-    if category_name:
-      selection_ids[category_name] = id
+  return SubscriberStreamingResponse(
+    catalogue_events.stream(gateway, request.headers.get("last-event-id"), slot),
+    slot,
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+  )
+
+@router.get("/metrics")
+async def get_metrics():
+  if not metrics.enabled:
+    raise HTTPException(status_code=404, detail="Metrics are disabled.")
+  return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin_token(x_profile: Optional[str]) -> None:
+  # Admin endpoints share the profiler's token: without one they are off.
+  if not request_profiler.token:
+    raise HTTPException(status_code=404, detail="Admin endpoints are disabled.")
+  if x_profile is None or not compare_digest(x_profile.encode(), request_profiler.token):
+    raise HTTPException(status_code=403, detail="A valid X-Profile token is required.")
+
+@router.post("/catalogue/reload")
+async def reload_catalogue(x_profile: Optional[str] = Header(default=None)):
+  require_admin_token(x_profile)
+  snapshot, reloaded = await asyncio.to_thread(catalogue_provider.reload)
+  return {
+    "version": snapshot.version,
+    "reloaded": reloaded
+  }
+
+@router.get("/admin/profiling")
+async def get_profiling(x_profile: Optional[str] = Header(default=None)):
+  require_admin_token(x_profile)
+  return request_profiler.stats()
+
+@router.post("/admin/profiling")
+async def set_profiling(
+  enabled: bool = Body(embed=True),
+  sample_rate: Optional[float] = Body(default=None, embed=True, ge=0, le=1),
+  x_profile: Optional[str] = Header(default=None)
+):
+  require_admin_token(x_profile)
+  if sample_rate is not None:
+    request_profiler.sample_rate = sample_rate
+  request_profiler.enabled = enabled
+  return request_profiler.stats()
+
+@router.get("/price/cache/stats")
+async def get_quote_cache_stats():
+  if quote_cache is None:
+    return {"enabled": False}
+  return {"enabled": True, **quote_cache.stats()}
+
+# --- Price Check Adapter ---
+
+async def check_price(payload: PriceCheckPayload, gateway: CatalogueGateway, bike_conf: BikeConfiguratorService) -> Dict:
+  with metrics.span("map_ids"):
+    codes = await gateway.encode_selection(payload.get("component_ids", []))
   
-  if not selection_ids:
+  if codes == gateway.category_index.empty:
+    metrics.inc("validation_failures_total", reason="unmapped_ids")
     return {
       "valid": False,
       "final_price": None,
       "message": "Error: Selected IDs could not be mapped to existing categories."
     }
     
-  bike = await bike_conf.create_bike_from_selection(selection_ids)
+  bike = await bike_conf.create_bike_from_codes(codes)
   
   bike_price = bike.price
   
   is_valid = abs(bike_price - payload.get("client_total", 0)) < 0.01
   
+  # Counted per request, not per assembled bike, so cached quotes count too.
+  if not bike.is_valid:
+    metrics.inc("validation_failures_total", reason="incompatible")
+  elif not is_valid:
+    metrics.inc("validation_failures_total", reason="price_mismatch")
+  
   return {
     "valid": is_valid,
     "final_price": bike_price,
     "message": "Order verified successfully" if is_valid else "Price mismatch"
   }
+
+async def check_batch_item(payload, gateway: CatalogueGateway, bike_conf: BikeConfiguratorService) -> Dict:
+  if (
+    not isinstance(payload, dict)
+    or not isinstance(payload.get("component_ids", []), list)
+    or not all(isinstance(component_id, str) for component_id in payload.get("component_ids", []))
+    or not isinstance(payload.get("client_total", 0), (int, float))
+  ):
+    metrics.inc("validation_failures_total", reason="malformed")
+    return {"valid": False, "final_price": None, "message": "Error: Malformed price check payload."}
+  
+  try:
+    return await check_price(payload, gateway, bike_conf)
+  except ValueError as e:
+    return {"valid": False, "final_price": None, "message": f"Error: {e}"}
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+  buffer = b""
+  
+  async for chunk in request.stream():
+    buffer += chunk
+    *lines, buffer = buffer.split(b"\n")
+    
+    for line in lines:
+      if line.strip():
+        yield line
+        
+  if buffer.strip():
+    yield buffer
+
+def iter_spooled_file(spool) -> Iterator[bytes]:
+  try:
+    while chunk := spool.read(NDJSON_CHUNK_SIZE):
+      yield chunk
+  finally:
+    spool.close()
+
+async def ndjson_result(line: bytes, gateway: CatalogueGateway, bike_conf: BikeConfiguratorService) -> bytes:
+  try:
+    payload = json.loads(line)
+  except ValueError:
+    payload = None
+    
+  result = await check_batch_item(payload, gateway, bike_conf)
+  return json.dumps(result).encode() + b"\n"
+
+# --- Price Check Endpoints ---
+
+@router.post("/price/check")
+async def price_check(payload: PriceCheckPayload, gateway: CatalogueGateway = Depends(get_catalogue_gateway), bike_conf: BikeConfiguratorService = Depends(get_bike_configurator_service)):
+  result = await check_price(payload, gateway, bike_conf)
+  
+  with metrics.span("serialize"):
+    body = encode_json(result)
+  
+  return Response(content=body, media_type="application/json")
+
+@router.post("/price/check/batch")
+async def price_check_batch(request: Request, gateway: CatalogueGateway = Depends(get_catalogue_gateway), bike_conf: BikeConfiguratorService = Depends(get_bike_configurator_service)):
+  
+  if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+    # Lines are priced as they arrive and results are spooled to disk past
+    # NDJSON_SPOOL_BYTES: reading the body while already streaming the
+    # response is not reliably supported by HTTP/1.1 servers and clients.
+    spool = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_BYTES)
+    async for line in iter_ndjson_lines(request):
+      spool.write(await ndjson_result(line, gateway, bike_conf))
+    spool.seek(0)
+    return StreamingResponse(iter_spooled_file(spool), media_type=NDJSON_MEDIA_TYPE)
+  
+  try:
+    payloads = await request.json()
+  except ValueError:
+    raise HTTPException(status_code=400, detail="Request body must be a JSON array of price check payloads.")
+  
+  if not isinstance(payloads, list):
+    raise HTTPException(status_code=422, detail="Request body must be a JSON array of price check payloads.")
+  
+  if len(payloads) > PRICE_CHECK_BATCH_LIMIT:
+    raise HTTPException(status_code=413, detail=f"Batch exceeds {PRICE_CHECK_BATCH_LIMIT} items, send it as {NDJSON_MEDIA_TYPE} instead.")
+  
+  return [await check_batch_item(payload, gateway, bike_conf) for payload in payloads]
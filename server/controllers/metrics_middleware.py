@@ -0,0 +1,30 @@
+import time
+from server.services.metrics import metrics
+
+class MetricsMiddleware:
+  # Plain ASGI middleware: it neither buffers nor wraps the response body,
+  # and with metrics disabled it hands the request straight to the app.
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http" or not metrics.enabled:
+      await self.app(scope, receive, send)
+      return
+
+    started = time.perf_counter()
+    status = {"code": 500}
+
+    async def send_with_status(message):
+      if message["type"] == "http.response.start":
+        status["code"] = message["status"]
+      await send(message)
+
+    try:
+      await self.app(scope, receive, send_with_status)
+    finally:
+      # The matched route's template keeps the label set bounded.
+      route = scope.get("route")
+      path = getattr(route, "path", "unmatched")
+      metrics.observe("http_request_duration_seconds", time.perf_counter() - started, method=scope["method"], route=path, status=str(status["code"]))
@@ -0,0 +1,75 @@
+import os
+from typing import Dict, Optional
+from fastapi import Request, Response
+from server.services.encoded_payload import EncodedPayload, IDENTITY, GZIP, BROTLI
+
+CATALOGUE_CACHE_CONTROL = os.getenv("CATALOGUE_CACHE_CONTROL", "public, no-cache")
+
+# Catalogue version a payload was built from, compared by clients with the
+# versions announced on /catalogue/events.
+CATALOGUE_VERSION_HEADER = "X-Catalogue-Version"
+
+PREFERRED_ENCODINGS = (BROTLI, GZIP)
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+  accepted = {}
+  
+  for part in accept_encoding.split(","):
+    coding, _, params = part.partition(";")
+    coding = coding.strip().lower()
+    if not coding:
+      continue
+    
+    quality = 1.0
+    for param in params.split(";"):
+      name, _, value = param.partition("=")
+      if name.strip().lower() == "q":
+        try:
+          quality = float(value)
+        except ValueError:
+          quality = 0.0
+          
+    accepted[coding] = quality
+    
+  return accepted
+
+def choose_encoding(accept_encoding: str, payload: EncodedPayload) -> str:
+  accepted = accepted_encodings(accept_encoding)
+  
+  for encoding in PREFERRED_ENCODINGS:
+    if encoding in payload.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+      return encoding
+    
+  return IDENTITY
+
+def etag_matches(if_none_match: str, payload: EncodedPayload) -> bool:
+  if not if_none_match:
+    return False
+  
+  known_etags = {payload.etag_for(encoding) for encoding in (IDENTITY, *payload.variants)}
+  
+  for candidate in if_none_match.split(","):
+    candidate = candidate.strip()
+    if candidate == "*" or candidate.removeprefix("W/") in known_etags:
+      return True
+    
+  return False
+
+def payload_response(request: Request, payload: EncodedPayload, version: Optional[str] = None) -> Response:
+  encoding = choose_encoding(request.headers.get("accept-encoding", ""), payload)
+  
+  headers = {
+    "ETag": payload.etag_for(encoding),
+    "Cache-Control": CATALOGUE_CACHE_CONTROL,
+    "Vary": "Accept-Encoding"
+  }
+  if version is not None:
+    headers[CATALOGUE_VERSION_HEADER] = version
+  
+  if etag_matches(request.headers.get("if-none-match", ""), payload):
+    return Response(status_code=304, headers=headers)
+  
+  if encoding != IDENTITY:
+    headers["Content-Encoding"] = encoding
+  
+  return Response(content=payload.content_for(encoding), media_type="application/json", headers=headers)
@@ -0,0 +1,21 @@
+import sys
+from server.services.profiler import RequestProfiler
+
+class ProfilerMiddleware:
+  # Plain ASGI middleware like MetricsMiddleware. Its own frame marks the
+  # request on sampled stacks, so it must await the app directly.
+
+  def __init__(self, app, profiler: RequestProfiler):
+    self.app = app
+    self.profiler = profiler
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http" or not self.profiler.token or not self.profiler.wants(scope["path"], scope["headers"]):
+      await self.app(scope, receive, send)
+      return
+
+    session = self.profiler.start(scope["path"], sys._getframe())
+    try:
+      await self.app(scope, receive, send)
+    finally:
+      self.profiler.stop(session)
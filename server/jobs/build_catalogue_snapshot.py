@@ -0,0 +1,19 @@
+import argparse
+import time
+from pathlib import Path
+from server.services.storage.binary_store import write_catalogue_snapshot
+from server.services.storage.json_store import DATA_PATH, JsonCatalogueStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the JSON catalogue files into a memory-mappable snapshot.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    source = JsonCatalogueStore(args.data_path).read_sources()
+    write_catalogue_snapshot(args.output, source)
+    print(f"Compiled catalogue {source.version} ({len(source.components)} components) into {args.output} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
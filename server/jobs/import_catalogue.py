@@ -0,0 +1,22 @@
+import argparse
+import time
+from pathlib import Path
+from server.services.storage.json_store import DATA_PATH
+from server.services.storage.sqlite_store import import_json_catalogue
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON catalogue files into a SQLite catalogue.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    source = import_json_catalogue(args.output, args.data_path)
+    print(
+        f"Imported catalogue {source.version} ({len(source.components)} components, "
+        f"{len(source.compatibility_rules)} compatibility rules, {len(source.pricing_rules)} pricing rules) "
+        f"into {args.output} in {time.perf_counter() - started:.2f}s"
+    )
+
+if __name__ == "__main__":
+    main()
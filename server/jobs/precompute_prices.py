@@ -0,0 +1,73 @@
+import argparse
+import pickle
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional, Tuple
+from server.services.catalogue_gateway import CatalogueGateway, DATA_PATH
+from server.services.configuration_enumerator import ConfigurationEnumerator
+from server.services.pricing.price_table import PriceTableWriter, SelectionCodec
+
+_worker_gateway: Optional[CatalogueGateway] = None
+_worker_codec: Optional[SelectionCodec] = None
+
+def _init_worker(compiled_catalogue: bytes) -> None:
+    global _worker_gateway, _worker_codec
+    _worker_gateway = pickle.loads(compiled_catalogue)
+    _worker_codec = SelectionCodec.from_catalogue(_worker_gateway.components_by_category)
+
+def _price_partition(leading_category: str, leading_id: str) -> Tuple[array, array]:
+    codes, prices = array("Q"), array("d")
+    enumerator = ConfigurationEnumerator(_worker_gateway, categories=_worker_codec.categories)
+
+    for selection, price in enumerator.iter_valid({leading_category: leading_id}):
+        codes.append(_worker_codec.encode(selection))
+        prices.append(price)
+
+    return codes, prices
+
+def precompute_prices(output: Path, data_path: Path = DATA_PATH, leading_category: Optional[str] = None, workers: Optional[int] = None) -> int:
+    gateway = CatalogueGateway(data_path=data_path)
+    codec = SelectionCodec.from_catalogue(gateway.components_by_category)
+    leading_category = leading_category or codec.categories[0]
+
+    if leading_category not in codec.categories:
+        raise ValueError(f"Unknown leading category '{leading_category}'.")
+
+    # The compiled catalogue is pickled once and unpickled once per worker,
+    # not shipped again with every partition.
+    compiled_catalogue = pickle.dumps(gateway, protocol=pickle.HIGHEST_PROTOCOL)
+    partitions = codec.ids_by_category[leading_category]
+    writer = PriceTableWriter(output, codec, gateway.version)
+    priced = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(compiled_catalogue,)) as pool:
+            futures = [pool.submit(_price_partition, leading_category, leading_id) for leading_id in partitions]
+
+            for future in as_completed(futures):
+                codes, prices = future.result()
+                writer.write(codes, prices)
+                priced += len(codes)
+    except BaseException:
+        writer.discard()
+        raise
+
+    writer.close()
+    return priced
+
+def main():
+    parser = argparse.ArgumentParser(description="Price every valid configuration into a memory-mappable table.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    parser.add_argument("--leading-category", default=None, help="category whose components are split across workers (default: the first one)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    priced = precompute_prices(args.output, args.data_path, args.leading_category, args.workers)
+    print(f"Priced {priced} valid configurations into {args.output} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
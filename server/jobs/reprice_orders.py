@@ -0,0 +1,147 @@
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from server.services.catalogue_gateway import CatalogueGateway, DATA_PATH
+from server.services.pricing.pricing_rule_applicator import PricingRuleApplicator
+from server.services.pricing.vectorized_pricing import RuleImpact, SelectionMatrixEncoder, VectorizedPricer
+
+CHUNK_SIZE = 100_000
+
+def read_orders(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, str]]]:
+    # One order per row, one column per category holding the component id.
+    # Other columns (order_id, dates...) are ignored.
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet orders requires pyarrow; export them as CSV instead.")
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline="") as orders_file:
+        chunk = []
+        for row in csv.DictReader(orders_file):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _merge_impacts(totals: Dict[str, RuleImpact], impacts: Dict[str, RuleImpact]) -> None:
+    for rule_id, impact in impacts.items():
+        total = totals.setdefault(rule_id, RuleImpact(rule_id))
+        total.matched_orders += impact.matched_orders
+        total.revenue_effect += impact.revenue_effect
+
+def reprice_orders(orders_path: Path, candidate_rules: List[Dict], data_path: Path = DATA_PATH, chunk_size: int = CHUNK_SIZE, validate_sample: int = 100, seed: Optional[int] = None) -> Dict:
+    gateway = CatalogueGateway(data_path=data_path)
+    encoder = SelectionMatrixEncoder(gateway.components_by_category)
+    current_applicator = gateway.pricing_rule_applicator
+    candidate_applicator = PricingRuleApplicator(candidate_rules)
+    current = VectorizedPricer(encoder, current_applicator)
+    candidate = VectorizedPricer(encoder, candidate_applicator)
+    rng = random.Random(seed)
+
+    orders = skipped = repriced = checked = rows_read = 0
+    mismatches = []
+    current_revenue = candidate_revenue = 0.0
+    current_impacts: Dict[str, RuleImpact] = {}
+    candidate_impacts: Dict[str, RuleImpact] = {}
+
+    for chunk in read_orders(orders_path, chunk_size):
+        # An order naming a component the catalogue no longer has cannot be
+        # priced the way apply_rules would, so it is left out.
+        selections = [
+            {category: row.get(category) for category in encoder.categories if row.get(category)}
+            for row in chunk
+        ]
+        # Rows are numbered as in the orders file, first order = 1, so a
+        # mismatch can be looked up there whatever was skipped before it.
+        known, known_rows = [], []
+        for number, selection in enumerate(selections, start=rows_read + 1):
+            if all(component_id in encoder.index_by_category[category] for category, component_id in selection.items()):
+                known.append(selection)
+                known_rows.append(number)
+        rows_read += len(selections)
+        skipped += len(selections) - len(known)
+        if not known:
+            continue
+
+        codes = encoder.encode(known)
+        current_result = current.price(codes)
+        candidate_result = candidate.price(codes)
+
+        current_revenue += float(current_result.totals.sum())
+        candidate_revenue += float(candidate_result.totals.sum())
+        repriced += int((current_result.totals != candidate_result.totals).sum())
+        _merge_impacts(current_impacts, current_result.impacts)
+        _merge_impacts(candidate_impacts, candidate_result.impacts)
+
+        sample = sorted(rng.sample(range(len(codes)), min(validate_sample, len(codes))))
+        for pricer, applicator in ((current, current_applicator), (candidate, candidate_applicator)):
+            mismatches.extend(known_rows[row] for row in pricer.validate(codes, applicator, sample))
+        checked += len(sample)
+        orders += len(codes)
+
+    rules = {}
+    for rule_id in list(current_impacts) + [rule_id for rule_id in candidate_impacts if rule_id not in current_impacts]:
+        before = current_impacts.get(rule_id, RuleImpact(rule_id))
+        after = candidate_impacts.get(rule_id, RuleImpact(rule_id))
+        rules[rule_id] = {
+            "current": {"matched_orders": before.matched_orders, "revenue_effect": before.revenue_effect},
+            "candidate": {"matched_orders": after.matched_orders, "revenue_effect": after.revenue_effect},
+            "matched_orders_delta": after.matched_orders - before.matched_orders,
+            "revenue_effect_delta": after.revenue_effect - before.revenue_effect,
+        }
+
+    return {
+        "catalogue_version": gateway.version,
+        "orders": orders,
+        "skipped_orders": skipped,
+        "orders_repriced": repriced,
+        "current_revenue": current_revenue,
+        "candidate_revenue": candidate_revenue,
+        "revenue_delta": candidate_revenue - current_revenue,
+        "rules": rules,
+        "validation": {"checked": checked, "mismatched_orders": sorted(set(mismatches))},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice historical orders under a candidate pricing rule set.")
+    parser.add_argument("orders", type=Path, help="CSV (or Parquet, with pyarrow) with one column per category")
+    parser.add_argument("rules", type=Path, help="candidate pricing_rules.json")
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH, help="catalogue holding the current rules")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--validate-sample", type=int, default=100, help="orders per chunk checked against apply_rules")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = reprice_orders(args.orders, json.loads(args.rules.read_text()), args.data_path, args.chunk_size, args.validate_sample, args.seed)
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"Repriced {report['orders']} orders in {elapsed:.2f}s ({report['skipped_orders']} skipped): {report['orders_repriced']} change price")
+    print(f"Revenue {report['current_revenue']:.2f} -> {report['candidate_revenue']:.2f} ({report['revenue_delta']:+.2f})")
+    for rule_id, impact in report["rules"].items():
+        if impact["matched_orders_delta"] or impact["revenue_effect_delta"]:
+            print(f"  {rule_id}: {impact['matched_orders_delta']:+d} orders, {impact['revenue_effect_delta']:+.2f} revenue")
+
+    mismatched = report["validation"]["mismatched_orders"]
+    if mismatched:
+        print(f"ERROR: {len(mismatched)} of {report['validation']['checked']} sampled orders do not match apply_rules: {mismatched[:10]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
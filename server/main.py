@@ -1,12 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+
+# The controllers read their settings when imported, so server/.env has to
+# be loaded before the first server.controllers import.
+load_dotenv()
+
 from server.controllers import api_configurator
+from server.controllers.metrics_middleware import MetricsMiddleware
+from server.controllers.payload_response import CATALOGUE_VERSION_HEADER
+from server.controllers.profiler_middleware import ProfilerMiddleware
+from server.services.metrics import metrics
 import os
 
-load_dotenv()
+metrics.enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    api_configurator.catalogue_provider.get_snapshot()
+    watcher = asyncio.create_task(api_configurator.watch_catalogue_changes())
+    yield
+    watcher.cancel()
+    with suppress(asyncio.CancelledError):
+        await watcher
+
+app = FastAPI(lifespan=lifespan)
 
 origins_raw = os.getenv("ORIGINS", "")
 origins_list = origins_raw.split(",") if origins_raw else []
@@ -17,6 +37,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CATALOGUE_VERSION_HEADER],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(ProfilerMiddleware, profiler=api_configurator.request_profiler)
+
 app.include_router(api_configurator.router)
\ No newline at end of file
@@ -1,47 +1,70 @@
-from typing import Dict, List
+from typing import Dict, Optional
 from .catalogue_gateway import CatalogueGateway
+from .category_index import MISSING, CategoryIndex, SelectionVector
+from .metrics import metrics
+from .quote_cache import QuoteCache
+from .pricing.price_table import PriceTable
 from .pricing.price_calculator import PriceCalculator
 from server.bike.models import Bike
-from server.components.abc_components import BikeComponent
 from .pricing.pricing_rule_applicator import PricingRuleApplicator
 
 class BikeConfiguratorService:
     
-    def __init__(self, catalogue_gateway: CatalogueGateway, price_calculator: PriceCalculator, pricing_rules_app: PricingRuleApplicator):
+    def __init__(self, catalogue_gateway: CatalogueGateway, price_calculator: PriceCalculator, pricing_rules_app: PricingRuleApplicator, quote_cache: Optional[QuoteCache] = None, price_table: Optional[PriceTable] = None):
         self.catalogue = catalogue_gateway 
         self.price_calculator = price_calculator
         self.rule_applicator = pricing_rules_app
+        self.quote_cache = quote_cache
+        self.price_table = price_table
+        self.index: CategoryIndex = catalogue_gateway.category_index
+
+        if price_table is not None and price_table.codec.ids_by_category != self.index.layout():
+            print("ERROR: price table does not match the catalogue layout, pricing without it")
+            self.price_table = None
 
     async def create_bike_from_selection(self, selection_ids: Dict[str, str]) -> Bike:
-        frame_type = await self.catalogue.get_component_by_id(selection_ids.get('frame_type'))
-        frame_finish = await self.catalogue.get_component_by_id(selection_ids.get('frame_finish'))
-        wheels = await self.catalogue.get_component_by_id(selection_ids.get('wheels'))
-        chain = await self.catalogue.get_component_by_id(selection_ids.get('chain'))
-        rim_color = await self.catalogue.get_component_by_id(selection_ids.get('rim_color'))
-        
-        if not all([frame_type, frame_finish, wheels, chain, rim_color]):
+        return await self.create_bike_from_codes(await self.catalogue.encode_selection_by_category(selection_ids))
+
+    async def create_bike_from_codes(self, codes: SelectionVector) -> Bike:
+        if self.quote_cache is None:
+            return await self._assemble_bike(codes)
+
+        key = QuoteCache.make_key(self.catalogue.quote_lineage, codes)
+        bike = self.quote_cache.get(key)
+        metrics.inc("quote_cache_requests_total", result="miss" if bike is None else "hit")
+
+        if bike is None:
+            bike = await self._assemble_bike(codes)
+            self.quote_cache.put(key, bike, self.catalogue.revision, (component.id for component in bike.components.values()))
+
+        return bike
+
+    async def _assemble_bike(self, codes: SelectionVector) -> Bike:
+        if MISSING in codes:
+            metrics.inc("validation_failures_total", reason="incomplete")
             raise ValueError("Incomplete selection or components not in the catalogue.")
 
-        assembled_bike = Bike(frame_type=frame_type, frame_finish=frame_finish, wheels=wheels, chain=chain, rim_color=rim_color)
-        
-        component_objects: Dict[str, BikeComponent] = {
-            "frame_type": frame_type,
-            "frame_finish": frame_finish,
-            "wheels": wheels,
-            "chain": chain,
-            "rim_color": rim_color
-        }
-
-        errors = await self.catalogue.check_compatibility_of_selection(component_objects)
+        # Components come from the index by position, not by ID.
+        with metrics.span("resolve_components"):
+            component_objects = await self.catalogue.decode_selection(codes)
+
+        # A precomputed table only stores valid bikes, so a miss still runs
+        # the full pipeline to report the compatibility errors.
+        if self.price_table is not None:
+            precomputed_price = self.price_table.lookup_vector(codes, (component.id for component in component_objects.values()))
+            metrics.inc("price_table_lookups_total", result="miss" if precomputed_price is None else "hit")
+            if precomputed_price is not None:
+                return Bike(components=component_objects, price=precomputed_price)
+
+        with metrics.span("check_compatibility"):
+            # A decoded vector is already keyed by each component's
+            # category, so it goes to the compiled index as is.
+            errors = self.catalogue.compatibility_index.check(component_objects)
         
         if errors:
-            assembled_bike.is_valid = False
-            assembled_bike.compatibility_errors = errors
-            assembled_bike.price = 0.0 
-            return assembled_bike
-
-        self.price_calculator.set_bike_instance(bike_instance=assembled_bike)
+            return Bike(components=component_objects, is_valid=False, price=0.0, compatibility_errors=errors)
 
-        assembled_bike.price = self.rule_applicator.apply_rules(self.price_calculator.get_selected_components())
+        with metrics.span("apply_rules"):
+            price = self.rule_applicator.price_selection(component_objects)
         
-        return assembled_bike
\ No newline at end of file
+        return Bike(components=component_objects, price=price)
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, List, Optional
+from .catalogue_gateway import CatalogueGateway
+
+# Payloads a client may hold, and the snapshot data each one is built from.
+RESOURCES = (
+    ("catalogue", "components_version"),
+    ("constraints", "rules_raw"),
+    ("pricing_rules", "pricing_rules"),
+)
+
+HEARTBEAT = b": keepalive\n\n"
+
+class SubscriberLimitReached(Exception):
+    pass
+
+class SubscriberSlot:
+    # One reserved stream. Released once, by whichever of the stream and
+    # the response serving it finishes first.
+
+    def __init__(self, broadcaster: "CatalogueEventBroadcaster"):
+        self.broadcaster = broadcaster
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.broadcaster.subscribers -= 1
+
+class CatalogueEventBroadcaster:
+    # Fans catalogue changes out to Server-Sent Events streams. Subscribers
+    # share one asyncio.Event that is swapped on every publish and read the
+    # latest message when woken, so an idle stream holds no queue and a slow
+    # one skips straight to the newest version instead of buffering.
+
+    def __init__(self, max_subscribers: int = 10000, heartbeat: float = 15.0, retry_ms: int = 5000):
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.subscribers = 0
+        self.published = 0
+        self._revision = 0
+        self._message: Optional[bytes] = None
+        self._previous: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    def publish(self, snapshot: CatalogueGateway) -> None:
+        # Provider listener: may run on any thread that triggered the reload.
+        sources = tuple(getattr(snapshot, attribute) for _, attribute in RESOURCES)
+
+        with self._lock:
+            if snapshot.revision <= self._revision:
+                return
+            previous, self._previous = self._previous, sources
+            changed = [
+                name for (name, _), before, after in zip(RESOURCES, previous or (None,) * len(RESOURCES), sources)
+                if previous is None or before != after
+            ]
+            message = self.format_event(snapshot, changed)
+            self._revision = snapshot.revision
+            self._message = message
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._wake()
+        else:
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        self.published += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        if changed is not None:
+            changed.set()
+
+    @staticmethod
+    def format_event(snapshot: CatalogueGateway, changed: Optional[List[str]]) -> bytes:
+        # "changed" is None on the first event of a stream: the client only
+        # learns the current version and compares it with what it holds.
+        data = json.dumps({"version": snapshot.version, "revision": snapshot.revision, "changed": changed}, separators=(",", ":"))
+        return f"id: {snapshot.revision}\nevent: catalogue\ndata: {data}\n\n".encode()
+
+    def reserve(self) -> SubscriberSlot:
+        # Called by the endpoint before it starts streaming, so a full
+        # worker can still answer with an error status. The slot is taken
+        # here, not when the stream starts, so concurrent requests cannot
+        # all pass the check before any of them counts.
+        if self.subscribers >= self.max_subscribers:
+            raise SubscriberLimitReached(f"{self.subscribers} catalogue event streams are already open.")
+        self.subscribers += 1
+        return SubscriberSlot(self)
+
+    async def stream(self, snapshot: CatalogueGateway, last_event_id: Optional[str] = None, slot: Optional[SubscriberSlot] = None) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._changed = asyncio.Event()
+
+        slot = slot or self.reserve()
+        try:
+            sent = snapshot.revision
+            first = f"retry: {self.retry_ms}\n\n".encode()
+            if last_event_id != str(snapshot.revision):
+                first += self.format_event(snapshot, None)
+            yield first
+
+            while True:
+                changed = self._changed
+                if self._revision > sent:
+                    sent = self._revision
+                    yield self._message
+                    continue
+
+                # asyncio.timeout, unlike wait_for, needs no extra task per
+                # waiting stream.
+                try:
+                    async with asyncio.timeout(self.heartbeat):
+                        await changed.wait()
+                except TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            slot.release()
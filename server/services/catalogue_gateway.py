@@ -1,115 +1,254 @@
-import json
+import asyncio
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from types import MappingProxyType
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set
 from server.components.abc_components import BikeComponent
 from collections import defaultdict
+from .category_index import CategoryIndex, LookupCategoryIndex, SelectionVector
+from .columnar_catalogue import ColumnarCatalogue
+from .compatibility_index import CompatibilityIndex
+from .encoded_payload import EncodedPayload
+from .pricing.pricing_rule_applicator import PricingRuleApplicator
+from .storage import CatalogueStore, JsonCatalogueStore
+from .storage.json_store import DATA_PATH
+from .rule_diff import compatibility_component_ids, diff_rules, pricing_component_ids
 
-CUR_PATH = Path(__file__).resolve().parent
-DATA_PATH = CUR_PATH.parent / "static_data"
+EMPTY_LIST_PAYLOAD = EncodedPayload.from_object([])
+COMPONENT_PAYLOADS = ("components",)
+# Whole-catalogue structures. A snapshot served through a store's component
+# lookup only builds them when something asks for them.
+CATALOGUE_ATTRIBUTES = ("components_raw", "components_by_category", "category_by_id", "components_by_id")
+
+# How many earlier versions a snapshot remembers the rule changes since.
+RULE_HISTORY = 32
 
 class CatalogueGateway:
     
-    def __init__(self):
-        self.components_raw = self._load_json("components.json")
-        self.rules_raw = self._load_json("compatibility_rules.json")
-        self.pricing_rules = self._load_json("pricing_rules.json")
-        self.components_by_category: Dict[str, List[BikeComponent]] = {}
-        self.components_by_id = self._process_components()
-        
-    def _load_json(self, filename: str) -> List[Dict]:
-        file_path = DATA_PATH / filename
-        if not file_path.exists():
-            print(f"ERROR: file not found in {file_path}")
-            return []
-        with open(file_path, 'r') as f:
-            return json.load(f)
-
-    def _process_components(self) -> Dict[str, BikeComponent]:
-        by_id = {}
-        for item in self.components_raw:
+    def __init__(self, data_path: Path = DATA_PATH, store: Optional[CatalogueStore] = None, previous: Optional["CatalogueGateway"] = None):
+        self.data_path = data_path
+        self.store = store or JsonCatalogueStore(data_path)
+        source, self.lookup = self.store.open_revision()
+        self.version = source.version
+        # Set by the provider when it publishes the snapshot; increases with
+        # every swap and orders quote cache writes across snapshots.
+        self.revision = 0
+        self.components_version = source.components_version
+        self.rules_raw = source.compatibility_rules
+        self.pricing_rules = source.pricing_rules
+        self._payloads: Dict[str, EncodedPayload] = {}
+        self._columnar: Optional[ColumnarCatalogue] = None
+
+        if previous is not None and previous.components_version == self.components_version:
+            self._update_rules(previous)
+            return
+
+        if self.lookup is None:
+            self._process_components(source.components)
+            self.category_index = CategoryIndex(self.components_by_category)
+        else:
+            # Components stay in the store and requests read the few they
+            # name; see __getattr__ for the whole-catalogue structures.
+            self.category_index = LookupCategoryIndex(self.lookup)
+        self.compatibility_index = CompatibilityIndex(self.rules_raw)
+        self.pricing_rule_applicator = PricingRuleApplicator(self.pricing_rules)
+        self.compatibility_constraints = self._build_compatibility_constraints()
+        self._payloads = self._encode_payloads()
+        # Quotes are keyed by the version that last changed the components;
+        # None means "anything may have changed" for affected_component_ids.
+        self.quote_lineage = self.version
+        self.affected_component_ids: Optional[FrozenSet[str]] = None
+        self.rule_changes_since: Dict[str, Optional[FrozenSet[str]]] = {}
+
+    def _update_rules(self, previous: "CatalogueGateway") -> None:
+        # Only the rules changed: components and their payloads are shared
+        # with the previous snapshot and only the touched rules recompile.
+        for name in CATALOGUE_ATTRIBUTES:
+            if name in previous.__dict__:
+                self.__dict__[name] = previous.__dict__[name]
+        # A lookup reads the revision it was opened on, so a new one gets a
+        # new index; the codes are the same, the components being equal.
+        self.category_index = previous.category_index if self.lookup is None else LookupCategoryIndex(self.lookup)
+        self._columnar = previous._columnar
+
+        compatibility_diff = diff_rules(previous.rules_raw, self.rules_raw)
+        pricing_diff = diff_rules(previous.pricing_rules, self.pricing_rules)
+
+        self.compatibility_index = CompatibilityIndex(self.rules_raw, previous.compatibility_index, compatibility_diff.touched)
+        self.pricing_rule_applicator = PricingRuleApplicator(self.pricing_rules, previous.pricing_rule_applicator, pricing_diff.touched)
+
+        selector_ids = compatibility_component_ids(compatibility_diff)
+        constraints = {selector_id: restrictions for selector_id, restrictions in previous.compatibility_constraints.items() if selector_id not in selector_ids}
+        constraints.update(self._build_compatibility_constraints(selector_ids))
+        self.compatibility_constraints = constraints
+        self._payloads = self._encode_payloads(previous)
+
+        pricing_ids = pricing_component_ids(pricing_diff)
+        affected = None if pricing_ids is None else frozenset(selector_ids | pricing_ids)
+
+        self.quote_lineage = previous.quote_lineage
+        self.affected_component_ids = affected
+        self.rule_changes_since = {
+            version: None if changed is None or affected is None else changed | affected
+            for version, changed in list(previous.rule_changes_since.items())[-(RULE_HISTORY - 1):]
+        }
+        self.rule_changes_since[previous.version] = affected
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes that are not set: the whole-catalogue
+        # structures of a lookup-backed snapshot, built on first use.
+        lookup = self.__dict__.get("lookup")
+        if name in CATALOGUE_ATTRIBUTES and lookup is not None:
+            self._process_components(lookup.records())
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getstate__(self) -> Dict:
+        # Pickled snapshots only price (precompute workers): payloads are not
+        # worth shipping, the columnar store is rebuilt on demand, and a store
+        # or a lookup may hold open files, so workers get the whole catalogue.
+        state = self.__dict__.copy()
+        if self.lookup is not None:
+            state.update((name, getattr(self, name)) for name in CATALOGUE_ATTRIBUTES)
+            state["category_index"] = CategoryIndex(state["components_by_category"])
+            state["lookup"] = None
+        state["store"] = None
+        state["_payloads"] = {}
+        state["_columnar"] = None
+        return state
+
+    def _process_components(self, records: List[Dict]) -> None:
+        # Built aside and published at the end: a lookup-backed snapshot
+        # may be materialized while other threads already read from it.
+        components_by_category: Dict[str, List[BikeComponent]] = {}
+        category_by_id: Dict[str, str] = {}
+        by_id: Dict[str, BikeComponent] = {}
+
+        for item in records:
             try:
-                model = BikeComponent(
-                    id=item["id"],
-                    price=item["price"],
-                    category=item["category"],
-                    name=item["name"],
-                    **{k: v for k, v in item.items() if k not in ["id", "price", "category", "name"]}
-                )
-                by_id[item["id"]] = model
+                model = BikeComponent.from_record(item)
+                by_id[model.id] = model
                 
-                category = item["category"]
+                category = model.category
+                category_by_id[model.id] = category
                 
-                if category not in self.components_by_category:
-                    self.components_by_category[category] = []
-                self.components_by_category[category].append(model)
+                if category not in components_by_category:
+                    components_by_category[category] = []
+                components_by_category[category].append(model)
                 
             except Exception as e:
                 print(f"Error converting {item.get('id', 'unknown')}: {e}")
-        return by_id
+
+        self.components_raw = records
+        self.components_by_category = components_by_category
+        self.category_by_id = category_by_id
+        self.components_by_id = by_id
     
+    def _encode_payloads(self, previous: Optional["CatalogueGateway"] = None) -> Dict[str, EncodedPayload]:
+        # Every response body is encoded and compressed here, while the
+        # snapshot is built off the request path, so serving one is a dict
+        # lookup. A rule-only edit reuses whatever it did not change.
+        payloads: Dict[str, EncodedPayload] = {}
+
+        # Lookup-backed snapshots encode component payloads on first use
+        # instead; see _component_payload.
+        if previous is not None:
+            payloads.update((key, payload) for key, payload in previous._payloads.items() if key in COMPONENT_PAYLOADS or key.startswith("category:"))
+        elif self.lookup is None:
+            payloads["components"] = EncodedPayload.from_object(self.components_by_category)
+            for category, components in self.components_by_category.items():
+                payloads[f"category:{category}"] = EncodedPayload.from_object(components)
+
+        if previous is not None and previous.compatibility_constraints == self.compatibility_constraints:
+            payloads["constraints"] = previous._payloads["constraints"]
+        else:
+            payloads["constraints"] = EncodedPayload.from_object(self.compatibility_constraints)
+
+        if previous is not None and previous.pricing_rules == self.pricing_rules:
+            payloads["pricing_rules"] = previous._payloads["pricing_rules"]
+        else:
+            payloads["pricing_rules"] = EncodedPayload.from_object(self.pricing_rules)
+
+        return payloads
+
+    def get_columnar_store(self) -> ColumnarCatalogue:
+        # Built on first use; needs numpy, which the object API does not.
+        if self._columnar is None:
+            self._columnar = ColumnarCatalogue(self.components_by_category)
+        return self._columnar
+
     async def get_all_components(self) -> Dict[str, List[BikeComponent]]:
         return self.components_by_category
 
-    async def get_component_by_id(self, component_id: str) -> Optional[BikeComponent]:
+    async def get_all_components_payload(self) -> EncodedPayload:
+        return await self._component_payload("components")
+
+    async def _component_payload(self, key: str) -> EncodedPayload:
+        payload = self._payloads.get(key)
+        if payload is None:
+            # Lookup-backed snapshots do not read every component when they
+            # are built; the first request encodes them in a worker thread
+            # and later snapshots with the same components reuse the result.
+            payload = await asyncio.to_thread(self._encode_component_payload, key)
+            self._payloads[key] = payload
+        return payload
+
+    def _encode_component_payload(self, key: str) -> EncodedPayload:
+        if key == "components":
+            by_category: Dict[str, List[Dict]] = {}
+            for record in self.lookup.records():
+                by_category.setdefault(record["category"], []).append(record)
+            return EncodedPayload.from_object(by_category)
+        return EncodedPayload.from_object(self.lookup.components_in_category(key[len("category:"):]))
+
+    def find_component(self, component_id: str) -> Optional[BikeComponent]:
+        if self.lookup is not None:
+            return self.lookup.components_by_ids([component_id]).get(component_id)
         return self.components_by_id.get(component_id)
+
+    def category_components(self, category: str) -> List[BikeComponent]:
+        if self.lookup is not None:
+            return self.lookup.components_in_category(category)
+        return self.components_by_category.get(category, [])
+
+    async def run_lookup(self, fn, *args):
+        # Reads that may go through a blocking lookup (pooled SQLite) run in
+        # a worker thread so they do not stall the event loop; in-memory and
+        # mapped reads are cheaper inline.
+        if self.lookup is not None and self.lookup.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get_component_by_id(self, component_id: str) -> Optional[BikeComponent]:
+        return await self.run_lookup(self.find_component, component_id)
     
     async def get_components_by_category(self, category: str) -> List[BikeComponent]:
-        return self.components_by_category.get(category, [])
+        return await self.run_lookup(self.category_components, category)
+    
+    async def get_components_by_category_payload(self, category: str) -> EncodedPayload:
+        if category not in self.category_index.categories:
+            return EMPTY_LIST_PAYLOAD
+        return await self._component_payload(f"category:{category}")
     
     async def get_pricing_rules(self) -> List[Dict]:
         return self.pricing_rules
 
+    async def get_pricing_rules_payload(self) -> EncodedPayload:
+        return self._payloads["pricing_rules"]
+
     async def check_compatibility_of_selection(self, selection: Dict[str, BikeComponent]) -> List[str]:
-        errors = []
         selection_by_category = {comp.category: comp for comp in selection.values() if comp}
-        
-        for rule in self.rules_raw:
-            rule_id = rule.get("rule_id", "N/A")
-            affects_category = rule.get("affects_category")
-            
-            component_to_validate = selection_by_category.get(affects_category)
-            
-            if not component_to_validate:
-                continue
-
-            for condition_set in rule.get("conditions", []):
-                selector = condition_set.get("selector", {})
-                result_set = condition_set.get("result_set", {})
-                
-                selector_category = selector.get("category")
-                selector_component = selection_by_category.get(selector_category)
-
-                if selector_component and selector_component.id == selector.get("id"):
-                    
-                    value_to_check = component_to_validate.id 
-                    
-                    if 'include' in result_set.get(affects_category, {}):
-                        required_values = result_set[affects_category]['include']
-
-                        if value_to_check not in required_values:
-                            errors.append(
-                                f"({rule_id}): The selection of {selector_component.id} requires "
-                                f"{affects_category} to be one of {required_values}, but component ID is '{value_to_check}'."
-                            )
+        return self.compatibility_index.check(selection_by_category)
+    
+    async def get_compatibility_constraints(self) -> Dict[str, Dict[str, List[str]]]:
+        return self.compatibility_constraints
 
-                    if 'exclude' in result_set.get(affects_category, {}):
-                        forbidden_values = result_set[affects_category]['exclude']
-                        
-                        if value_to_check in forbidden_values:
-                            errors.append(
-                                f"({rule_id}): The selection of {selector_component.id} does not allow "
-                                f"{affects_category} to be '{value_to_check}'."
-                            )
+    async def get_compatibility_constraints_payload(self) -> EncodedPayload:
+        return self._payloads["constraints"]
 
-        return errors
-    
-    async def get_compatibility_constraints(self) -> Dict[str, Dict[str, Set[str]]]:
+    def _build_compatibility_constraints(self, selector_ids: Optional[AbstractSet[str]] = None) -> Dict[str, Dict[str, List[str]]]:
         constraints = defaultdict(lambda: defaultdict(set))
-
-        all_component_ids_by_category = {
-            cat: {comp.id for comp in components}
-            for cat, components in self.components_by_category.items()
-        }
+        # Only categories restricted by an include list are read in full.
+        ids_by_category: Dict[str, Set[str]] = {}
         
         for rule in self.rules_raw:
             affects_category = rule.get("affects_category")
@@ -120,6 +259,9 @@ class CatalogueGateway:
                 
                 selector_id = selector.get("id")
                 
+                if selector_ids is not None and selector_id not in selector_ids:
+                    continue
+                
                 if affects_category in result_set:
                     rule_details = result_set[affects_category]
                     
@@ -131,7 +273,9 @@ class CatalogueGateway:
                     if "include" in rule_details:
                         allowed_ids = set(rule_details["include"])
                         
-                        all_ids_in_category = all_component_ids_by_category.get(affects_category, set())
+                        if affects_category not in ids_by_category:
+                            ids_by_category[affects_category] = {comp.id for comp in self.category_components(affects_category)}
+                        all_ids_in_category = ids_by_category[affects_category]
                         
                         exclude_ids = all_ids_in_category - allowed_ids
                         
@@ -140,19 +284,44 @@ class CatalogueGateway:
         final_constraints = {}
         for selector_id, affects_category in constraints.items():
             final_constraints[selector_id] = {
-                cat: list(ids) for cat, ids in affects_category.items()
+                cat: sorted(ids) for cat, ids in affects_category.items()
             }
             
         return final_constraints
     
-    async def build_id_to_category_map(self):
-        catalogue = await self.get_all_components()
-        id_to_category_map = defaultdict(str)
-        
-        for category_name, component_list in catalogue.items():
-            for component_object in component_list:
-                if hasattr(component_object, 'id'):
-                    component_id_str = component_object.id
-                    id_to_category_map[component_id_str] = category_name
-                    
-        return id_to_category_map
\ No newline at end of file
+    async def build_id_to_category_map(self) -> Mapping[str, str]:
+        # The index is shared by every request on this snapshot (and by the
+        # snapshots after a rule-only edit), so callers only get a view.
+        return MappingProxyType(self.category_by_id)
+
+    async def resolve_selection(self, component_ids: List[str]) -> Dict[str, str]:
+        return await self.run_lookup(self._resolve_selection, component_ids)
+
+    def _resolve_selection(self, component_ids: List[str]) -> Dict[str, str]:
+        selection_ids = {}
+        if self.lookup is not None:
+            categories = self.category_index.categories
+            slots = self.lookup.slots(component_ids)
+            for component_id in component_ids:
+                slot = slots.get(component_id)
+                if slot is not None:
+                    selection_ids[categories[slot[0]]] = component_id
+            return selection_ids
+
+        category_by_id = self.category_by_id
+
+        for component_id in component_ids:
+            category_name = category_by_id.get(component_id)
+            if category_name:
+                selection_ids[category_name] = component_id
+
+        return selection_ids
+
+    async def encode_selection(self, component_ids: Iterable[str]) -> SelectionVector:
+        return await self.run_lookup(self.category_index.encode_ids, component_ids)
+
+    async def encode_selection_by_category(self, selection_ids: Dict[str, str]) -> SelectionVector:
+        return await self.run_lookup(self.category_index.encode, selection_ids)
+
+    async def decode_selection(self, codes: SelectionVector) -> Dict[str, BikeComponent]:
+        return await self.run_lookup(self.category_index.components_of, codes)
@@ -0,0 +1,88 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Hashable, List, Optional, Tuple
+from .catalogue_gateway import CatalogueGateway, DATA_PATH
+from .single_flight import SingleFlight
+from .storage import CatalogueStore, JsonCatalogueStore
+
+class CatalogueProvider:
+    # Snapshots are never mutated: a reload builds a new gateway and swaps the
+    # reference, so in-flight requests keep the snapshot they resolved.
+
+    def __init__(self, data_path: Path = DATA_PATH, check_interval: float = 1.0, store: Optional[CatalogueStore] = None):
+        self.data_path = data_path
+        self.store = store or JsonCatalogueStore(data_path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # Callers that find the same new stamp share one build; a build
+        # never runs under _lock, so it does not block unchanged checks.
+        self._builds = SingleFlight("catalogue_build")
+        self._build_lock = threading.Lock()
+        self._snapshot: Optional[CatalogueGateway] = None
+        self._stamp: Hashable = ()
+        self._next_check = 0.0
+        self._revision = 0
+        self._listeners: List[Callable[[CatalogueGateway], None]] = []
+        self._preparers: List[Callable[[CatalogueGateway], None]] = []
+
+    def peek(self) -> Optional[CatalogueGateway]:
+        # The current snapshot while no source check is due, else None. Never
+        # blocks, so async callers can skip a thread hop on the common path.
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+        return None
+
+    def get_snapshot(self) -> CatalogueGateway:
+        return self.peek() or self._refresh(force=False)[0]
+
+    def reload(self) -> Tuple[CatalogueGateway, bool]:
+        return self._refresh(force=True)
+
+    def subscribe(self, listener: Callable[[CatalogueGateway], None], before_swap: bool = False) -> None:
+        # before_swap listeners run under the provider lock, before any
+        # request can resolve the new snapshot (e.g. to invalidate caches).
+        (self._preparers if before_swap else self._listeners).append(listener)
+
+    def _refresh(self, force: bool) -> Tuple[CatalogueGateway, bool]:
+        with self._lock:
+            current = self._snapshot
+            stamp = self.store.source_stamp()
+            self._next_check = time.monotonic() + self.check_interval
+
+            if current is not None and not force and stamp == self._stamp:
+                return current, False
+
+        return self._builds.do(stamp, lambda: self._build(stamp, force))
+
+    def _build(self, stamp: Hashable, force: bool) -> Tuple[CatalogueGateway, bool]:
+        with self._build_lock:
+            current = self._snapshot
+            # Another build may have published this stamp in the meantime.
+            if current is not None and not force and stamp == self._stamp:
+                return current, False
+
+            try:
+                candidate = CatalogueGateway(data_path=self.data_path, store=self.store, previous=current)
+            except Exception as e:
+                if current is None:
+                    raise
+                print(f"ERROR: catalogue reload failed, keeping version {current.version}: {e}")
+                return current, False
+
+            with self._lock:
+                self._stamp = stamp
+                if current is not None and candidate.version == current.version:
+                    return current, False
+
+                self._revision += 1
+                candidate.revision = self._revision
+                for preparer in self._preparers:
+                    preparer(candidate)
+
+                self._snapshot = candidate
+
+        for listener in self._listeners:
+            listener(candidate)
+        return candidate, True
@@ -0,0 +1,108 @@
+from typing import Dict, Iterable, List, Tuple
+from server.components.abc_components import BikeComponent
+from .storage.base import ComponentLookup
+
+# Code of a category nothing was selected in.
+MISSING = -1
+
+# One component code per category, in the index's category order.
+SelectionVector = Tuple[int, ...]
+
+class CategoryIndex:
+    # Fixed category order taken from the catalogue, and each component's
+    # position within its category. A selection becomes a tuple of small
+    # ints: hashable, cheap to compare, and decoded to components by
+    # position instead of by ID. A new category in the data is just one
+    # more slot.
+
+    def __init__(self, components_by_category: Dict[str, List[BikeComponent]]):
+        self.categories: Tuple[str, ...] = tuple(components_by_category)
+        self.components: Tuple[Tuple[BikeComponent, ...], ...] = tuple(tuple(components) for components in components_by_category.values())
+        # One lookup per ID gives both its category slot and its code.
+        self.slot_by_id: Dict[str, Tuple[int, int]] = {
+            component.id: (position, code)
+            for position, components in enumerate(self.components)
+            for code, component in enumerate(components)
+        }
+        self.empty: SelectionVector = (MISSING,) * len(self.categories)
+
+    def encode_ids(self, component_ids: Iterable[str]) -> SelectionVector:
+        # Unknown IDs are skipped and a later ID replaces an earlier one of
+        # the same category, as resolve_selection does.
+        codes = list(self.empty)
+        slot_by_id = self.slot_by_id
+
+        for component_id in component_ids:
+            slot = slot_by_id.get(component_id)
+            if slot is not None:
+                codes[slot[0]] = slot[1]
+
+        return tuple(codes)
+
+    def encode(self, selection_ids: Dict[str, str]) -> SelectionVector:
+        # An ID filed under another category than its own is not selected.
+        codes = list(self.empty)
+        slot_by_id = self.slot_by_id
+
+        for position, category in enumerate(self.categories):
+            slot = slot_by_id.get(selection_ids.get(category))
+            if slot is not None and slot[0] == position:
+                codes[position] = slot[1]
+
+        return tuple(codes)
+
+    def components_of(self, codes: SelectionVector) -> Dict[str, BikeComponent]:
+        return {
+            category: components[code]
+            for category, components, code in zip(self.categories, self.components, codes)
+            if code != MISSING
+        }
+
+    def ids_of(self, codes: SelectionVector) -> Dict[str, str]:
+        return {category: component.id for category, component in self.components_of(codes).items()}
+
+    def layout(self) -> Dict[str, Tuple[str, ...]]:
+        # Component IDs in code order, per category; equal layouts encode
+        # every selection to the same vector.
+        return {category: tuple(component.id for component in components) for category, components in zip(self.categories, self.components)}
+
+class LookupCategoryIndex(CategoryIndex):
+    # The same codes as a CategoryIndex over the same catalogue, read from a
+    # store's indexed lookup: each call fetches only the components it
+    # names, so the index holds nothing per component.
+
+    def __init__(self, lookup: ComponentLookup):
+        self.lookup = lookup
+        self.categories: Tuple[str, ...] = tuple(lookup.categories)
+        self.empty: SelectionVector = (MISSING,) * len(self.categories)
+
+    def encode_ids(self, component_ids: Iterable[str]) -> SelectionVector:
+        component_ids = list(component_ids)
+        slots = self.lookup.slots(component_ids)
+        codes = list(self.empty)
+
+        for component_id in component_ids:
+            slot = slots.get(component_id)
+            if slot is not None:
+                codes[slot[0]] = slot[1]
+
+        return tuple(codes)
+
+    def encode(self, selection_ids: Dict[str, str]) -> SelectionVector:
+        slots = self.lookup.slots(selection_ids.values())
+        codes = list(self.empty)
+
+        for position, category in enumerate(self.categories):
+            slot = slots.get(selection_ids.get(category))
+            if slot is not None and slot[0] == position:
+                codes[position] = slot[1]
+
+        return tuple(codes)
+
+    def components_of(self, codes: SelectionVector) -> Dict[str, BikeComponent]:
+        wanted = [(position, code) for position, code in enumerate(codes) if code != MISSING]
+        found = self.lookup.components_at(wanted)
+        return {self.categories[slot[0]]: found[slot] for slot in wanted if slot in found}
+
+    def layout(self) -> Dict[str, Tuple[str, ...]]:
+        return {category: tuple(component.id for component in self.lookup.components_in_category(category)) for category in self.categories}
@@ -0,0 +1,191 @@
+from typing import Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+from server.components.abc_components import BikeComponent
+from .compatibility_index import CompatibilityIndex, CompiledCondition
+from .pricing.pricing_rule_applicator import FIXED_PRICE, PERCENT_OFF, CompiledPricingRule, PricingRuleApplicator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class ColumnarCatalogue:
+    # Rows are grouped by category in catalogue order, so every category is a
+    # contiguous slice of the arrays and a component's ID code is its row.
+
+    def __init__(self, components_by_category: Dict[str, List[BikeComponent]]):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar catalogue store.")
+
+        self.categories: Tuple[str, ...] = tuple(components_by_category)
+        self.components: List[BikeComponent] = [
+            component for components in components_by_category.values() for component in components
+        ]
+        self.row_by_id: Dict[str, int] = {component.id: row for row, component in enumerate(self.components)}
+
+        self.prices = np.array([component.price for component in self.components], dtype=np.float64)
+        self.id_codes = np.arange(len(self.components), dtype=np.int32)
+        self.category_codes = np.repeat(
+            np.arange(len(self.categories), dtype=np.int32),
+            [len(components) for components in components_by_category.values()],
+        )
+
+        bounds = np.concatenate(([0], np.cumsum([len(components) for components in components_by_category.values()])))
+        self._slices: Dict[str, slice] = {
+            category: slice(int(bounds[code]), int(bounds[code + 1])) for code, category in enumerate(self.categories)
+        }
+        self._condition_masks: Dict[CompiledCondition, "np.ndarray"] = {}
+        # A rule-only edit keeps the columnar store, so bounds are kept per
+        # rule set for as long as its snapshot lives.
+        self._bounds: "WeakKeyDictionary[PricingRuleApplicator, Tuple]" = WeakKeyDictionary()
+
+    def category_slice(self, category: str) -> slice:
+        return self._slices.get(category, slice(0, 0))
+
+    def to_components(self, rows) -> List[BikeComponent]:
+        return [self.components[row] for row in rows]
+
+    def filter(self, category: Optional[str] = None, min_price: Optional[float] = None, max_price: Optional[float] = None, prices=None) -> List[BikeComponent]:
+        prices = self.prices if prices is None else prices
+        mask = np.ones(len(self.components), dtype=bool)
+
+        if category is not None:
+            if category not in self._slices:
+                return []
+            mask &= self.category_codes == self.categories.index(category)
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+
+        return self.to_components(np.flatnonzero(mask))
+
+    def min_price_by_category(self, prices=None) -> Dict[str, float]:
+        prices = self.prices if prices is None else prices
+        return {
+            category: float(prices[self._slices[category]].min())
+            for category in self.categories
+            if self._slices[category].stop > self._slices[category].start
+        }
+
+    def reprice(self, rule_applicator: PricingRuleApplicator):
+        # Price vector under a rule set: each component's list price after the
+        # rules it triggers on its own (no selectors, or only itself), applied
+        # in the engine's order one rule at a time over all its target rows.
+        # Rules that depend on other selected parts have no per-SKU price and
+        # are left to bike pricing. The catalogue itself is never modified.
+        prices = self.prices.copy()
+        rules = sorted((rule for rule in rule_applicator.compiled_rules if not rule.is_combo), key=lambda rule: rule.sort_key)
+
+        for rule in rules:
+            rows = self._target_rows(rule)
+            if rule.selectors:
+                if len(set(rule.selectors)) != 1 or rule.selectors[0][0] != rule.target_category:
+                    continue
+                rows = [row for row in rows if self.components[row].id == rule.selectors[0][1]]
+
+            if rule.effect_type == FIXED_PRICE:
+                prices[rows] = rule.value
+            elif rule.effect_type == PERCENT_OFF:
+                prices[rows] *= 1 - rule.value / 100
+            else:
+                prices[rows] = np.maximum(prices[rows] - rule.value, 0.0)
+
+        return prices
+
+    def _target_rows(self, rule: CompiledPricingRule) -> List[int]:
+        rows = self.category_slice(rule.target_category)
+        if not rule.target_id:
+            return list(range(rows.start, rows.stop))
+        return [self.row_by_id[rule.target_id]] if self._in_slice(rule.target_id, rows) else []
+
+    def price_bounds(self, rule_applicator: PricingRuleApplicator):
+        # Per row, the lowest and highest final price under the rules; see
+        # PricingRuleApplicator.price_bounds. Computed once per rule set.
+        bounds = self._bounds.get(rule_applicator)
+        if bounds is None:
+            pairs = np.array([rule_applicator.price_bounds(component) for component in self.components], dtype=np.float64).reshape(-1, 2)
+            bounds = self._bounds[rule_applicator] = (pairs[:, 0], pairs[:, 1])
+        return bounds
+
+    def _condition_mask(self, condition: CompiledCondition):
+        # Boolean mask over the affected category's slice: True where allowed.
+        mask = self._condition_masks.get(condition)
+
+        if mask is None:
+            rows = self.category_slice(condition.affects_category)
+            mask = np.ones(rows.stop - rows.start, dtype=bool)
+
+            if condition.include is not None:
+                mask[:] = False
+                mask[[self.row_by_id[i] - rows.start for i in condition.include if self._in_slice(i, rows)]] = True
+            if condition.exclude is not None:
+                mask[[self.row_by_id[i] - rows.start for i in condition.exclude if self._in_slice(i, rows)]] = False
+
+            self._condition_masks[condition] = mask
+
+        return mask
+
+    def _in_slice(self, component_id: str, rows: slice) -> bool:
+        row = self.row_by_id.get(component_id)
+        return row is not None and rows.start <= row < rows.stop
+
+    def allowed_rows(self, category: str, selected: List[BikeComponent], compatibility_index: CompatibilityIndex):
+        rows = self.category_slice(category)
+        mask = np.ones(rows.stop - rows.start, dtype=bool)
+
+        for component in selected:
+            for condition in compatibility_index.triggered_by(component):
+                if condition.affects_category == category:
+                    mask &= self._condition_mask(condition)
+
+        return np.flatnonzero(mask) + rows.start
+
+    def cheapest_valid_bike(self, compatibility_index: CompatibilityIndex, rule_applicator: PricingRuleApplicator) -> Optional[Tuple[Dict[str, str], float]]:
+        # Branch and bound under the pricing rules: candidates are taken by
+        # their lowest possible final price, a branch is dropped once that
+        # bound cannot beat the best complete bike, and complete bikes are
+        # priced by the rule engine itself.
+        floors, ceilings = self.price_bounds(rule_applicator)
+        categories = [category for category in self.categories if self._slices[category].stop > self._slices[category].start]
+        floor = [float(floors[self._slices[category]].min()) for category in categories]
+        combo_floor, _ = rule_applicator.combo_bounds({
+            category: (category_floor, float(ceilings[self._slices[category]].max()))
+            for category, category_floor in zip(categories, floor)
+        })
+        remaining_floor = [sum(floor[depth:]) + combo_floor for depth in range(len(categories) + 1)]
+
+        best: List = [None, float("inf")]
+        selected: List[BikeComponent] = []
+
+        def search(depth: int, subtotal: float):
+            if depth == len(categories):
+                price = rule_applicator.apply_rules(selected)
+                if price < best[1]:
+                    best[0], best[1] = list(selected), price
+                return
+
+            rows = self.allowed_rows(categories[depth], selected, compatibility_index)
+            for row in rows[np.argsort(floors[rows], kind="stable")]:
+                row_floor = float(floors[row])
+                if subtotal + row_floor + remaining_floor[depth + 1] >= best[1]:
+                    break
+
+                candidate = self.components[row]
+                selected_by_category = {component.category: component for component in selected}
+                if not all(
+                    condition.allows(selected_by_category[condition.affects_category].id)
+                    for condition in compatibility_index.triggered_by(candidate)
+                    if condition.affects_category in selected_by_category
+                ):
+                    continue
+
+                selected.append(candidate)
+                search(depth + 1, subtotal + row_floor)
+                selected.pop()
+
+        search(0, 0.0)
+
+        if best[0] is None:
+            return None
+        return {component.category: component.id for component in best[0]}, best[1]
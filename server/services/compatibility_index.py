@@ -0,0 +1,151 @@
+from dataclasses import dataclass, replace
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from server.components.abc_components import BikeComponent
+from .rule_diff import rule_keys
+
+SelectorKey = Tuple[str, str]
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    order: Tuple[int, int]
+    rule_id: str
+    selector_category: str
+    selector_id: str
+    affects_category: str
+    include: Optional[FrozenSet[str]] = None
+    include_values: Tuple[str, ...] = ()
+    exclude: Optional[FrozenSet[str]] = None
+
+    def allows(self, component_id: str) -> bool:
+        if self.include is not None and component_id not in self.include:
+            return False
+        if self.exclude is not None and component_id in self.exclude:
+            return False
+        return True
+
+    def violations(self, component_id: str) -> List[str]:
+        errors = []
+
+        if self.include is not None and component_id not in self.include:
+            errors.append(
+                f"({self.rule_id}): The selection of {self.selector_id} requires "
+                f"{self.affects_category} to be one of {list(self.include_values)}, but component ID is '{component_id}'."
+            )
+
+        if self.exclude is not None and component_id in self.exclude:
+            errors.append(
+                f"({self.rule_id}): The selection of {self.selector_id} does not allow "
+                f"{self.affects_category} to be '{component_id}'."
+            )
+
+        return errors
+
+class CompatibilityIndex:
+
+    def __init__(self, rules: List[Dict], previous: Optional["CompatibilityIndex"] = None, changed_keys: AbstractSet[str] = frozenset()):
+        by_selector: Dict[SelectorKey, List[CompiledCondition]] = {}
+        # Conditions of every rule by its rule_id key, so a later rule set
+        # only recompiles the rules that changed.
+        self.conditions_by_rule: Dict[str, Tuple[CompiledCondition, ...]] = {}
+
+        for rule_index, (rule_key, rule) in enumerate(zip(rule_keys(rules), rules)):
+            if previous is not None and rule_key not in changed_keys and rule_key in previous.conditions_by_rule:
+                conditions = previous.conditions_by_rule[rule_key]
+                if any(condition.order[0] != rule_index for condition in conditions):
+                    conditions = tuple(replace(condition, order=(rule_index, condition.order[1])) for condition in conditions)
+            else:
+                conditions = tuple(self._compile_rule(rule_index, rule))
+
+            self.conditions_by_rule[rule_key] = conditions
+            for condition in conditions:
+                key = (condition.selector_category, condition.selector_id)
+                by_selector.setdefault(key, []).append(condition)
+
+        self.conditions_by_selector: Dict[SelectorKey, Tuple[CompiledCondition, ...]] = {
+            key: tuple(conditions) for key, conditions in by_selector.items()
+        }
+
+    @staticmethod
+    def _compile_rule(rule_index: int, rule: Dict) -> List[CompiledCondition]:
+        compiled = []
+        rule_id = rule.get("rule_id", "N/A")
+        affects_category = rule.get("affects_category")
+
+        if not affects_category:
+            return compiled
+
+        for condition_index, condition_set in enumerate(rule.get("conditions", [])):
+            selector = condition_set.get("selector", {})
+            rule_details = condition_set.get("result_set", {}).get(affects_category, {})
+
+            selector_category = selector.get("category")
+            selector_id = selector.get("id")
+
+            if not selector_category or selector_id is None:
+                continue
+            if "include" not in rule_details and "exclude" not in rule_details:
+                continue
+
+            include_values = rule_details.get("include")
+            exclude_values = rule_details.get("exclude")
+
+            compiled.append(CompiledCondition(
+                order=(rule_index, condition_index),
+                rule_id=rule_id,
+                selector_category=selector_category,
+                selector_id=selector_id,
+                affects_category=affects_category,
+                include=frozenset(include_values) if include_values is not None else None,
+                include_values=tuple(include_values or ()),
+                exclude=frozenset(exclude_values) if exclude_values is not None else None,
+            ))
+
+        return compiled
+
+    def triggered_by(self, component: BikeComponent) -> Tuple[CompiledCondition, ...]:
+        return self.conditions_by_selector.get((component.category, component.id), ())
+
+    def restrictions_on(self, category: str, selected: Iterable[BikeComponent]) -> List[CompiledCondition]:
+        return [
+            condition
+            for component in selected
+            for condition in self.triggered_by(component)
+            if condition.affects_category == category
+        ]
+
+    def conflicts_with(self, candidate: BikeComponent, selection_by_category: Dict[str, BikeComponent]) -> List[CompiledCondition]:
+        # Rules fired by the candidate itself that an already selected
+        # component (or the candidate, for same-category rules) breaks.
+        conflicts = []
+
+        for condition in self.triggered_by(candidate):
+            if condition.affects_category == candidate.category:
+                target = candidate
+            else:
+                target = selection_by_category.get(condition.affects_category)
+
+            if target and not condition.allows(target.id):
+                conflicts.append(condition)
+
+        return conflicts
+
+    def check(self, selection_by_category: Dict[str, BikeComponent]) -> List[str]:
+        triggered: List[CompiledCondition] = []
+
+        for component in selection_by_category.values():
+            triggered.extend(self.triggered_by(component))
+
+        if not triggered:
+            return []
+
+        # Report violations in rule-file order, exactly like a linear scan would.
+        triggered.sort(key=lambda condition: condition.order)
+
+        errors = []
+        for condition in triggered:
+            component_to_validate = selection_by_category.get(condition.affects_category)
+
+            if component_to_validate:
+                errors.extend(condition.violations(component_to_validate.id))
+
+        return errors
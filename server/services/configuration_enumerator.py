@@ -0,0 +1,162 @@
+import bisect
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from server.components.abc_components import BikeComponent
+from .catalogue_gateway import CatalogueGateway
+from .pricing.pricing_rule_applicator import PricingRuleApplicator
+
+PricedSelection = Tuple[Dict[str, str], float]
+
+class ConfigurationEnumerator:
+    # Backtracking search over the catalogue categories. A branch is cut as
+    # soon as the component just added violates a rule with the components
+    # already chosen, so invalid parts of the Cartesian product are skipped.
+
+    def __init__(self, gateway: CatalogueGateway, rule_applicator: Optional[PricingRuleApplicator] = None, categories: Optional[Sequence[str]] = None):
+        self.gateway = gateway
+        self.compatibility_index = gateway.compatibility_index
+        self.rule_applicator = rule_applicator or gateway.pricing_rule_applicator
+        self.categories: Tuple[str, ...] = tuple(categories or gateway.components_by_category)
+        self._bounds: Dict[str, Tuple[float, float]] = {}
+
+    def _pool(self, category: str, fixed: Dict[str, str]) -> List[BikeComponent]:
+        if category in fixed:
+            component = self.gateway.components_by_id.get(fixed[category])
+            return [component] if component and component.category == category else []
+        return self.gateway.components_by_category.get(category, [])
+
+    def _candidates(self, category: str, selected: Dict[str, BikeComponent], fixed: Dict[str, str]) -> List[BikeComponent]:
+        # Rules fired by the components already chosen restrict this category.
+        restrictions = self.compatibility_index.restrictions_on(category, selected.values())
+
+        return [
+            component for component in self._pool(category, fixed)
+            if all(condition.allows(component.id) for condition in restrictions)
+            and not self.compatibility_index.conflicts_with(component, selected)
+        ]
+
+    def _price_bounds(self, component: BikeComponent) -> Tuple[float, float]:
+        bounds = self._bounds.get(component.id)
+        if bounds is None:
+            bounds = self._bounds[component.id] = self.rule_applicator.price_bounds(component)
+        return bounds
+
+    def iter_valid(self, fixed: Optional[Dict[str, str]] = None) -> Iterator[PricedSelection]:
+        fixed = fixed or {}
+        selected: Dict[str, BikeComponent] = {}
+
+        def search(depth: int) -> Iterator[PricedSelection]:
+            if depth == len(self.categories):
+                components = list(selected.values())
+                yield {c.category: c.id for c in components}, self.rule_applicator.apply_rules(components)
+                return
+
+            category = self.categories[depth]
+            for candidate in self._candidates(category, selected, fixed):
+                selected[category] = candidate
+                yield from search(depth + 1)
+                del selected[category]
+
+        return search(0)
+
+    def _best(self, k: int, fixed: Optional[Dict[str, str]], sign: int) -> List[PricedSelection]:
+        # The k bikes with the lowest sign * price, by branch and bound: a
+        # branch is dropped once the lowest score it could still reach, from
+        # the pricing rules' per-component bounds, cannot beat the k-th best
+        # bike found so far. Candidates are tried best bound first; ties go
+        # to the bike iter_valid yields first, as heapq.nsmallest would.
+        fixed = fixed or {}
+        if k <= 0:
+            return []
+
+        def optimistic(component: BikeComponent) -> float:
+            low, high = self._price_bounds(component)
+            return low if sign > 0 else -high
+
+        def combo_optimistic() -> float:
+            low, high = self.rule_applicator.combo_bounds(bounds_by_category, selected)
+            return low if sign > 0 else -high
+
+        pools = [self._pool(category, fixed) for category in self.categories]
+        if not all(pools):
+            return []
+
+        # Price range per category, narrowed to the chosen component's own
+        # bounds as the search goes down, so combos are bounded per branch.
+        bounds_by_category = {
+            category: (min(self._price_bounds(c)[0] for c in pool), max(self._price_bounds(c)[1] for c in pool))
+            for category, pool in zip(self.categories, pools)
+        }
+        category_best = [min(optimistic(c) for c in pool) for pool in pools]
+        remaining = [sum(category_best[depth:]) for depth in range(len(pools) + 1)]
+        # A bike's position in iter_valid order: its index in every pool.
+        positions = [{c.id: position for position, c in enumerate(pool)} for pool in pools]
+        selected: Dict[str, BikeComponent] = {}
+        path: List[int] = []
+        any_combo = combo_optimistic()
+        has_combos = bool(self.rule_applicator.combo_rules)
+
+        # The k best so far as (score, position, priced), best first.
+        best: List[Tuple[float, Tuple[int, ...], PricedSelection]] = []
+
+        def beaten(bound: float) -> bool:
+            # No bike under the current path can enter the k best.
+            if len(best) < k:
+                return False
+            score, position, _ = best[-1]
+            return bound > score or (bound == score and tuple(path) > position[:len(path)])
+
+        def search(depth: int, subtotal: float) -> None:
+            if depth == len(self.categories):
+                components = list(selected.values())
+                price = self.rule_applicator.apply_rules(components)
+                entry = (sign * price, tuple(path), ({c.category: c.id for c in components}, price))
+                if len(best) < k or entry[:2] < best[-1][:2]:
+                    bisect.insort(best, entry)
+                    del best[k:]
+                return
+
+            category = self.categories[depth]
+            category_bounds = bounds_by_category[category]
+            candidates = sorted(self._candidates(category, selected, fixed), key=optimistic)
+            for candidate in candidates:
+                reachable = subtotal + optimistic(candidate)
+                path.append(positions[depth][candidate.id])
+                selected[category] = candidate
+                bounds_by_category[category] = self._price_bounds(candidate)
+
+                bound = reachable + remaining[depth + 1]
+                if not beaten(bound + any_combo) and not (has_combos and beaten(bound + combo_optimistic())):
+                    search(depth + 1, reachable)
+
+                del selected[category]
+                path.pop()
+
+            bounds_by_category[category] = category_bounds
+
+        search(0, 0.0)
+        return [priced for _, _, priced in best]
+
+    def price_range(self, fixed: Optional[Dict[str, str]] = None) -> Optional[Tuple[float, float]]:
+        cheapest = self.cheapest(1, fixed)
+        if not cheapest:
+            return None
+        return cheapest[0][1], self.most_expensive(1, fixed)[0][1]
+
+    def cheapest(self, k: int, fixed: Optional[Dict[str, str]] = None) -> List[PricedSelection]:
+        return self._best(k, fixed, 1)
+
+    def most_expensive(self, k: int, fixed: Optional[Dict[str, str]] = None) -> List[PricedSelection]:
+        return self._best(k, fixed, -1)
+
+    def from_prices(self, category: str) -> Dict[str, float]:
+        # Cheapest valid bike for each component of a category ("from €X").
+        if category not in self.categories:
+            raise ValueError(f"Unknown category '{category}'.")
+
+        prices: Dict[str, float] = {}
+        for component in self.gateway.components_by_category.get(category, []):
+            cheapest = self.cheapest(1, {category: component.id})
+            if cheapest:
+                prices[component.id] = cheapest[0][1]
+
+        return prices
@@ -0,0 +1,66 @@
+import dataclasses
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+# Below this size the compressed variant is rarely smaller than the headers it saves.
+COMPRESSION_MIN_BYTES = 512
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def encode_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+@dataclass(frozen=True)
+class EncodedPayload:
+    body: bytes
+    etag: str
+    variants: Dict[str, bytes] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def from_object(cls, obj: Any) -> "EncodedPayload":
+        return cls.from_bytes(encode_json(obj))
+
+    @classmethod
+    def from_bytes(cls, body: bytes) -> "EncodedPayload":
+        variants = {}
+
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            variants[GZIP] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants[BROTLI] = brotli.compress(body, quality=11)
+
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', variants=variants)
+
+    def etag_for(self, encoding: str) -> str:
+        if encoding == IDENTITY:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def content_for(self, encoding: str) -> Optional[bytes]:
+        if encoding == IDENTITY:
+            return self.body
+        return self.variants.get(encoding)
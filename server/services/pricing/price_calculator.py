@@ -1,29 +1,16 @@
-from typing import List
+from typing import List, Sequence
 from server.bike.models import Bike
 from .price_strategy import PricingStrategy
 from server.components.abc_components import BikeComponent
 
 class PriceCalculator:
+    # Holds no per-request state: the bike or its components are always passed
+    # in, so a single instance can be shared by concurrent requests.
     def __init__(self, strategy: PricingStrategy):
-        self.bike = None
         self.strategy = strategy
-        
-    def set_bike_instance(self, bike_instance: Bike):
-        self.bike = bike_instance
 
-    def get_selected_components(self) -> List[BikeComponent]:
-        components = []
-        
-        component_keys = ["frame_type", "frame_finish", "wheels", "rim_color", "chain"]
-        
-        for key in component_keys:
-            component = getattr(self.bike, key, None)
-            
-            if component and isinstance(component, BikeComponent):
-                components.append(component)
-        
-        return components
+    def get_selected_components(self, bike: Bike) -> List[BikeComponent]:
+        return [component for component in bike.components.values() if isinstance(component, BikeComponent)]
 
-    def process_calculation(self) -> float:
-        return self.strategy.calculate(self.get_selected_components())
-        
\ No newline at end of file
+    def process_calculation(self, components: Sequence[BikeComponent]) -> float:
+        return self.strategy.calculate(list(components))
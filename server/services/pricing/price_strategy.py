@@ -12,7 +12,7 @@ class StandardPricingStrategy(PricingStrategy):
     def calculate(self, components: List[BikeComponent]) -> float:
         return sum(c.price for c in components)
 
-class ComboPricingStrategy(PricingStrategy):
+class ComboPricingStrategy(StandardPricingStrategy):
     def calculate(self, components: List[BikeComponent]) -> float:
         base_price = super().calculate(components)
 
@@ -0,0 +1,227 @@
+import bisect
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"BKPT"
+FORMAT_VERSION = 2
+
+# magic, format version, catalogue version, metadata length, number of entries
+HEADER = struct.Struct("<4sH16sIQ")
+# Only valid configurations are stored: their codes ascending, then their
+# prices in the same order, both little-endian 8-byte values.
+ENTRY_SIZE = 8
+
+class SelectionCodec:
+    # Packs a full selection into one integer: the mixed-radix number whose
+    # digits are each component's position within its category.
+
+    def __init__(self, categories: Sequence[str], ids_by_category: Dict[str, Sequence[str]]):
+        self.categories: Tuple[str, ...] = tuple(categories)
+        self.ids_by_category: Dict[str, Tuple[str, ...]] = {
+            category: tuple(ids_by_category[category]) for category in self.categories
+        }
+        self._index_by_category: Dict[str, Dict[str, int]] = {
+            category: {component_id: index for index, component_id in enumerate(ids)}
+            for category, ids in self.ids_by_category.items()
+        }
+
+        self.radices: Tuple[int, ...] = tuple(len(self.ids_by_category[category]) for category in self.categories)
+        self.strides: Tuple[int, ...] = tuple(math.prod(self.radices[position + 1:]) for position in range(len(self.radices)))
+        self.size = math.prod(self.radices) if self.radices else 0
+
+    @classmethod
+    def from_catalogue(cls, components_by_category: Dict[str, List]) -> "SelectionCodec":
+        return cls(
+            list(components_by_category),
+            {category: [component.id for component in components] for category, components in components_by_category.items()},
+        )
+
+    def encode(self, selection: Dict[str, str]) -> Optional[int]:
+        code = 0
+
+        for category, stride in zip(self.categories, self.strides):
+            index = self._index_by_category[category].get(selection.get(category))
+            if index is None:
+                return None
+            code += index * stride
+
+        return code
+
+    def encode_vector(self, codes: Sequence[int]) -> Optional[int]:
+        # Component codes in this codec's category order, as produced by a
+        # CategoryIndex with the same layout.
+        if -1 in codes:
+            return None
+        return sum(index * stride for index, stride in zip(codes, self.strides))
+
+    def decode(self, code: int) -> Dict[str, str]:
+        selection = {}
+
+        for category, stride, radix in zip(self.categories, self.strides, self.radices):
+            selection[category] = self.ids_by_category[category][(code // stride) % radix]
+
+        return selection
+
+    def to_metadata(self) -> Dict:
+        return {"categories": list(self.categories), "ids_by_category": {k: list(v) for k, v in self.ids_by_category.items()}}
+
+class PriceTableWriter:
+    # Collects (code, price) runs and writes them, merged in code order, on
+    # close. The file grows with the number of valid configurations, not
+    # with the size of the Cartesian product. Workers may have the current
+    # table mapped, so it is written next to it and renamed over it.
+
+    def __init__(self, path: Path, codec: SelectionCodec, catalogue_version: str):
+        self.path = Path(path)
+        self.codec = codec
+        self.catalogue_version = catalogue_version
+        self._runs: List[Tuple[array, array]] = []
+
+    def write(self, codes: Iterable[int], prices: Iterable[float]) -> None:
+        codes, prices = array("Q", codes), array("d", prices)
+        if any(previous >= code for previous, code in zip(codes, codes[1:])):
+            pairs = sorted(zip(codes, prices))
+            codes, prices = array("Q", (code for code, _ in pairs)), array("d", (price for _, price in pairs))
+        self._runs.append((codes, prices))
+
+    def close(self) -> None:
+        metadata = json.dumps(self.codec.to_metadata(), separators=(",", ":")).encode()
+        data_offset = _align(HEADER.size + len(metadata))
+        entries = sum(len(codes) for codes, _ in self._runs)
+        merged = heapq.merge(*(zip(codes, prices) for codes, prices in self._runs))
+        codes, prices = array("Q"), array("d")
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.catalogue_version.encode()[:16], len(metadata), entries))
+                f.write(metadata.ljust(data_offset - HEADER.size, b"\0"))
+
+                # Codes are streamed out in chunks; prices wait for the last one.
+                for code, price in merged:
+                    codes.append(code)
+                    prices.append(price)
+                    if len(codes) == 65536:
+                        _write_little_endian(f, codes)
+                        del codes[:]
+                _write_little_endian(f, codes)
+                _write_little_endian(f, prices)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            self._runs = []
+
+    def discard(self) -> None:
+        # A failed run leaves the published table as it was.
+        self._runs = []
+
+class PriceTable:
+    # Read-only view of a table file. A selection's price is found by binary
+    # search over the mapped codes, so pages are shared between workers and
+    # only the ones a lookup touches are read.
+
+    def __init__(self, path: Path):
+        self._views: Tuple[memoryview, ...] = ()
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read(path)
+        except (struct.error, KeyError, TypeError, ValueError) as e:
+            self.close()
+            raise ValueError(f"{path} is not a valid price table: {e}") from e
+
+    def _read(self, path: Path) -> None:
+        magic, format_version, catalogue_version, metadata_length, entries = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"not a price table in format version {FORMAT_VERSION}")
+
+        metadata = json.loads(self._map[HEADER.size:HEADER.size + metadata_length])
+        self.catalogue_version = catalogue_version.rstrip(b"\0").decode()
+        self.codec = SelectionCodec(metadata["categories"], metadata["ids_by_category"])
+        self.entries = entries
+        # Components whose rules changed since the table was built; their
+        # selections fall back to the live pricing pipeline.
+        self.excluded_ids: FrozenSet[str] = frozenset()
+
+        codes_offset = _align(HEADER.size + metadata_length)
+        prices_offset = codes_offset + entries * ENTRY_SIZE
+        if len(self._map) < prices_offset + entries * ENTRY_SIZE:
+            raise ValueError("truncated or does not match its metadata")
+        if sys.byteorder != "little":
+            raise ValueError("tables are little-endian and this host is not")
+
+        view = memoryview(self._map)
+        self._codes = view[codes_offset:prices_offset].cast("Q")
+        self._prices = view[prices_offset:prices_offset + entries * ENTRY_SIZE].cast("d")
+        self._views = (self._codes, self._prices, view)
+
+    def price_of_code(self, code: int) -> Optional[float]:
+        position = bisect.bisect_left(self._codes, code)
+        if position < self.entries and self._codes[position] == code:
+            return self._prices[position]
+        return None
+
+    def lookup(self, selection: Dict[str, str]) -> Optional[float]:
+        if self.excluded_ids and not self.excluded_ids.isdisjoint(selection.values()):
+            return None
+        code = self.codec.encode(selection)
+        if code is None:
+            return None
+        return self.price_of_code(code)
+
+    def lookup_vector(self, codes: Sequence[int], component_ids: Iterable[str]) -> Optional[float]:
+        if self.excluded_ids and not self.excluded_ids.isdisjoint(component_ids):
+            return None
+        code = self.codec.encode_vector(codes)
+        if code is None:
+            return None
+        return self.price_of_code(code)
+
+    def close(self) -> None:
+        # The map cannot close while views of it are still exported.
+        for view in self._views:
+            view.release()
+        self._views = ()
+        self._map.close()
+
+def open_price_table(path: Optional[str], catalogue_version: str, rule_changes_since: Optional[Dict[str, Optional[FrozenSet[str]]]] = None) -> Optional[PriceTable]:
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        table = PriceTable(Path(path))
+    except (OSError, ValueError) as e:
+        print(f"ERROR: price table {path} could not be opened: {e}")
+        return None
+
+    # A table built before rule-only edits still serves every selection
+    # that holds none of the components those edits touched.
+    changed_ids = (rule_changes_since or {}).get(table.catalogue_version)
+    if table.catalogue_version != catalogue_version and changed_ids is not None:
+        table.excluded_ids = changed_ids
+    elif table.catalogue_version != catalogue_version:
+        print(f"ERROR: price table {path} was built for catalogue {table.catalogue_version}, not {catalogue_version}")
+        table.close()
+        return None
+
+    return table
+
+def _write_little_endian(f, values: array) -> None:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    f.write(values.tobytes())
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
@@ -1,39 +1,251 @@
-from typing import List, Dict
+import math
+from dataclasses import dataclass, replace
+from typing import AbstractSet, Dict, List, Optional, Tuple
 from server.components.abc_components import BikeComponent
+from ..metrics import metrics
+from ..rule_diff import rule_keys
+
+FIXED_PRICE = "FIXED_PRICE"
+PERCENT_OFF = "PERCENT_OFF"
+AMOUNT_OFF = "AMOUNT_OFF"
+COMBO_PRICE = "COMBO_PRICE"
+
+# Rules run in ascending priority, then in file order. Unless a rule sets its
+# own "priority", prices are fixed first and discounts are taken afterwards.
+DEFAULT_PRIORITIES = {
+    FIXED_PRICE: 100,
+    COMBO_PRICE: 200,
+    PERCENT_OFF: 300,
+    AMOUNT_OFF: 400,
+}
+
+SelectorKey = Tuple[str, str]
+
+@dataclass(frozen=True)
+class CompiledPricingRule:
+    order: int
+    rule_id: str
+    priority: int
+    selectors: Tuple[SelectorKey, ...]
+    effect_type: str
+    value: float
+    target_category: Optional[str] = None
+    target_id: Optional[str] = None
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        return (self.priority, self.order)
+
+    @property
+    def is_combo(self) -> bool:
+        return self.effect_type == COMBO_PRICE or not self.target_category
+
+    def matches(self, components_by_category: Dict[str, BikeComponent]) -> bool:
+        for category, required_id in self.selectors:
+            selected_component = components_by_category.get(category)
+            if not selected_component or selected_component.id != required_id:
+                return False
+        return True
+
+    def apply(self, price: float) -> float:
+        if self.effect_type in (FIXED_PRICE, COMBO_PRICE):
+            return self.value
+        if self.effect_type == PERCENT_OFF:
+            return price * (1 - self.value / 100)
+        return max(price - self.value, 0.0)
 
 class PricingRuleApplicator:
-    def __init__(self, pricing_rules: List[Dict]):
+    def __init__(self, pricing_rules: List[Dict], previous: Optional["PricingRuleApplicator"] = None, changed_keys: AbstractSet[str] = frozenset()):
         self.rules = pricing_rules
+        self.compiled_rules: List[CompiledPricingRule] = []
+        # Compiled form of every rule by its rule_id key (None when invalid),
+        # so a later rule set only recompiles the rules that changed.
+        self.compiled_by_key: Dict[str, Optional[CompiledPricingRule]] = {}
+
+        for order, (key, rule) in enumerate(zip(rule_keys(pricing_rules), pricing_rules)):
+            if previous is not None and key not in changed_keys and key in previous.compiled_by_key:
+                compiled = previous.compiled_by_key[key]
+                if compiled is not None and compiled.order != order:
+                    compiled = replace(compiled, order=order)
+            else:
+                compiled = self._compile_rule(order, rule)
+
+            self.compiled_by_key[key] = compiled
+            if compiled:
+                self.compiled_rules.append(compiled)
+
+        rules_by_selector: Dict[SelectorKey, List[CompiledPricingRule]] = {}
+        rules_by_target: Dict[str, List[CompiledPricingRule]] = {}
+        unconditional = []
+        combo = []
+
+        for compiled in self.compiled_rules:
+            if compiled.is_combo:
+                combo.append(compiled)
+            else:
+                rules_by_target.setdefault(compiled.target_category, []).append(compiled)
+
+            # A rule can only match when its first selector does, so indexing
+            # it under that single key is enough to find every candidate.
+            if compiled.selectors:
+                rules_by_selector.setdefault(compiled.selectors[0], []).append(compiled)
+            else:
+                unconditional.append(compiled)
+
+        self._rules_by_selector: Dict[SelectorKey, Tuple[CompiledPricingRule, ...]] = {
+            key: tuple(rules) for key, rules in rules_by_selector.items()
+        }
+        self._unconditional_rules = tuple(unconditional)
+        # Every rule that may change a category's price, whatever its
+        # selectors, in the order the engine applies them.
+        self._rules_by_target: Dict[str, Tuple[CompiledPricingRule, ...]] = {
+            category: tuple(sorted(rules, key=lambda rule: rule.sort_key)) for category, rules in rules_by_target.items()
+        }
+        self.combo_rules: Tuple[CompiledPricingRule, ...] = tuple(combo)
+
+    @staticmethod
+    def _compile_rule(order: int, rule: Dict) -> Optional[CompiledPricingRule]:
+        rule_id = rule.get("rule_id", "N/A")
+        effect = rule.get("effect", {})
+        effect_type = effect.get("type")
+
+        if effect_type not in DEFAULT_PRIORITIES:
+            print(f"ERROR: pricing rule {rule_id} has unsupported effect type {effect.get('type')}")
+            return None
+
+        try:
+            selectors = tuple(
+                (selector["category"], selector["id"])
+                for selector in rule.get("selectors", rule.get("selector", []))
+            )
+            value = float(effect["value"])
+            priority = int(rule.get("priority", DEFAULT_PRIORITIES[effect_type]))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"ERROR: pricing rule {rule_id} is malformed: {e}")
+            return None
+
+        return CompiledPricingRule(
+            order=order,
+            rule_id=rule_id,
+            priority=priority,
+            selectors=selectors,
+            effect_type=effect_type,
+            value=value,
+            target_category=effect.get("target_category"),
+            target_id=effect.get("target_id"),
+        )
+
+    def matching_rules(self, components_by_category: Dict[str, BikeComponent]) -> List[CompiledPricingRule]:
+        matched = list(self._unconditional_rules)
+        evaluated = len(matched)
+
+        for component in components_by_category.values():
+            for rule in self._rules_by_selector.get((component.category, component.id), ()):
+                evaluated += 1
+                if rule.matches(components_by_category):
+                    matched.append(rule)
+
+        if metrics.enabled:
+            metrics.inc("pricing_rules_evaluated_total", evaluated)
+            metrics.inc("pricing_rules_fired_total", len(matched))
+
+        matched.sort(key=lambda rule: rule.sort_key)
+        return matched
+
+    def rules_targeting(self, category: str) -> Tuple[CompiledPricingRule, ...]:
+        return self._rules_by_target.get(category, ())
+
+    def price_bounds(self, component: BikeComponent) -> Tuple[float, float]:
+        # Lowest and highest final price of the component whatever else is
+        # selected: any subset of the rules targeting it may fire. A fixed
+        # price sets a value, a discount only lowers a price and a surcharge
+        # (negative discount) only raises it, so every outcome lies between
+        # all discounts on the lowest start and all surcharges on the highest.
+        low = high = component.price
+        discount_factor = surcharge_factor = 1.0
+        discount = surcharge = 0.0
+
+        for rule in self.rules_targeting(component.category):
+            if rule.target_id and rule.target_id != component.id:
+                continue
+            if rule.effect_type == FIXED_PRICE:
+                low, high = min(low, rule.value), max(high, rule.value)
+            elif rule.effect_type == PERCENT_OFF:
+                factor = 1 - rule.value / 100
+                if factor < 0:
+                    # Over 100% off turns prices negative and order dependent.
+                    return -math.inf, math.inf
+                if factor < 1:
+                    discount_factor *= factor
+                else:
+                    surcharge_factor *= factor
+            elif rule.value >= 0:
+                discount += rule.value
+            else:
+                surcharge -= rule.value
+
+        if low < 0:
+            return -math.inf, math.inf
+        return max(low * discount_factor - discount, 0.0), (high + surcharge) * surcharge_factor
+
+    def combo_bounds(self, bounds_by_category: Dict[str, Tuple[float, float]], selected: Optional[Dict[str, BikeComponent]] = None) -> Tuple[float, float]:
+        # Range of the combo adjustment for a bike whose category prices lie
+        # within bounds_by_category. A combo's adjustment is monotonic in the
+        # combo price, so the ends of that price's range bound it; a combo
+        # may also not fire, which adjusts nothing. Components already
+        # selected settle whether a combo on them can still fire.
+        selected = selected or {}
+        low = high = 0.0
+
+        for rule in self.combo_rules:
+            categories = [category for category, _ in rule.selectors] or list(bounds_by_category)
+            if any(category not in bounds_by_category for category in categories):
+                continue
+            if any(category in selected and selected[category].id != component_id for category, component_id in rule.selectors):
+                continue
+            fires = all(category in selected for category, _ in rule.selectors)
+
+            combo_low = sum(bounds_by_category[category][0] for category in categories)
+            combo_high = sum(bounds_by_category[category][1] for category in categories)
+            if not (math.isfinite(combo_low) and math.isfinite(combo_high)):
+                return -math.inf, math.inf
+
+            adjustments = (rule.apply(combo_low) - combo_low, rule.apply(combo_high) - combo_high)
+            if not fires:
+                adjustments += (0.0,)
+            low += min(adjustments)
+            high += max(adjustments)
+
+        return low, high
+
+    def price_breakdown(self, components: List[BikeComponent]) -> Tuple[Dict[str, float], float]:
+        return self.selection_breakdown({c.category: c for c in components})
+
+    def selection_breakdown(self, components_by_category: Dict[str, BikeComponent]) -> Tuple[Dict[str, float], float]:
+        # Entry point for a selection already keyed by each component's own
+        # category, such as a decoded selection vector: no copy is made.
+        final_prices = {category: component.price for category, component in components_by_category.items()}
+        combo_adjustment = 0.0
+
+        for rule in self.matching_rules(components_by_category):
+            if rule.is_combo:
+                combo_categories = [category for category, _ in rule.selectors] or list(final_prices)
+                combo_price = sum(final_prices[category] for category in combo_categories)
+                combo_adjustment += rule.apply(combo_price) - combo_price
+                continue
+
+            current_target_comp = components_by_category.get(rule.target_category)
+
+            if current_target_comp:
+                if not rule.target_id or current_target_comp.id == rule.target_id:
+                    final_prices[rule.target_category] = rule.apply(final_prices[rule.target_category])
+
+        return final_prices, combo_adjustment
 
     def apply_rules(self, components: List[BikeComponent]) -> float:
-        final_prices = {c.category: c.price for c in components}
-        components_by_category = {c.category: c for c in components}
-
-        for rule in self.rules:
-            is_match = True
-            
-            for selector_condition in rule.get("selector", []):
-                category = selector_condition['category']
-                required_id = selector_condition['id']
-                
-                selected_component = components_by_category.get(category)
-                
-                if not selected_component or selected_component.id != required_id:
-                    is_match = False
-                    break
-            
-            if is_match:
-                effect = rule['effect']
-                target_cat = effect.get('target_category')
-                target_id = effect.get('target_id')
-                
-                current_target_comp = components_by_category.get(target_cat)
-                
-                if current_target_comp:
-                    if not target_id or current_target_comp.id == target_id:
-                        if effect['type'] == 'FIXED_PRICE':
-                            final_prices[target_cat] = effect['value']
-                    
-                    
-                                
-        return sum(final_prices.values())
\ No newline at end of file
+        final_prices, combo_adjustment = self.price_breakdown(components)
+        return sum(final_prices.values()) + combo_adjustment
+
+    def price_selection(self, components_by_category: Dict[str, BikeComponent]) -> float:
+        final_prices, combo_adjustment = self.selection_breakdown(components_by_category)
+        return sum(final_prices.values()) + combo_adjustment
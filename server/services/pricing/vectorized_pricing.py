@@ -0,0 +1,172 @@
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from server.components.abc_components import BikeComponent
+from ..category_index import MISSING, CategoryIndex
+from .pricing_rule_applicator import COMBO_PRICE, FIXED_PRICE, PERCENT_OFF, CompiledPricingRule, PricingRuleApplicator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# From Python 3.12 on, sum() compensates the rounding of float items
+# (Neumaier); int items are still added as they are.
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+class SelectionMatrixEncoder:
+    # One row per order, one int32 column per catalogue category holding the
+    # component's position within that category, or MISSING.
+
+    def __init__(self, components_by_category: Dict[str, List[BikeComponent]]):
+        if np is None:
+            raise RuntimeError("numpy is required for vectorized pricing.")
+
+        self.index = CategoryIndex(components_by_category)
+        self.categories: Tuple[str, ...] = self.index.categories
+        self.column_by_category = {category: column for column, category in enumerate(self.categories)}
+        self.index_by_category: Dict[str, Dict[str, int]] = {
+            category: {component.id: index for index, component in enumerate(components)}
+            for category, components in components_by_category.items()
+        }
+        self.prices_by_category: Dict[str, "np.ndarray"] = {
+            category: np.array([component.price for component in components], dtype=np.float64)
+            for category, components in components_by_category.items()
+        }
+        # sum() treats int and float prices differently, so remember which is which.
+        self.float_prices_by_category: Dict[str, "np.ndarray"] = {
+            category: np.array([isinstance(component.price, float) for component in components], dtype=bool)
+            for category, components in components_by_category.items()
+        }
+        self.components_by_category = components_by_category
+
+    def encode(self, selections: Iterable[Dict[str, str]]) -> "np.ndarray":
+        rows = [self.index.encode(selection) for selection in selections]
+        return np.array(rows, dtype=np.int32).reshape(len(rows), len(self.categories))
+
+    def code_of(self, category: str, component_id: Optional[str]) -> int:
+        return self.index_by_category.get(category, {}).get(component_id, MISSING)
+
+    def list_prices(self, codes: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        # Column per category; a missing component costs nothing.
+        prices = np.zeros(codes.shape, dtype=np.float64)
+        is_float = np.zeros(codes.shape, dtype=bool)
+        for column, category in enumerate(self.categories):
+            present = codes[:, column] != MISSING
+            prices[present, column] = self.prices_by_category[category][codes[present, column]]
+            is_float[present, column] = self.float_prices_by_category[category][codes[present, column]]
+        return prices, is_float
+
+    def components_of(self, row: "np.ndarray") -> List[BikeComponent]:
+        return [
+            self.components_by_category[category][code]
+            for category, code in zip(self.categories, row.tolist())
+            if code != MISSING
+        ]
+
+@dataclass
+class RuleImpact:
+    rule_id: str
+    matched_orders: int = 0
+    revenue_effect: float = 0.0
+
+@dataclass
+class RepricingResult:
+    totals: "np.ndarray"
+    impacts: Dict[str, RuleImpact] = field(default_factory=dict)
+
+class VectorizedPricer:
+    # Prices a whole selection matrix with one boolean mask per rule. Rules
+    # run in the same (priority, file order) sequence as apply_rules, every
+    # effect uses the same float operations, and totals are summed column by
+    # column in category order, so each row matches apply_rules exactly.
+
+    def __init__(self, encoder: SelectionMatrixEncoder, rule_applicator: PricingRuleApplicator):
+        self.encoder = encoder
+        self.rules: List[CompiledPricingRule] = sorted(rule_applicator.compiled_rules, key=lambda rule: rule.sort_key)
+
+    def _match_mask(self, codes: "np.ndarray", rule: CompiledPricingRule) -> "np.ndarray":
+        mask = np.ones(len(codes), dtype=bool)
+        for category, required_id in rule.selectors:
+            code = self.encoder.code_of(category, required_id)
+            if code == MISSING:
+                return np.zeros(len(codes), dtype=bool)
+            mask &= codes[:, self.encoder.column_by_category[category]] == code
+        return mask
+
+    @staticmethod
+    def _apply(rule: CompiledPricingRule, prices: "np.ndarray") -> "np.ndarray":
+        if rule.effect_type in (FIXED_PRICE, COMBO_PRICE):
+            return np.full(prices.shape, rule.value, dtype=np.float64)
+        if rule.effect_type == PERCENT_OFF:
+            return prices * (1 - rule.value / 100)
+        return np.maximum(prices - rule.value, 0.0)
+
+    def price(self, codes: "np.ndarray") -> RepricingResult:
+        final_prices, is_float = self.encoder.list_prices(codes)
+        present = codes != MISSING
+        combo_adjustment = np.zeros(len(codes), dtype=np.float64)
+        impacts: Dict[str, RuleImpact] = {}
+
+        for rule in self.rules:
+            mask = self._match_mask(codes, rule)
+            impact = impacts.setdefault(rule.rule_id, RuleImpact(rule.rule_id))
+
+            if rule.is_combo:
+                columns = [self.encoder.column_by_category[category] for category, _ in rule.selectors] or range(len(self.encoder.categories))
+                combo_price = builtin_sum(final_prices[mask], is_float[mask], present[mask], columns)
+                effect = self._apply(rule, combo_price) - combo_price
+                combo_adjustment[mask] = combo_adjustment[mask] + effect
+            else:
+                column = self.encoder.column_by_category.get(rule.target_category)
+                if column is None:
+                    continue
+                mask &= present[:, column]
+                if rule.target_id:
+                    mask &= codes[:, column] == self.encoder.code_of(rule.target_category, rule.target_id)
+                before = final_prices[mask, column]
+                after = self._apply(rule, before)
+                final_prices[mask, column] = after
+                is_float[mask, column] = True
+                effect = after - before
+
+            impact.matched_orders += int(mask.sum())
+            impact.revenue_effect += float(effect.sum())
+
+        totals = builtin_sum(final_prices, is_float, present, range(final_prices.shape[1]))
+        return RepricingResult(totals=totals + combo_adjustment, impacts=impacts)
+
+    def validate(self, codes: "np.ndarray", rule_applicator: PricingRuleApplicator, sample: Sequence[int]) -> List[int]:
+        # Rows of the sample where the vectorized total differs from apply_rules.
+        totals = self.price(codes[list(sample)]).totals
+        return [
+            row for row, total in zip(sample, totals.tolist())
+            if total != rule_applicator.apply_rules(self.encoder.components_of(codes[row]))
+        ]
+
+def builtin_sum(prices: "np.ndarray", is_float: "np.ndarray", present: "np.ndarray", columns: Iterable[int]) -> "np.ndarray":
+    # Row-wise sum() over the present columns, in column order, with the
+    # same float operations CPython's builtin performs: ints are added
+    # exactly, the first float is added plainly to switch to the float path,
+    # and only floats after it carry compensation.
+    total = np.zeros(len(prices), dtype=np.float64)
+    compensation = np.zeros(len(prices), dtype=np.float64)
+    float_path = np.zeros(len(prices), dtype=bool)
+
+    for column in columns:
+        x = prices[:, column]
+        included = present[:, column]
+        added = total + x
+
+        if COMPENSATED_SUM:
+            floats = included & is_float[:, column]
+            step = np.where(np.abs(total) >= np.abs(x), (total - added) + x, (x - added) + total)
+            compensation = np.where(floats & float_path, compensation + step, compensation)
+            float_path |= floats
+
+        total = np.where(included, added, total)
+
+    if COMPENSATED_SUM:
+        total = np.where((compensation != 0) & np.isfinite(compensation), total + compensation, total)
+
+    return total
@@ -0,0 +1,200 @@
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from hmac import compare_digest
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_HEADER = b"x-profile"
+PROFILED_PREFIXES = ("/price/check", "/catalogue/")
+# Long-lived streams would hold a profile open for their whole lifetime.
+UNPROFILED_PATHS = ("/catalogue/events",)
+
+Stack = Tuple[str, ...]
+
+@dataclass
+class ProfileSession:
+    path: str
+    thread_id: int
+    marker: FrameType
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+    samples: Counter = field(default_factory=Counter)
+    # Path of the .folded file once written, None if nothing was sampled.
+    written: Future = field(default_factory=Future)
+
+class RequestProfiler:
+    # Opt-in sampling profiler for single requests. A request is profiled
+    # when it carries the token in an X-Profile header, or is drawn at
+    # sample_rate while profiling is switched on. Without a token nothing
+    # is ever profiled and the middleware costs one attribute check.
+    #
+    # While any request is profiled a background thread samples the stack
+    # of the thread serving it every interval seconds. A sample belongs to
+    # the request only if the request's own middleware frame is on that
+    # stack, so other requests interleaved on the event loop are left out.
+    # Work handed to other threads (run_in_threadpool) is not sampled.
+    # Finished profiles are written by the same thread, so a request never
+    # waits on the disk.
+
+    def __init__(self, output_dir: Path, token: str = "", sample_rate: float = 0.01, interval: float = 0.001, max_profiles: int = 200, top_n: int = 25):
+        self.output_dir = Path(output_dir)
+        self.token = token.encode()
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self.top_n = top_n
+        self.profiled = 0
+        self.written = 0
+        self._sessions: Dict[int, Dict[FrameType, ProfileSession]] = {}
+        self._finished: List[ProfileSession] = []
+        self._names: Dict[CodeType, str] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._switch_interval: Optional[float] = None
+        self._sequence = itertools.count()
+
+    def wants(self, path: str, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if not self.token:
+            return False
+        if not path.startswith(PROFILED_PREFIXES) or path in UNPROFILED_PATHS:
+            return False
+        if self.enabled and random.random() < self.sample_rate:
+            return True
+        for name, value in headers:
+            if name == PROFILE_HEADER:
+                return compare_digest(value, self.token)
+        return False
+
+    def start(self, path: str, marker: FrameType) -> ProfileSession:
+        session = ProfileSession(path=path, thread_id=threading.get_ident(), marker=marker)
+
+        with self._lock:
+            self._sessions.setdefault(session.thread_id, {})[marker] = session
+            self.profiled += 1
+            if self._sampler is None:
+                # The sampler needs the GIL to read stacks; without a shorter
+                # switch interval it would wait up to 5ms for every sample.
+                # The interval is process-wide: until the last profile ends,
+                # every thread gives up the GIL that often, which costs
+                # CPU-bound work on other threads a little throughput too.
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+                self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+        return session
+
+    def stop(self, session: ProfileSession) -> Future:
+        session.elapsed = time.perf_counter() - session.started
+
+        # The sampler is still running while this session is registered, and
+        # only exits once every finished session has been written.
+        with self._lock:
+            sessions = self._sessions[session.thread_id]
+            del sessions[session.marker]
+            if not sessions:
+                del self._sessions[session.thread_id]
+            self._finished.append(session)
+
+        return session.written
+
+    def _sample(self) -> None:
+        while True:
+            with self._lock:
+                finished, self._finished = self._finished, []
+                if not self._sessions and not finished:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._sampler = None
+                    return
+                sessions = {thread_id: dict(markers) for thread_id, markers in self._sessions.items()}
+
+            for session in finished:
+                self._finish(session)
+
+            # With only finished sessions left there is nothing to sample.
+            frames, frame = sys._current_frames() if sessions else {}, None
+            for thread_id, markers in sessions.items():
+                stack = []
+                frame = frames.get(thread_id)
+                while frame is not None:
+                    stack.append(self._name(frame.f_code, frame.f_globals))
+                    session = markers.get(frame)
+                    if session is not None:
+                        session.samples[tuple(reversed(stack))] += 1
+                        break
+                    frame = frame.f_back
+
+            del frames, frame
+            time.sleep(self.interval)
+
+    def _name(self, code: CodeType, frame_globals: Dict) -> str:
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = f"{frame_globals.get('__name__', '?')}.{code.co_qualname}"
+        return name
+
+    def _finish(self, session: ProfileSession) -> None:
+        path = None
+        if session.samples:
+            try:
+                path = self._write(session, session.elapsed)
+            except OSError as e:
+                print(f"ERROR: profile of {session.path} could not be written: {e}")
+        session.written.set_result(path)
+
+    def _write(self, session: ProfileSession, elapsed: float) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        slug = session.path.strip("/").replace("/", "_") or "root"
+        base = f"{time.time_ns() // 1_000_000}-{next(self._sequence):06d}-{slug}"
+
+        # Collapsed stacks, one "caller;callee count" line per stack, as
+        # read by flamegraph.pl, speedscope and inferno.
+        folded = self.output_dir / f"{base}.folded"
+        folded.write_text("".join(f"{';'.join(stack)} {count}\n" for stack, count in session.samples.most_common()))
+        (self.output_dir / f"{base}.top.txt").write_text(self.summary(session, elapsed))
+
+        self.written += 1
+        self._enforce_retention()
+        return folded
+
+    def summary(self, session: ProfileSession, elapsed: float) -> str:
+        total = sum(session.samples.values())
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in session.samples.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+
+        lines = [f"{session.path}: {elapsed * 1000:.2f}ms, {total} samples every {self.interval * 1000:g}ms", ""]
+        for title, counts in (("self", own), ("total", inclusive)):
+            lines.append(f"top {self.top_n} by {title} samples:")
+            for name, count in counts.most_common(self.top_n):
+                lines.append(f"{count:>8} {100 * count / total:6.1f}%  {name}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def _enforce_retention(self) -> None:
+        # File names start with a timestamp, so name order is age order.
+        profiles = sorted(self.output_dir.glob("*.folded"))
+        for folded in profiles[:max(0, len(profiles) - self.max_profiles)]:
+            folded.unlink(missing_ok=True)
+            (folded.parent / f"{folded.name[:-len('.folded')]}.top.txt").unlink(missing_ok=True)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "active": sum(len(markers) for markers in self._sessions.values()),
+            "profiled": self.profiled,
+            "written": self.written,
+            "output_dir": str(self.output_dir),
+        }
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Iterable, Optional, Tuple
+from server.bike.models import Bike
+from .category_index import SelectionVector
+
+QuoteKey = Tuple[str, SelectionVector]
+
+class QuoteCache:
+    # Bounded LRU of assembled bikes, valid prices and compatibility failures
+    # alike. Cached bikes are shared between requests, which is safe because
+    # Bike is frozen.
+    #
+    # Entries remember the snapshot revision that priced them and the IDs in
+    # their selection. A rule edit drops only the entries holding an affected
+    # ID and raises that ID's floor: a request still running on an older
+    # snapshot cannot store a quote for it afterwards.
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, FrozenSet[str], Bike]]" = OrderedDict()
+        self._floors: Dict[str, int] = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected_writes = 0
+
+    @staticmethod
+    def make_key(quote_lineage: str, codes: SelectionVector) -> QuoteKey:
+        # Codes are positions in the catalogue's layout, which cannot change
+        # without the lineage changing too.
+        return (quote_lineage, codes)
+
+    def get(self, key: Hashable) -> Optional[Bike]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, _, bike = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return bike
+
+    def put(self, key: Hashable, bike: Bike, revision: int = 0, component_ids: Iterable[str] = ()) -> None:
+        component_ids = frozenset(component_ids)
+
+        with self._lock:
+            if revision < self._floor or any(self._floors.get(component_id, 0) > revision for component_id in component_ids):
+                self.rejected_writes += 1
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, revision, component_ids, bike)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, component_ids: Iterable[str], revision: int) -> int:
+        component_ids = frozenset(component_ids)
+
+        with self._lock:
+            for component_id in component_ids:
+                self._floors[component_id] = max(self._floors.get(component_id, 0), revision)
+
+            stale = [key for key, entry in self._entries.items() if not component_ids.isdisjoint(entry[2])]
+            for key in stale:
+                del self._entries[key]
+
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_all(self, revision: int) -> int:
+        with self._lock:
+            self._floor = max(self._floor, revision)
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.invalidations += dropped
+            return dropped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "rejected_writes": self.rejected_writes,
+            }
@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set
+
+@dataclass(frozen=True)
+class RuleSetDiff:
+    # Rules are matched by rule_id. "before" and "after" hold both versions
+    # of every touched rule, so callers can see what either side referenced.
+    added: FrozenSet[str] = frozenset()
+    changed: FrozenSet[str] = frozenset()
+    removed: FrozenSet[str] = frozenset()
+    before: Dict[str, Dict] = field(default_factory=dict)
+    after: Dict[str, Dict] = field(default_factory=dict)
+
+    @property
+    def touched(self) -> FrozenSet[str]:
+        return self.added | self.changed | self.removed
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.touched
+
+    def touched_rules(self) -> List[Dict]:
+        return list(self.before.values()) + list(self.after.values())
+
+def rule_keys(rules: List[Dict]) -> List[str]:
+    # A rule_id that is missing or repeated gets an occurrence suffix, so
+    # every rule still has a key of its own.
+    seen: Dict[str, int] = {}
+    keys = []
+
+    for rule in rules:
+        rule_id = str(rule.get("rule_id", "N/A"))
+        occurrence = seen.get(rule_id, 0)
+        seen[rule_id] = occurrence + 1
+        keys.append(rule_id if occurrence == 0 else f"{rule_id}#{occurrence}")
+
+    return keys
+
+def diff_rules(old_rules: List[Dict], new_rules: List[Dict]) -> RuleSetDiff:
+    old_by_key = dict(zip(rule_keys(old_rules), old_rules))
+    new_by_key = dict(zip(rule_keys(new_rules), new_rules))
+
+    added = {key for key in new_by_key if key not in old_by_key}
+    removed = {key for key in old_by_key if key not in new_by_key}
+    changed = {key for key in new_by_key if key in old_by_key and new_by_key[key] != old_by_key[key]}
+
+    # File order breaks priority ties and orders error messages, so a rule
+    # that moved relative to the others counts as changed too.
+    old_order = [key for key in old_by_key if key in new_by_key]
+    new_order = [key for key in new_by_key if key in old_by_key]
+    changed.update(old for old, new in zip(old_order, new_order) if old != new)
+    changed.update(new for old, new in zip(old_order, new_order) if old != new)
+
+    return RuleSetDiff(
+        added=frozenset(added),
+        changed=frozenset(changed),
+        removed=frozenset(removed),
+        before={key: old_by_key[key] for key in changed | removed},
+        after={key: new_by_key[key] for key in changed | added},
+    )
+
+def compatibility_component_ids(diff: RuleSetDiff) -> Set[str]:
+    # A compatibility rule only fires for selections holding its selector.
+    ids = set()
+    for rule in diff.touched_rules():
+        for condition_set in rule.get("conditions", []):
+            selector_id = condition_set.get("selector", {}).get("id")
+            if selector_id is not None:
+                ids.add(selector_id)
+    return ids
+
+def pricing_component_ids(diff: RuleSetDiff) -> Optional[Set[str]]:
+    # None when a touched rule has no selector: it applies to every bike.
+    ids = set()
+    for rule in diff.touched_rules():
+        selectors = rule.get("selectors", rule.get("selector", []))
+        if not selectors:
+            return None
+        ids.update(selector["id"] for selector in selectors if isinstance(selector, dict) and "id" in selector)
+
+        target_id = rule.get("effect", {}).get("target_id")
+        if target_id is not None:
+            ids.add(target_id)
+    return ids
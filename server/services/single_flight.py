@@ -0,0 +1,54 @@
+import threading
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+from .metrics import metrics
+
+T = TypeVar("T")
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    # Concurrent do() calls with the same key, from any thread, run fn once:
+    # the first caller computes, the others block and share its result or
+    # its exception. Nothing is kept once the call returns.
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.calls += 1
+            self.coalesced += not leader
+
+        metrics.inc("single_flight_calls_total", flight=self.name, role="leader" if leader else "coalesced")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from server.components.abc_components import BikeComponent
+from .catalogue_gateway import CatalogueGateway
+from .compatibility_index import CompiledCondition
+from .encoded_payload import EncodedPayload
+from .pricing.pricing_rule_applicator import PricingRuleApplicator
+
+PrefixKey = Tuple[Tuple[str, str], ...]
+
+@dataclass(frozen=True)
+class PrefixState:
+    selected: Dict[str, BikeComponent] = field(default_factory=dict)
+    restrictions: Dict[str, Tuple[CompiledCondition, ...]] = field(default_factory=dict)
+    errors: Tuple[str, ...] = ()
+
+    def extend(self, component: BikeComponent, triggered: Tuple[CompiledCondition, ...], conflicts: List[CompiledCondition]) -> "PrefixState":
+        restrictions = dict(self.restrictions)
+        errors = list(self.errors)
+
+        for condition in self.restrictions.get(component.category, ()):
+            errors.extend(condition.violations(component.id))
+
+        for condition in triggered:
+            restrictions[condition.affects_category] = restrictions.get(condition.affects_category, ()) + (condition,)
+
+        for condition in conflicts:
+            target = component if condition.affects_category == component.category else self.selected[condition.affects_category]
+            errors.extend(condition.violations(target.id))
+
+        return PrefixState(
+            selected={**self.selected, component.category: component},
+            restrictions=restrictions,
+            errors=tuple(errors),
+        )
+
+class StepOptionsService:
+    # Answers "what can I pick next?" for a partial selection. Each prefix
+    # state is derived from the state of its parent prefix (the same
+    # selection minus its last category), so evaluation is incremental and
+    # the early steps shared by most visitors are computed once per snapshot.
+
+    def __init__(self, gateway: CatalogueGateway, rule_applicator: Optional[PricingRuleApplicator] = None, cache_size: int = 4096):
+        self.gateway = gateway
+        self.compatibility_index = gateway.compatibility_index
+        self.rule_applicator = rule_applicator or gateway.pricing_rule_applicator
+        self.categories: Tuple[str, ...] = gateway.category_index.categories
+        self.cache_size = cache_size
+        self._category_order = {category: position for position, category in enumerate(self.categories)}
+        self._states: "OrderedDict[PrefixKey, PrefixState]" = OrderedDict()
+        self._payloads: "OrderedDict[Tuple[PrefixKey, str], EncodedPayload]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def prefix_key(self, selection_ids: Dict[str, str]) -> PrefixKey:
+        return tuple(sorted(
+            ((category, component_id) for category, component_id in selection_ids.items() if category in self._category_order),
+            key=lambda item: self._category_order[item[0]],
+        ))
+
+    def next_category(self, key: PrefixKey) -> Optional[str]:
+        chosen = {category for category, _ in key}
+        return next((category for category in self.categories if category not in chosen), None)
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def _state(self, key: PrefixKey) -> PrefixState:
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+                return state
+
+        if not key:
+            state = PrefixState()
+        else:
+            parent = self._state(key[:-1])
+            component = self.gateway.find_component(key[-1][1])
+            state = parent.extend(
+                component,
+                self.compatibility_index.triggered_by(component),
+                self.compatibility_index.conflicts_with(component, parent.selected),
+            )
+
+        with self._lock:
+            return self._remember(self._states, key, state)
+
+    def _build_options(self, state: PrefixState, category: str) -> List[Dict]:
+        restrictions = state.restrictions.get(category, ())
+        prefix_components = list(state.selected.values())
+        options = []
+
+        for candidate in self.gateway.category_components(category):
+            if not all(condition.allows(candidate.id) for condition in restrictions):
+                continue
+            if self.compatibility_index.conflicts_with(candidate, state.selected):
+                continue
+
+            final_prices, combo_adjustment = self.rule_applicator.price_breakdown(prefix_components + [candidate])
+            options.append({
+                **candidate.to_dict(),
+                "list_price": candidate.price,
+                "price": final_prices[category],
+                "running_total": sum(final_prices.values()) + combo_adjustment,
+            })
+
+        return options
+
+    def next_options(self, selection_ids: Dict[str, str], category: Optional[str] = None) -> Dict:
+        key = self.prefix_key(selection_ids)
+        category = category or self.next_category(key)
+
+        # Asking again for an already chosen category lists its alternatives.
+        state = self._state(tuple(item for item in key if item[0] != category))
+
+        if state.errors or category is None:
+            options = []
+        else:
+            options = self._build_options(state, category)
+
+        return {
+            "category": category,
+            "valid": not state.errors,
+            "errors": list(state.errors),
+            "options": options,
+        }
+
+    def next_options_payload(self, selection_ids: Dict[str, str], category: Optional[str] = None) -> EncodedPayload:
+        key = self.prefix_key(selection_ids)
+        cache_key = (key, category or "")
+
+        with self._lock:
+            payload = self._payloads.get(cache_key)
+            if payload is not None:
+                self._payloads.move_to_end(cache_key)
+                return payload
+
+        payload = EncodedPayload.from_object(self.next_options(selection_ids, category))
+
+        with self._lock:
+            return self._remember(self._payloads, cache_key, payload)
@@ -0,0 +1,5 @@
+from .base import CatalogueSource, CatalogueStore
+from .json_store import JsonCatalogueStore
+from .sqlite_store import SqliteCatalogueStore
+from .binary_store import BinaryCatalogueStore, MappedCatalogue
+from .factory import open_catalogue_store
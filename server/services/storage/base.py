@@ -0,0 +1,79 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from server.components.abc_components import BikeComponent
+
+@dataclass(frozen=True)
+class CatalogueSource:
+    # Raw records of one catalogue revision, as a backend returns them.
+    # Stores that serve components through a ComponentLookup leave
+    # components empty and only report their version.
+    version: str
+    components: List[Dict] = field(default_factory=list)
+    compatibility_rules: List[Dict] = field(default_factory=list)
+    pricing_rules: List[Dict] = field(default_factory=list)
+    components_version: str = ""
+
+    def __post_init__(self):
+        if not self.components_version:
+            object.__setattr__(self, "components_version", compute_components_version(self.components))
+
+class ComponentLookup(ABC):
+    # Indexed reads of one catalogue revision's components, for gateways
+    # that do not keep the whole catalogue in memory. A component's code is
+    # its position within its category, as in CategoryIndex. Blocking
+    # lookups do I/O per read, so async callers run them in a thread.
+    categories: Tuple[str, ...]
+    blocking = True
+
+    @abstractmethod
+    def slots(self, component_ids: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        # (category position, code) of every known ID.
+        pass
+
+    @abstractmethod
+    def components_at(self, slots: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], BikeComponent]:
+        pass
+
+    @abstractmethod
+    def components_by_ids(self, component_ids: Iterable[str]) -> Dict[str, BikeComponent]:
+        pass
+
+    @abstractmethod
+    def components_in_category(self, category: str) -> List[BikeComponent]:
+        pass
+
+    @abstractmethod
+    def records(self) -> List[Dict]:
+        # Every component record in catalogue order, for callers that need
+        # the whole catalogue after all.
+        pass
+
+class CatalogueStore(ABC):
+    # Where a catalogue snapshot is read from. The gateway compiles whatever
+    # open_revision returns; source_stamp is a cheap change check the
+    # provider polls before paying for a full read.
+
+    @abstractmethod
+    def source_stamp(self) -> Hashable:
+        pass
+
+    @abstractmethod
+    def read_sources(self) -> CatalogueSource:
+        pass
+
+    def open_revision(self) -> Tuple[CatalogueSource, Optional[ComponentLookup]]:
+        # Stores with indexed component reads return the rules and a lookup
+        # bound to the same revision instead of every component record.
+        return self.read_sources(), None
+
+    def close(self) -> None:
+        pass
+
+def compute_components_version(components: List[Dict]) -> str:
+    # Content hash of the component records alone: equal versions mean a
+    # rule-only edit, whatever backend the catalogue came from.
+    content = json.dumps(components, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(content).hexdigest()[:16]
@@ -0,0 +1,305 @@
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from server.components.abc_components import CORE_FIELDS, BikeComponent
+from .base import CatalogueSource, CatalogueStore, ComponentLookup
+
+MAGIC = b"BKCS"
+FORMAT_VERSION = 3
+NONE = 0xFFFFFFFF
+
+# magic, format version, catalogue version, then the number of strings,
+# categories and components, and the string indices of the raw compatibility
+# and pricing rules and of the components version. Rules are stored raw: the
+# gateway compiles them when it builds a snapshot.
+HEADER = struct.Struct("<4sH16sIIIIII")
+U32 = struct.Struct("<I")
+STRING_SPAN = struct.Struct("<II")
+# name, first component, component count
+CATEGORY = struct.Struct("<III")
+# id, name, category index, extras (JSON, or NONE), price
+COMPONENT = struct.Struct("<IIIId")
+
+class MappedCatalogue(ComponentLookup):
+    # Read-only view over a compiled catalogue file. Everything is read
+    # straight from the mapping, which the OS shares between processes, so
+    # opening one costs the same whatever the catalogue size. Rows are
+    # grouped by category, so a component's code is its row minus the
+    # category's first row.
+    blocking = False
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            header = HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            header = (b"", 0, b"")
+
+        magic, format_version, catalogue_version = header[:3]
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a catalogue snapshot in format version {FORMAT_VERSION}.")
+
+        self.version = catalogue_version.rstrip(b"\0").decode()
+        (self.string_count, self.category_count, self.component_count,
+         self._compatibility_rules, self._pricing_rules, self._components_version) = header[3:]
+
+        try:
+            layout = _layout(self.string_count, self.category_count, self.component_count,
+                             string_bytes=lambda offset: U32.unpack_from(self._map, offset + self.string_count * U32.size)[0])
+        except struct.error:
+            layout = {"end": len(self._map) + 1}
+
+        self._offsets = layout
+        if len(self._map) < layout["end"]:
+            self._map.close()
+            raise ValueError(f"{path} is truncated.")
+
+        categories = [self._category(index) for index in range(self.category_count)]
+        self.categories: Tuple[str, ...] = tuple(self._string(name) for name, _, _ in categories)
+        self._category_index = {category: index for index, category in enumerate(self.categories)}
+        self._category_rows = [(first, count) for _, first, count in categories]
+        self.components_version = self._string(self._components_version)
+
+    def _string_bytes(self, index: int) -> bytes:
+        start, end = STRING_SPAN.unpack_from(self._map, self._offsets["string_spans"] + index * U32.size)
+        blob = self._offsets["strings"]
+        return self._map[blob + start:blob + end - 1]
+
+    def _string(self, index: int) -> str:
+        return self._string_bytes(index).decode()
+
+    def _category(self, index: int) -> Tuple[int, int, int]:
+        return CATEGORY.unpack_from(self._map, self._offsets["categories"] + index * CATEGORY.size)
+
+    def _component_at(self, row: int) -> BikeComponent:
+        return BikeComponent.from_record(self._record(COMPONENT.unpack_from(self._map, self._offsets["components"] + row * COMPONENT.size)))
+
+    def _record(self, fields: Tuple) -> Dict:
+        id_index, name_index, category_index, extras_index, price = fields
+        record = {"id": self._string(id_index), "name": self._string(name_index), "category": self.categories[category_index], "price": price}
+        if extras_index != NONE:
+            record.update(json.loads(self._string(extras_index)))
+        return record
+
+    def _row_of(self, component_id: str) -> Optional[int]:
+        # Binary search over the component rows sorted by ID.
+        target = component_id.encode()
+        low, high = 0, self.component_count
+        id_index = self._offsets["id_index"]
+
+        while low < high:
+            middle = (low + high) // 2
+            row = U32.unpack_from(self._map, id_index + middle * U32.size)[0]
+            candidate = self._string_bytes(COMPONENT.unpack_from(self._map, self._offsets["components"] + row * COMPONENT.size)[0])
+
+            if candidate == target:
+                return row
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def component(self, component_id: str) -> Optional[BikeComponent]:
+        row = self._row_of(component_id)
+        return None if row is None else self._component_at(row)
+
+    def slots(self, component_ids: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        slots = {}
+        for component_id in component_ids:
+            row = self._row_of(component_id) if component_id is not None else None
+            if row is not None:
+                position = COMPONENT.unpack_from(self._map, self._offsets["components"] + row * COMPONENT.size)[2]
+                slots[component_id] = (position, row - self._category_rows[position][0])
+        return slots
+
+    def components_at(self, slots: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], BikeComponent]:
+        found = {}
+        for position, code in slots:
+            first, count = self._category_rows[position]
+            if 0 <= code < count:
+                found[(position, code)] = self._component_at(first + code)
+        return found
+
+    def components_by_ids(self, component_ids: Iterable[str]) -> Dict[str, BikeComponent]:
+        found = {}
+        for component_id in component_ids:
+            row = self._row_of(component_id) if component_id is not None else None
+            if row is not None:
+                found[component_id] = self._component_at(row)
+        return found
+
+    def components_in_category(self, category: str) -> List[BikeComponent]:
+        index = self._category_index.get(category)
+        if index is None:
+            return []
+        _, first, count = self._category(index)
+        return [self._component_at(row) for row in range(first, first + count)]
+
+    def rules_source(self) -> CatalogueSource:
+        # What a snapshot keeps in memory; components stay in the mapping.
+        return CatalogueSource(
+            version=self.version,
+            compatibility_rules=json.loads(self._string(self._compatibility_rules)),
+            pricing_rules=json.loads(self._string(self._pricing_rules)),
+            components_version=self.components_version,
+        )
+
+    def records(self) -> List[Dict]:
+        return self.to_source().components
+
+    def to_source(self) -> CatalogueSource:
+        # Strings are NUL separated, so the whole table decodes in one call
+        # instead of one slice per string.
+        blob = self._offsets["strings"]
+        string_bytes = U32.unpack_from(self._map, self._offsets["string_spans"] + self.string_count * U32.size)[0]
+        strings = self._map[blob:blob + string_bytes].decode().split("\0")[:-1] if self.string_count else []
+
+        categories = self.categories
+        components = []
+        start = self._offsets["components"]
+
+        for id_index, name_index, category_index, extras_index, price in COMPONENT.iter_unpack(self._map[start:start + self.component_count * COMPONENT.size]):
+            record = {"id": strings[id_index], "name": strings[name_index], "category": categories[category_index], "price": price}
+            if extras_index != NONE:
+                record.update(json.loads(strings[extras_index]))
+            components.append(record)
+
+        return CatalogueSource(
+            version=self.version,
+            components=components,
+            compatibility_rules=json.loads(strings[self._compatibility_rules]),
+            pricing_rules=json.loads(strings[self._pricing_rules]),
+            components_version=strings[self._components_version],
+        )
+
+    def close(self) -> None:
+        self._map.close()
+
+class BinaryCatalogueStore(CatalogueStore):
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.mapped: Optional[MappedCatalogue] = None
+        self._mapped_stamp = None
+
+    def source_stamp(self) -> Tuple[int, int, int]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return (-1, -1, -1)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _current_map(self) -> MappedCatalogue:
+        # A rebuilt snapshot replaces the file, so map the new one. The old
+        # mapping is not closed here: snapshots built from it still read
+        # their components from it, and it is unmapped once they are gone.
+        stamp = self.source_stamp()
+        if self.mapped is None or stamp != self._mapped_stamp:
+            self.mapped, self._mapped_stamp = MappedCatalogue(self.path), stamp
+        return self.mapped
+
+    def read_sources(self) -> CatalogueSource:
+        return self._current_map().to_source()
+
+    def open_revision(self) -> Tuple[CatalogueSource, ComponentLookup]:
+        mapped = self._current_map()
+        return mapped.rules_source(), mapped
+
+    def close(self) -> None:
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+def write_catalogue_snapshot(path: Path, source: CatalogueSource) -> None:
+    strings: List[bytes] = []
+    string_index: Dict[str, int] = {}
+
+    def string_ref(value: str) -> int:
+        index = string_index.get(value)
+        if index is None:
+            if "\0" in value:
+                raise ValueError(f"Catalogue strings cannot contain NUL characters: {value!r}")
+            index = string_index[value] = len(strings)
+            strings.append(value.encode())
+        return index
+
+    # Rows are grouped by category (in catalogue order) so that a category is
+    # one contiguous slice of the component section.
+    by_category: Dict[str, List[Dict]] = {}
+    for item in source.components:
+        by_category.setdefault(item["category"], []).append(item)
+
+    categories, rows = [], []
+    for category_position, (category, items) in enumerate(by_category.items()):
+        categories.append((string_ref(category), len(rows), len(items)))
+        for item in items:
+            extras = {k: v for k, v in item.items() if k not in CORE_FIELDS}
+            rows.append((string_ref(item["id"]), string_ref(item["name"]), category_position, string_ref(json.dumps(extras)) if extras else NONE, float(item["price"])))
+
+    id_order = sorted(range(len(rows)), key=lambda row: strings[rows[row][0]])
+
+    compatibility_rules = string_ref(json.dumps(source.compatibility_rules))
+    pricing_rules = string_ref(json.dumps(source.pricing_rules))
+    components_version = string_ref(source.components_version)
+
+    # Each string is followed by a NUL that its span leaves out.
+    spans, position = [], 0
+    for value in strings:
+        spans.append(position)
+        position += len(value) + 1
+    spans.append(position)
+
+    layout = _layout(len(strings), len(categories), len(rows), string_bytes=lambda _: position)
+    buffer = bytearray(layout["end"])
+    HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, source.version.encode()[:16],
+                     len(strings), len(categories), len(rows), compatibility_rules, pricing_rules, components_version)
+
+    _pack_all(buffer, layout["string_spans"], U32, [(span,) for span in spans])
+    buffer[layout["strings"]:layout["strings"] + position] = b"".join(value + b"\0" for value in strings)
+    _pack_all(buffer, layout["categories"], CATEGORY, categories)
+    _pack_all(buffer, layout["components"], COMPONENT, rows)
+    _pack_all(buffer, layout["id_index"], U32, [(row,) for row in id_order])
+
+    # Written next to the target and renamed over it, so a worker never maps
+    # a half-written snapshot.
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(buffer)
+    os.replace(tmp_path, path)
+
+def _pack_all(buffer: bytearray, offset: int, record: struct.Struct, values: List[Tuple]) -> None:
+    for index, value in enumerate(values):
+        record.pack_into(buffer, offset + index * record.size, *value)
+
+def _layout(string_count: int, category_count: int, component_count: int, string_bytes) -> Dict[str, int]:
+    # Section offsets follow from the counts in the header; every section
+    # starts on an 8-byte boundary.
+    offsets = {}
+    position = _align(HEADER.size)
+
+    offsets["string_spans"] = position
+    position = _align(position + (string_count + 1) * U32.size)
+    offsets["strings"] = position
+    position = _align(position + string_bytes(offsets["string_spans"]))
+
+    for name, size in (
+        ("categories", category_count * CATEGORY.size),
+        ("components", component_count * COMPONENT.size),
+        ("id_index", component_count * U32.size),
+    ):
+        offsets[name] = position
+        position = _align(position + size)
+
+    offsets["end"] = position
+    return offsets
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
@@ -0,0 +1,21 @@
+from pathlib import Path
+from typing import Optional
+from .base import CatalogueStore
+from .binary_store import BinaryCatalogueStore
+from .json_store import DATA_PATH, JsonCatalogueStore
+from .sqlite_store import SqliteCatalogueStore
+
+BACKENDS = ("json", "sqlite", "binary")
+
+def open_catalogue_store(backend: str = "json", data_path: Path = DATA_PATH, db_path: Optional[str] = None, snapshot_path: Optional[str] = None) -> CatalogueStore:
+    if backend == "json":
+        return JsonCatalogueStore(data_path)
+    if backend == "sqlite":
+        if not db_path:
+            raise ValueError("The sqlite catalogue backend needs CATALOGUE_DB_PATH.")
+        return SqliteCatalogueStore(Path(db_path))
+    if backend == "binary":
+        if not snapshot_path:
+            raise ValueError("The binary catalogue backend needs CATALOGUE_SNAPSHOT_PATH.")
+        return BinaryCatalogueStore(Path(snapshot_path))
+    raise ValueError(f"Unknown catalogue backend '{backend}', expected one of {list(BACKENDS)}.")
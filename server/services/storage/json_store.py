@@ -0,0 +1,58 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .base import CatalogueSource, CatalogueStore
+
+DATA_PATH = Path(__file__).resolve().parent.parent.parent / "static_data"
+
+COMPONENTS_FILE = "components.json"
+COMPATIBILITY_RULES_FILE = "compatibility_rules.json"
+PRICING_RULES_FILE = "pricing_rules.json"
+SOURCE_FILES = (COMPONENTS_FILE, COMPATIBILITY_RULES_FILE, PRICING_RULES_FILE)
+
+class JsonCatalogueStore(CatalogueStore):
+
+    def __init__(self, data_path: Path = DATA_PATH):
+        self.data_path = Path(data_path)
+
+    def source_stamp(self) -> Tuple[Tuple[str, int, int], ...]:
+        stamp = []
+        for filename in SOURCE_FILES:
+            try:
+                stat = (self.data_path / filename).stat()
+                stamp.append((filename, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append((filename, -1, -1))
+        return tuple(stamp)
+
+    def read_sources(self) -> CatalogueSource:
+        sources = {filename: self._read_source(filename) for filename in SOURCE_FILES}
+        return CatalogueSource(
+            version=compute_version(sources),
+            components=self._load_json(sources[COMPONENTS_FILE]),
+            compatibility_rules=self._load_json(sources[COMPATIBILITY_RULES_FILE]),
+            pricing_rules=self._load_json(sources[PRICING_RULES_FILE]),
+        )
+
+    def _read_source(self, filename: str) -> Optional[bytes]:
+        file_path = self.data_path / filename
+        if not file_path.exists():
+            print(f"ERROR: file not found in {file_path}")
+            return None
+        return file_path.read_bytes()
+
+    def _load_json(self, content: Optional[bytes]) -> List[Dict]:
+        if content is None:
+            return []
+        return json.loads(content)
+
+def compute_version(sources: Dict[str, Optional[bytes]]) -> str:
+    # Content hash of the JSON sources. Importers store it with the data, so
+    # the same catalogue has the same version whatever backend serves it.
+    hasher = hashlib.sha256()
+    for filename, content in sources.items():
+        size = -1 if content is None else len(content)
+        hasher.update(f"{filename}:{size}:".encode())
+        hasher.update(content or b"")
+    return hasher.hexdigest()[:16]
@@ -0,0 +1,276 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from server.components.abc_components import CORE_FIELDS, BikeComponent
+from .base import CatalogueSource, CatalogueStore, ComponentLookup
+from .json_store import DATA_PATH, JsonCatalogueStore
+
+SCHEMA = """
+CREATE TABLE catalogue_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE categories (position INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE components (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    code INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    extras TEXT
+);
+CREATE UNIQUE INDEX components_by_category ON components (category, code);
+CREATE TABLE compatibility_rules (
+    position INTEGER PRIMARY KEY,
+    rule_id TEXT,
+    affects_category TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX compatibility_rules_by_category ON compatibility_rules (affects_category);
+CREATE TABLE pricing_rules (
+    position INTEGER PRIMARY KEY,
+    rule_id TEXT,
+    body TEXT NOT NULL
+);
+"""
+
+# Statements are fixed strings, so each pooled connection compiles them once
+# and reuses the prepared statement from its cache afterwards. Bulk lookups
+# pass the IDs as one JSON array instead of building an IN (?, ?, ...) list.
+SELECT_META = "SELECT key, value FROM catalogue_meta WHERE key IN ('version', 'components_version')"
+SELECT_CATEGORIES = "SELECT name FROM categories ORDER BY position"
+SELECT_COMPONENTS = "SELECT id, category, name, price, extras FROM components ORDER BY position"
+SELECT_COMPONENTS_BY_IDS = "SELECT id, category, name, price, extras FROM components WHERE id IN (SELECT value FROM json_each(?))"
+SELECT_COMPONENTS_BY_CATEGORY = "SELECT id, category, name, price, extras FROM components WHERE category = ? ORDER BY code"
+SELECT_SLOTS_BY_IDS = "SELECT id, category, code FROM components WHERE id IN (SELECT value FROM json_each(?))"
+SELECT_COMPONENTS_AT = (
+    "SELECT c.id, c.category, c.name, c.price, c.extras, c.code FROM json_each(?) AS wanted"
+    " JOIN components AS c ON c.category = json_extract(wanted.value, '$[0]') AND c.code = json_extract(wanted.value, '$[1]')"
+)
+SELECT_COMPATIBILITY_RULES = "SELECT body FROM compatibility_rules ORDER BY position"
+SELECT_PRICING_RULES = "SELECT body FROM pricing_rules ORDER BY position"
+
+STATEMENT_CACHE_SIZE = 32
+
+class ConnectionPool:
+    # Read-only connections shared by threads. A connection is used by one
+    # thread at a time; callers block once all of them are checked out.
+
+    def __init__(self, path: Path, size: int = 4):
+        self.path = Path(path)
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        # Bumped by close(): connections checked out before it are closed
+        # when they come back instead of joining the new generation.
+        self._generation = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            generation = self._generation
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = None
+                if self._retired and self._created == 0:
+                    raise RuntimeError(f"The pool for the replaced {self.path} has no connections left.")
+                create = self._created < self.size and not self._retired
+                if create:
+                    self._created += 1
+
+        if connection is None and create:
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._lock:
+                    if generation == self._generation:
+                        self._created -= 1
+                raise
+        elif connection is None:
+            connection = self._idle.get()
+            with self._lock:
+                generation = self._generation
+
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                current = generation == self._generation
+                if current:
+                    self._idle.put(connection)
+            if not current:
+                connection.close()
+
+    def retire(self) -> None:
+        # The file was replaced: a new connection would open the new one,
+        # while the connections already open keep reading the revision the
+        # snapshots using this pool were built from.
+        with self._lock:
+            self._retired = True
+
+    def close(self) -> None:
+        with self._lock:
+            self._generation += 1
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+
+class SqliteComponentLookup(ComponentLookup):
+    # Indexed component reads through the pool of one file revision.
+
+    def __init__(self, pool: ConnectionPool, categories: Tuple[str, ...]):
+        self.pool = pool
+        self.categories = categories
+        self._position = {category: position for position, category in enumerate(categories)}
+
+    def slots(self, component_ids: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_SLOTS_BY_IDS, (json.dumps(list(component_ids)),)).fetchall()
+        return {component_id: (self._position[category], code) for component_id, category, code in rows}
+
+    def components_at(self, slots: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], BikeComponent]:
+        wanted = [[self.categories[position], code] for position, code in slots]
+        if not wanted:
+            return {}
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_COMPONENTS_AT, (json.dumps(wanted),)).fetchall()
+        return {(self._position[row[1]], row[5]): BikeComponent.from_record(_record(row[:5])) for row in rows}
+
+    def components_by_ids(self, component_ids: Iterable[str]) -> Dict[str, BikeComponent]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_COMPONENTS_BY_IDS, (json.dumps(list(component_ids)),)).fetchall()
+        return {row[0]: BikeComponent.from_record(_record(row)) for row in rows}
+
+    def components_in_category(self, category: str) -> List[BikeComponent]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(SELECT_COMPONENTS_BY_CATEGORY, (category,)).fetchall()
+        return [BikeComponent.from_record(_record(row)) for row in rows]
+
+    def records(self) -> List[Dict]:
+        with self.pool.connection() as connection:
+            return [_record(row) for row in connection.execute(SELECT_COMPONENTS)]
+
+class SqliteCatalogueStore(CatalogueStore):
+    # One on-disk catalogue that every worker process opens read-only.
+    # Snapshots keep the rules and read components through indexed lookups,
+    # so a worker does not hold the whole catalogue in memory.
+
+    def __init__(self, path: Path, pool_size: int = 4):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.pool: Optional[ConnectionPool] = None
+        self._pool_stamp = None
+        self._lock = threading.Lock()
+
+    def source_stamp(self) -> Tuple[int, int, int]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return (-1, -1, -1)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _current_pool(self) -> ConnectionPool:
+        # Imports replace the file, and connections opened before keep
+        # reading the old inode, so every file revision gets its own pool.
+        # Snapshots of the old revision keep its pool alive until they go.
+        with self._lock:
+            stamp = self.source_stamp()
+            if self.pool is None or stamp != self._pool_stamp:
+                if self.pool is not None:
+                    self.pool.retire()
+                self.pool, self._pool_stamp = ConnectionPool(self.path, self.pool_size), stamp
+            return self.pool
+
+    def _read_rules(self, connection: sqlite3.Connection) -> Tuple[Dict[str, str], List[Dict], List[Dict]]:
+        meta = dict(connection.execute(SELECT_META).fetchall())
+        if "version" not in meta or "components_version" not in meta:
+            raise ValueError(f"{self.path} has no catalogue version; import it again.")
+        compatibility_rules = [json.loads(body) for body, in connection.execute(SELECT_COMPATIBILITY_RULES)]
+        pricing_rules = [json.loads(body) for body, in connection.execute(SELECT_PRICING_RULES)]
+        return meta, compatibility_rules, pricing_rules
+
+    def read_sources(self) -> CatalogueSource:
+        with self._current_pool().connection() as connection:
+            meta, compatibility_rules, pricing_rules = self._read_rules(connection)
+            components = [_record(row) for row in connection.execute(SELECT_COMPONENTS)]
+
+        return CatalogueSource(meta["version"], components, compatibility_rules, pricing_rules, meta["components_version"])
+
+    def open_revision(self) -> Tuple[CatalogueSource, ComponentLookup]:
+        pool = self._current_pool()
+        with pool.connection() as connection:
+            meta, compatibility_rules, pricing_rules = self._read_rules(connection)
+            categories = tuple(name for name, in connection.execute(SELECT_CATEGORIES))
+
+        source = CatalogueSource(meta["version"], [], compatibility_rules, pricing_rules, meta["components_version"])
+        return source, SqliteComponentLookup(pool, categories)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+def _record(row: Tuple) -> Dict:
+    component_id, category, name, price, extras = row
+    record = {"id": component_id, "name": name, "category": category, "price": price}
+    if extras:
+        record.update(json.loads(extras))
+    return record
+
+def import_catalogue(db_path: Path, source: CatalogueSource) -> None:
+    # Written next to the target and renamed over it, so readers only ever
+    # see a complete catalogue.
+    db_path = Path(db_path)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.executemany(
+                "INSERT INTO catalogue_meta (key, value) VALUES (?, ?)",
+                [("version", source.version), ("components_version", source.components_version)],
+            )
+            # A component's code is its position within its category, as in
+            # CategoryIndex; categories keep their first-appearance order.
+            codes: Dict[str, int] = {}
+            rows = []
+            for position, item in enumerate(source.components):
+                code = codes[item["category"]] = codes.get(item["category"], -1) + 1
+                extras = {k: v for k, v in item.items() if k not in CORE_FIELDS}
+                rows.append((item["id"], position, item["category"], code, item["name"], item["price"], json.dumps(extras) if extras else None))
+            connection.executemany("INSERT INTO categories (position, name) VALUES (?, ?)", list(enumerate(codes)))
+            connection.executemany("INSERT INTO components (id, position, category, code, name, price, extras) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.executemany(
+                "INSERT INTO compatibility_rules (position, rule_id, affects_category, body) VALUES (?, ?, ?, ?)",
+                [(position, rule.get("rule_id"), rule.get("affects_category"), json.dumps(rule)) for position, rule in enumerate(source.compatibility_rules)],
+            )
+            connection.executemany(
+                "INSERT INTO pricing_rules (position, rule_id, body) VALUES (?, ?, ?)",
+                [(position, rule.get("rule_id"), json.dumps(rule)) for position, rule in enumerate(source.pricing_rules)],
+            )
+    finally:
+        connection.close()
+
+    os.replace(tmp_path, db_path)
+
+def import_json_catalogue(db_path: Path, data_path: Path = DATA_PATH) -> CatalogueSource:
+    source = JsonCatalogueStore(data_path).read_sources()
+    import_catalogue(db_path, source)
+    return source
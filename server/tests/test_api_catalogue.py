@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+from fastapi.testclient import TestClient
+from server.main import app
+from server.controllers import api_configurator
+from server.services.encoded_payload import EncodedPayload
+
+
+class TestCatalogueApi(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_constraints_are_served_with_etag(self):
+        response = self.client.get("/catalogue/constraints")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "W-MTN": {"frame_type": ["T-DIAMOND", "T-STEP"]},
+            "W-FAT": {"rim_color": ["C-RED"]},
+        })
+        self.assertIn("ETag", response.headers)
+        self.assertIn("Cache-Control", response.headers)
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get("/catalogue/constraints").headers["ETag"]
+
+        response = self.client.get("/catalogue/constraints", headers={"If-None-Match": f'"stale", W/{etag}'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_payloads_name_the_catalogue_version(self):
+        version = api_configurator.catalogue_provider.get_snapshot().version
+
+        for path in ("/catalogue/full", "/catalogue/category/wheels", "/catalogue/constraints", "/catalogue/pricing_rules"):
+            self.assertEqual(self.client.get(path).headers["X-Catalogue-Version"], version, path)
+        cors = self.client.get("/catalogue/full", headers={"Origin": "http://localhost:5173"})
+        self.assertIn("x-catalogue-version", cors.headers.get("access-control-expose-headers", "").lower())
+
+    def test_stale_etag_returns_body(self):
+        response = self.client.get("/catalogue/constraints", headers={"If-None-Match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_full_catalogue_matches_components(self):
+        response = self.client.get("/catalogue/full", headers={"Accept-Encoding": "identity"})
+        catalogue = response.json()
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(list(catalogue), ["frame_type", "frame_finish", "wheels", "rim_color", "chain"])
+        self.assertEqual(catalogue["wheels"][0], {"id": "W-ROAD", "name": "Road Wheels", "category": "wheels", "price": 80.0})
+
+    def test_gzip_variant_is_negotiated(self):
+        plain = self.client.get("/catalogue/full", headers={"Accept-Encoding": "identity"})
+        response = self.client.get("/catalogue/full", headers={"Accept-Encoding": "gzip, br;q=0"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertNotEqual(response.headers["ETag"], plain.headers["ETag"])
+        self.assertEqual(response.json(), plain.json())
+
+        revalidated = self.client.get("/catalogue/full", headers={
+            "Accept-Encoding": "gzip, br;q=0",
+            "If-None-Match": response.headers["ETag"],
+        })
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_unknown_category_returns_empty_list(self):
+        response = self.client.get("/catalogue/category/unknown")
+        self.assertEqual(response.json(), [])
+
+    def test_pricing_rules_are_served_as_shipped(self):
+        response = self.client.get("/catalogue/pricing_rules")
+        self.assertEqual(response.json()[0]["rule_id"], "P001")
+
+    def test_payloads_are_encoded_when_the_snapshot_is_built(self):
+        self.client.get("/catalogue/full")
+
+        with mock.patch.object(EncodedPayload, "from_bytes", side_effect=AssertionError("encoded on the request path")):
+            for path in ("/catalogue/full", "/catalogue/category/wheels", "/catalogue/constraints", "/catalogue/pricing_rules"):
+                self.assertEqual(self.client.get(path).status_code, 200, path)
@@ -0,0 +1,56 @@
+import json
+import unittest
+from fastapi.testclient import TestClient
+from server.main import app
+
+BIKE_OK = ["T-DIAMOND", "F-SHINY", "W-ROAD", "C-BLACK", "CH-SS"]
+BIKE_OK_1 = ["T-FS", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S"]
+BIKE_NOK = ["T-DIAMOND", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S"]
+
+
+class TestPriceCheckApi(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_single_price_check(self):
+        response = self.client.post("/price/check", json={"component_ids": BIKE_OK_1, "client_total": 362})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"valid": True, "final_price": 362.0, "message": "Order verified successfully"})
+
+    def test_batch_results_follow_request_order(self):
+        response = self.client.post("/price/check/batch", json=[
+            {"component_ids": BIKE_OK, "client_total": 278},
+            {"component_ids": BIKE_NOK, "client_total": 300},
+            {"component_ids": ["T-FS"], "client_total": 130},
+            {"component_ids": BIKE_OK_1, "client_total": 1},
+            "not-a-payload",
+        ])
+        results = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["valid"] for r in results], [True, False, False, False, False])
+        self.assertEqual([r["final_price"] for r in results], [278.0, 0.0, None, 362.0, None])
+        self.assertEqual(results[2]["message"], "Error: Incomplete selection or components not in the catalogue.")
+        self.assertEqual(results[4]["message"], "Error: Malformed price check payload.")
+
+    def test_batch_rejects_non_array_body(self):
+        response = self.client.post("/price/check/batch", json={"component_ids": BIKE_OK})
+        self.assertEqual(response.status_code, 422)
+
+    def test_ndjson_batch(self):
+        lines = [
+            json.dumps({"component_ids": BIKE_OK_1, "client_total": 362}),
+            "{broken",
+            json.dumps({"component_ids": BIKE_OK, "client_total": 278}),
+        ]
+        response = self.client.post(
+            "/price/check/batch",
+            content="\n".join(lines).encode(),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        results = [json.loads(line) for line in response.text.splitlines()]
+
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        self.assertEqual([r["valid"] for r in results], [True, False, True])
@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+from server.benchmarks.hot_paths import bench_price_check, compare
+from server.benchmarks.synthetic import Scale, StaticCatalogueStore, random_selections, synthetic_source
+from server.controllers import api_configurator
+from server.services.catalogue_gateway import CatalogueGateway
+
+
+class TestBenchmarkSupport(unittest.TestCase):
+
+    def test_synthetic_catalogue_is_reproducible_and_sized(self):
+        scale = Scale(skus=200, categories=5, rules=20)
+        source = synthetic_source(scale)
+        gateway = CatalogueGateway(store=StaticCatalogueStore(source))
+
+        self.assertEqual(source, synthetic_source(scale))
+        self.assertEqual(len(gateway.components_by_id), 200)
+        self.assertEqual(len(gateway.components_by_category), 5)
+        self.assertEqual(len(gateway.pricing_rule_applicator.compiled_rules), 20)
+        self.assertTrue(all(len(selection) == 5 for selection in random_selections(gateway.components_by_category, 10)))
+
+    def test_compare_flags_slowdowns_beyond_tolerance(self):
+        baseline = {"apply_rules": {"ops_per_sec": 1000.0, "p50_us": 10.0}}
+
+        self.assertEqual(compare({"apply_rules": {"ops_per_sec": 900.0, "p50_us": 11.0}}, baseline, 0.25), [])
+        self.assertEqual(len(compare({"apply_rules": {"ops_per_sec": 500.0, "p50_us": 20.0}}, baseline, 0.25)), 2)
+        self.assertEqual(compare({"new_case": {"ops_per_sec": 1.0, "p50_us": 1e6}}, baseline, 0.25), [])
+
+    def test_price_check_bypasses_the_quote_cache(self):
+        store = StaticCatalogueStore(synthetic_source(Scale(skus=50, categories=5, rules=5)))
+        selections = random_selections(CatalogueGateway(store=store).components_by_category, 4)
+        cache, provider = api_configurator.quote_cache, api_configurator.catalogue_provider
+        stats = cache.stats() if cache is not None else None
+
+        result = asyncio.run(bench_price_check(store, selections, 40, 4))
+
+        self.assertEqual(result["calls"], 10)
+        self.assertIs(api_configurator.quote_cache, cache)
+        self.assertIs(api_configurator.catalogue_provider, provider)
+        if cache is not None:
+            self.assertEqual(cache.stats(), stats)
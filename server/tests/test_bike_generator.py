@@ -117,6 +117,30 @@ class TestBikeConfigurationIntegration(unittest.IsolatedAsyncioTestCase):
         
         with self.assertRaises(ValueError):
             await self.config_service.create_bike_from_selection(selection_incomplete)
+
+    async def test_components_come_from_the_category_index(self):
+        calls = []
+        find_component = self.catalogue_gateway.find_component
+
+        def counting_find(component_id):
+            calls.append(component_id)
+            return find_component(component_id)
+
+        self.catalogue_gateway.find_component = counting_find
+        bike = await self.config_service.create_bike_from_selection(self.selection_ok)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(list(bike.components), ["frame_type", "frame_finish", "wheels", "rim_color", "chain"])
+        self.assertEqual(bike.wheels.id, W_R)
+
+    async def test_id_to_category_map_is_read_only(self):
+        category_by_id = await self.catalogue_gateway.build_id_to_category_map()
+
+        self.assertEqual(category_by_id[W_R], "wheels")
+        with self.assertRaises(TypeError):
+            category_by_id[W_R] = "chain"
+        self.assertEqual(await self.catalogue_gateway.resolve_selection([W_R]), {"wheels": W_R})
+
             
     async def asyncTearDown(self):
         self.catalogue_gateway = None
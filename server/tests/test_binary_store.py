@@ -0,0 +1,86 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.storage import BinaryCatalogueStore, MappedCatalogue
+from server.services.storage.binary_store import write_catalogue_snapshot
+from server.services.storage.json_store import DATA_PATH, COMPONENTS_FILE, JsonCatalogueStore
+
+
+class TestBinaryCatalogueStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.path = self.tmp_dir / "catalogue.snapshot"
+        write_catalogue_snapshot(self.path, JsonCatalogueStore().read_sources())
+        self.json_gateway = CatalogueGateway()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_snapshot_round_trips_the_catalogue(self):
+        store = BinaryCatalogueStore(self.path)
+        gateway = CatalogueGateway(store=store)
+
+        self.assertEqual(gateway.version, self.json_gateway.version)
+        self.assertEqual(gateway.components_by_category, self.json_gateway.components_by_category)
+        self.assertEqual(gateway.rules_raw, self.json_gateway.rules_raw)
+        self.assertEqual(gateway.pricing_rules, self.json_gateway.pricing_rules)
+        store.close()
+
+    def test_gateway_reads_components_from_the_mapping(self):
+        store = BinaryCatalogueStore(self.path)
+        gateway = CatalogueGateway(store=store)
+        ids = ["T-FS", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S", "W-ROAD", "NOPE"]
+
+        codes = gateway.category_index.encode_ids(ids)
+        self.assertEqual(gateway.components_version, self.json_gateway.components_version)
+        self.assertEqual(codes, self.json_gateway.category_index.encode_ids(ids))
+        self.assertEqual(gateway.category_index.components_of(codes), self.json_gateway.category_index.components_of(codes))
+        self.assertEqual(gateway.category_index.layout(), self.json_gateway.category_index.layout())
+        self.assertEqual(asyncio.run(gateway.resolve_selection(ids)), asyncio.run(self.json_gateway.resolve_selection(ids)))
+        self.assertEqual(gateway.compatibility_constraints, self.json_gateway.compatibility_constraints)
+        self.assertNotIn("components_by_id", gateway.__dict__)
+        store.close()
+
+    def test_old_snapshots_keep_reading_a_replaced_file(self):
+        store = BinaryCatalogueStore(self.path)
+        provider = CatalogueProvider(check_interval=0, store=store)
+        first = provider.get_snapshot()
+
+        data_dir = self.tmp_dir / "data"
+        shutil.copytree(DATA_PATH, data_dir)
+        components = json.loads((data_dir / COMPONENTS_FILE).read_text())
+        components[0]["price"] = 999.0
+        (data_dir / COMPONENTS_FILE).write_text(json.dumps(components))
+        write_catalogue_snapshot(self.path, JsonCatalogueStore(data_dir).read_sources())
+
+        second = provider.get_snapshot()
+        self.assertEqual(asyncio.run(second.get_component_by_id("T-FS")).price, 999.0)
+        self.assertEqual(asyncio.run(first.get_component_by_id("T-FS")).price, 130.0)
+        store.close()
+
+    def test_mapped_lookups_read_from_the_file(self):
+        mapped = MappedCatalogue(self.path)
+
+        self.assertEqual(mapped.categories, tuple(self.json_gateway.components_by_category))
+        self.assertEqual(mapped.component("W-MTN"), self.json_gateway.components_by_id["W-MTN"])
+        self.assertIsNone(mapped.component("W-NOPE"))
+        self.assertEqual(mapped.components_in_category("wheels"), self.json_gateway.components_by_category["wheels"])
+
+        self.assertEqual(mapped.rules_source().compatibility_rules, self.json_gateway.rules_raw)
+        mapped.close()
+
+    def test_rejects_foreign_and_truncated_files(self):
+        foreign = self.tmp_dir / "foreign.snapshot"
+        foreign.write_bytes(b"not a snapshot")
+        truncated = self.tmp_dir / "truncated.snapshot"
+        truncated.write_bytes(self.path.read_bytes()[:200])
+
+        for path in (foreign, truncated):
+            with self.assertRaises(ValueError):
+                MappedCatalogue(path)
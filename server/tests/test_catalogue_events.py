@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from server.services.catalogue_events import HEARTBEAT, CatalogueEventBroadcaster, SubscriberLimitReached
+from server.controllers import api_configurator
+from server.controllers.api_configurator import SubscriberStreamingResponse
+from server.benchmarks.catalogue_events import run_load_test
+
+
+def snapshot(revision: int, components=("a",), rules=(), pricing_rules=()):
+    return SimpleNamespace(
+        version=f"v{revision}", revision=revision,
+        components_version=",".join(components), rules_raw=list(rules), pricing_rules=list(pricing_rules),
+    )
+
+def event_data(chunk: bytes):
+    return json.loads(chunk.split(b"data: ", 1)[1].split(b"\n", 1)[0])
+
+
+class TestCatalogueEventBroadcaster(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.broadcaster = CatalogueEventBroadcaster(max_subscribers=2, heartbeat=0.05)
+        self.broadcaster.publish(snapshot(1))
+
+    async def test_stream_starts_with_the_current_version(self):
+        stream = self.broadcaster.stream(snapshot(1))
+        first = await anext(stream)
+
+        self.assertTrue(first.startswith(b"retry: "))
+        self.assertIn(b"id: 1\n", first)
+        self.assertEqual(event_data(first), {"version": "v1", "revision": 1, "changed": None})
+        self.assertEqual(self.broadcaster.subscribers, 1)
+
+        await stream.aclose()
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+    async def test_reconnect_with_current_id_skips_the_first_event(self):
+        stream = self.broadcaster.stream(snapshot(1), last_event_id="1")
+
+        self.assertNotIn(b"event:", await anext(stream))
+        self.assertEqual(await anext(stream), HEARTBEAT)
+        await stream.aclose()
+
+    async def test_change_published_from_another_thread_names_changed_resources(self):
+        stream = self.broadcaster.stream(snapshot(1))
+        await anext(stream)
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+
+        publisher = threading.Thread(target=self.broadcaster.publish, args=(snapshot(2, pricing_rules=[{"rule_id": "P9"}]),))
+        publisher.start()
+        publisher.join()
+
+        self.assertEqual(event_data(await waiting), {"version": "v2", "revision": 2, "changed": ["pricing_rules"]})
+        await stream.aclose()
+
+    async def test_slow_stream_only_gets_the_latest_change(self):
+        stream = self.broadcaster.stream(snapshot(1))
+        await anext(stream)
+
+        self.broadcaster.publish(snapshot(2, rules=[{"rule_id": "R9"}]))
+        self.broadcaster.publish(snapshot(3, rules=[{"rule_id": "R9"}], pricing_rules=[{"rule_id": "P9"}]))
+
+        self.assertEqual(event_data(await anext(stream))["revision"], 3)
+        self.assertEqual(await anext(stream), HEARTBEAT)
+        await stream.aclose()
+
+    async def test_older_revisions_are_ignored(self):
+        self.broadcaster.publish(snapshot(3))
+        self.broadcaster.publish(snapshot(2, components=("b",)))
+
+        stream = self.broadcaster.stream(snapshot(3), last_event_id="3")
+        await anext(stream)
+        self.assertEqual(await anext(stream), HEARTBEAT)
+        await stream.aclose()
+
+    async def test_capacity_is_bounded(self):
+        streams = [self.broadcaster.stream(snapshot(1)) for _ in range(2)]
+        for stream in streams:
+            await anext(stream)
+
+        with self.assertRaises(SubscriberLimitReached):
+            self.broadcaster.reserve()
+
+        await streams[0].aclose()
+        self.broadcaster.reserve().release()
+        await streams[1].aclose()
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+    async def test_reserved_slots_count_before_the_stream_starts(self):
+        slots = [self.broadcaster.reserve() for _ in range(2)]
+        with self.assertRaises(SubscriberLimitReached):
+            self.broadcaster.reserve()
+
+        stream = self.broadcaster.stream(snapshot(1), None, slots[0])
+        await anext(stream)
+        self.assertEqual(self.broadcaster.subscribers, 2)
+        await stream.aclose()
+        slots[0].release()
+        slots[1].release()
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+    async def test_response_releases_a_stream_that_never_started(self):
+        slot = self.broadcaster.reserve()
+        response = SubscriberStreamingResponse(self.broadcaster.stream(snapshot(1), None, slot), slot, media_type="text/event-stream")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with self.assertRaises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+
+class TestCatalogueWatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_failed_checks_do_not_stop_the_watcher(self):
+        provider = SimpleNamespace(check_interval=0, get_snapshot=mock.Mock(side_effect=OSError("store unavailable")))
+        with mock.patch.object(api_configurator, "catalogue_provider", provider), mock.patch.object(api_configurator.catalogue_events, "subscribers", 1):
+            watcher = asyncio.create_task(api_configurator.watch_catalogue_changes())
+            await asyncio.sleep(0.35)
+            watcher.cancel()
+
+        self.assertGreaterEqual(provider.get_snapshot.call_count, 2)
+
+
+class TestCatalogueEventsEndpoint(unittest.TestCase):
+
+    def test_every_stream_receives_each_change(self):
+        results = asyncio.run(run_load_test(connections=50, changes=2))
+
+        self.assertEqual(results["connections"], 50)
+        self.assertEqual(results["open_after_disconnect"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from server.services.storage.json_store import DATA_PATH, COMPONENTS_FILE
+from server.services.catalogue_provider import CatalogueProvider
+
+
+class TestCatalogueProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        for source in DATA_PATH.glob("*.json"):
+            shutil.copy(source, self.tmp_dir / source.name)
+        self.provider = CatalogueProvider(data_path=self.tmp_dir, check_interval=0)
+
+    def _rewrite_components(self, price: float):
+        file_path = self.tmp_dir / COMPONENTS_FILE
+        components = json.loads(file_path.read_text())
+        components[0]["price"] = price
+        file_path.write_text(json.dumps(components))
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_snapshot_is_shared_until_sources_change(self):
+        first = self.provider.get_snapshot()
+        self.assertIs(first, self.provider.get_snapshot())
+
+        self._rewrite_components(999.0)
+        second = self.provider.get_snapshot()
+
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(second.components_by_id["T-FS"].price, 999.0)
+        # The old snapshot is left untouched for requests still using it.
+        self.assertEqual(first.components_by_id["T-FS"].price, 130.0)
+
+    def test_reload_without_changes_keeps_snapshot(self):
+        first = self.provider.get_snapshot()
+        snapshot, reloaded = self.provider.reload()
+
+        self.assertIs(first, snapshot)
+        self.assertFalse(reloaded)
+
+    def test_failed_reload_keeps_previous_snapshot(self):
+        first = self.provider.get_snapshot()
+        (self.tmp_dir / COMPONENTS_FILE).write_text("[{broken")
+
+        snapshot, reloaded = self.provider.reload()
+
+        self.assertIs(first, snapshot)
+        self.assertFalse(reloaded)
+
+    def test_peek_returns_the_snapshot_only_while_no_check_is_due(self):
+        self.assertIsNone(self.provider.peek())
+        snapshot = self.provider.get_snapshot()
+        # check_interval=0: every call is due for a source check.
+        self.assertIsNone(self.provider.peek())
+
+        self.provider.check_interval = 3600
+        self.provider.reload()
+        self.assertIs(self.provider.peek(), snapshot)
+
+    def test_listeners_receive_new_snapshot(self):
+        received = []
+        self.provider.subscribe(received.append)
+        self.provider.get_snapshot()
+        self._rewrite_components(1.0)
+        snapshot = self.provider.get_snapshot()
+
+        self.assertEqual(received[-1], snapshot)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
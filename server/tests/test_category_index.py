@@ -0,0 +1,59 @@
+import unittest
+from server.benchmarks.synthetic import Scale, StaticCatalogueStore, random_selections, synthetic_source
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.category_index import MISSING
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+
+SELECTION = {"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"}
+
+
+class TestCategoryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.gateway = CatalogueGateway()
+        self.index = self.gateway.category_index
+
+    def test_categories_follow_the_catalogue(self):
+        self.assertEqual(self.index.categories, tuple(self.gateway.components_by_category))
+
+    def test_round_trip(self):
+        codes = self.index.encode(SELECTION)
+
+        self.assertEqual(len(codes), len(self.index.categories))
+        self.assertNotIn(MISSING, codes)
+        self.assertEqual(self.index.ids_of(codes), SELECTION)
+        self.assertEqual(list(self.index.components_of(codes)), list(self.index.categories))
+        self.assertEqual(self.index.encode_ids(SELECTION.values()), codes)
+
+    def test_unknown_and_misfiled_ids_are_not_selected(self):
+        codes = self.index.encode({**SELECTION, "chain": "W-ROAD", "wheels": "NOPE"})
+
+        self.assertEqual(codes[self.index.categories.index("chain")], MISSING)
+        self.assertEqual(codes[self.index.categories.index("wheels")], MISSING)
+        self.assertEqual(self.index.encode_ids(["NOPE"]), self.index.empty)
+
+    def test_later_id_of_a_category_wins(self):
+        codes = self.index.encode_ids(["CH-SS", "CH-8S"])
+        self.assertEqual(self.index.ids_of(codes), {"chain": "CH-8S"})
+
+    def test_rule_only_edits_keep_the_index(self):
+        self.assertIs(CatalogueGateway(previous=self.gateway).category_index, self.index)
+
+
+class TestCategoriesFromData(unittest.IsolatedAsyncioTestCase):
+
+    async def test_new_categories_need_no_code(self):
+        gateway = CatalogueGateway(store=StaticCatalogueStore(synthetic_source(Scale(skus=120, categories=12, rules=0))))
+        service = BikeConfiguratorService(gateway, PriceCalculator(StandardPricingStrategy()), gateway.pricing_rule_applicator)
+
+        for selection in random_selections(gateway.components_by_category, 5):
+            bike = await service.create_bike_from_selection(selection)
+
+            self.assertEqual(list(bike.components), list(gateway.components_by_category))
+            self.assertEqual(bike.price, sum(gateway.components_by_id[component_id].price for component_id in selection.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import itertools
+import unittest
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.columnar_catalogue import np
+from server.services.pricing.pricing_rule_applicator import PricingRuleApplicator
+
+
+def rule(rule_id, selectors, effect_type, value, target_category=None, target_id=None):
+    effect = {"type": effect_type, "value": value}
+    if target_category:
+        effect["target_category"] = target_category
+    if target_id:
+        effect["target_id"] = target_id
+    return {"rule_id": rule_id, "selectors": selectors, "effect": effect}
+
+def rule_sets(gateway):
+    # The shipped rules, plus a set where discounts, a surcharge and a combo
+    # change which bike is cheapest.
+    return (
+        gateway.pricing_rule_applicator,
+        PricingRuleApplicator([
+            rule("P1", [{"category": "frame_type", "id": "T-FS"}], "PERCENT_OFF", 60, "frame_type"),
+            rule("P2", [{"category": "wheels", "id": "W-ROAD"}], "PERCENT_OFF", -50, "wheels"),
+            rule("P3", [{"category": "wheels", "id": "W-FAT"}, {"category": "chain", "id": "CH-8S"}], "COMBO_PRICE", 100.0),
+            rule("P4", [], "AMOUNT_OFF", 15, "rim_color", "C-BLACK"),
+        ]),
+    )
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnarCatalogue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.gateway = CatalogueGateway()
+        self.store = self.gateway.get_columnar_store()
+
+    async def test_rows_are_views_of_catalogue_objects(self):
+        wheels = self.store.filter(category="wheels")
+        self.assertEqual(wheels, await self.gateway.get_components_by_category("wheels"))
+        self.assertIs(wheels[0], self.gateway.components_by_id["W-ROAD"])
+
+    async def test_price_filter(self):
+        ids = [c.id for c in self.store.filter(min_price=90, max_price=110)]
+        self.assertEqual(ids, ["T-DIAMOND", "T-STEP", "W-MTN", "W-FAT"])
+
+    async def test_min_price_by_category(self):
+        self.assertEqual(self.store.min_price_by_category(), {
+            "frame_type": 100.0, "frame_finish": 30.0, "wheels": 80.0, "rim_color": 20.0, "chain": 43.0,
+        })
+
+    async def test_reprice_applies_rules_each_component_triggers_alone(self):
+        prices = self.store.reprice(PricingRuleApplicator([
+            rule("P1", [], "PERCENT_OFF", 50, "wheels"),
+            rule("P2", [{"category": "wheels", "id": "W-FAT"}], "FIXED_PRICE", 10.0, "wheels"),
+            rule("P3", [{"category": "frame_type", "id": "T-FS"}], "AMOUNT_OFF", 30, "wheels"),
+        ]))
+        rows = self.store.category_slice("wheels")
+
+        self.assertEqual(prices[rows].tolist(), [40.0, 45.0, 5.0])
+        self.assertEqual(self.store.prices[rows].tolist(), [80.0, 90.0, 95.0])
+        self.assertEqual(self.store.reprice(self.gateway.pricing_rule_applicator).tolist(), self.store.prices.tolist())
+
+    async def _brute_force_cheapest(self, rule_applicator):
+        best = None
+        categories = list(self.gateway.components_by_category.values())
+        for combo in itertools.product(*categories):
+            selection = {c.category: c for c in combo}
+            if await self.gateway.check_compatibility_of_selection(selection):
+                continue
+            total = rule_applicator.apply_rules(list(combo))
+            if best is None or total < best:
+                best = total
+        return best
+
+    async def test_cheapest_valid_bike_matches_brute_force(self):
+        for rule_applicator in rule_sets(self.gateway):
+            selection, total = self.store.cheapest_valid_bike(self.gateway.compatibility_index, rule_applicator)
+            self.assertAlmostEqual(total, await self._brute_force_cheapest(rule_applicator))
+
+            components = {cat: self.gateway.components_by_id[i] for cat, i in selection.items()}
+            self.assertEqual(await self.gateway.check_compatibility_of_selection(components), [])
+            self.assertAlmostEqual(rule_applicator.apply_rules(list(components.values())), total)
+
+    async def test_cheapest_valid_bike_respects_rules(self):
+        # Make W-MTN the only cheap wheel: R001 then forces the T-FS frame.
+        rule_applicator = PricingRuleApplicator([
+            rule("P1", [], "FIXED_PRICE", 0.0, "wheels", "W-MTN"),
+            rule("P2", [], "FIXED_PRICE", 101.0, "frame_type", "T-FS"),
+        ])
+
+        selection, total = self.store.cheapest_valid_bike(self.gateway.compatibility_index, rule_applicator)
+        self.assertEqual((selection["wheels"], selection["frame_type"]), ("W-MTN", "T-FS"))
+        self.assertEqual(total, 101.0 + 30.0 + 0.0 + 20.0 + 43.0)
+
+    async def test_price_bounds_hold_for_every_valid_bike(self):
+        for rule_applicator in rule_sets(self.gateway):
+            floors, ceilings = self.store.price_bounds(rule_applicator)
+            for combo in itertools.product(*self.gateway.components_by_category.values()):
+                final_prices, _ = rule_applicator.price_breakdown(list(combo))
+                for component in combo:
+                    row = self.store.row_by_id[component.id]
+                    self.assertLessEqual(floors[row], final_prices[component.category])
+                    self.assertGreaterEqual(ceilings[row], final_prices[component.category])
@@ -0,0 +1,71 @@
+import random
+import unittest
+from server.components.abc_components import BikeComponent
+from server.services.compatibility_index import CompatibilityIndex
+
+CATEGORIES = ["frame_type", "frame_finish", "wheels", "rim_color", "chain"]
+
+
+def linear_scan(rules, selection_by_category):
+    errors = []
+    for rule in rules:
+        rule_id = rule.get("rule_id", "N/A")
+        affects_category = rule.get("affects_category")
+        component_to_validate = selection_by_category.get(affects_category)
+        if not component_to_validate:
+            continue
+        for condition_set in rule.get("conditions", []):
+            selector = condition_set.get("selector", {})
+            result_set = condition_set.get("result_set", {})
+            selector_component = selection_by_category.get(selector.get("category"))
+            if selector_component and selector_component.id == selector.get("id"):
+                value_to_check = component_to_validate.id
+                if 'include' in result_set.get(affects_category, {}):
+                    required_values = result_set[affects_category]['include']
+                    if value_to_check not in required_values:
+                        errors.append(
+                            f"({rule_id}): The selection of {selector_component.id} requires "
+                            f"{affects_category} to be one of {required_values}, but component ID is '{value_to_check}'."
+                        )
+                if 'exclude' in result_set.get(affects_category, {}):
+                    if value_to_check in result_set[affects_category]['exclude']:
+                        errors.append(
+                            f"({rule_id}): The selection of {selector_component.id} does not allow "
+                            f"{affects_category} to be '{value_to_check}'."
+                        )
+    return errors
+
+
+class TestCompatibilityIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.ids = {cat: [f"{cat}-{i}" for i in range(6)] for cat in CATEGORIES}
+        self.rules = []
+
+        for rule_number in range(200):
+            affects_category, selector_category = rng.sample(CATEGORIES, 2)
+            conditions = []
+            for _ in range(rng.randint(1, 3)):
+                kind = rng.choice(["include", "exclude"])
+                conditions.append({
+                    "selector": {"category": selector_category, "id": rng.choice(self.ids[selector_category])},
+                    "result_set": {affects_category: {kind: rng.sample(self.ids[affects_category], rng.randint(0, 3))}}
+                })
+            self.rules.append({"rule_id": f"R{rule_number:03}", "affects_category": affects_category, "conditions": conditions})
+
+        self.index = CompatibilityIndex(self.rules)
+        self.rng = rng
+
+    def test_matches_linear_scan(self):
+        for _ in range(500):
+            selection = {
+                cat: BikeComponent(id=self.rng.choice(ids), name=cat, category=cat)
+                for cat, ids in self.ids.items()
+                if self.rng.random() > 0.1
+            }
+            self.assertEqual(self.index.check(selection), linear_scan(self.rules, selection))
+
+    def test_only_selected_components_are_looked_up(self):
+        component = BikeComponent(id="unknown", name="Unknown", category="wheels")
+        self.assertEqual(self.index.triggered_by(component), ())
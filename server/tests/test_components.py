@@ -0,0 +1,30 @@
+import pickle
+import unittest
+from dataclasses import FrozenInstanceError
+from server.components.abc_components import BikeComponent
+from server.components.chain.factory import ChainFactory
+
+
+class TestBikeComponentModel(unittest.TestCase):
+
+    def test_extra_attributes_are_stored_sparsely(self):
+        plain = BikeComponent.from_record({"id": "CH-SS", "category": "chain", "name": "Single-speed Chain", "price": 43.0})
+        extended = BikeComponent.from_record({"id": "CH-8S", "category": "chain", "name": "8-speed Chain", "price": 67.0, "weight_g": 280})
+
+        self.assertIsNone(plain.extras)
+        self.assertEqual(extended.weight_g, 280)
+        self.assertEqual(extended.to_dict()["weight_g"], 280)
+        self.assertFalse(hasattr(plain, "weight_g"))
+        self.assertFalse(hasattr(plain, "__dict__"))
+
+    def test_categories_are_interned(self):
+        first = BikeComponent.from_record({"id": "a", "category": "".join(["rim_", "color"]), "name": "A", "price": 1.0})
+        second = BikeComponent.from_record({"id": "b", "category": "".join(["rim", "_color"]), "name": "B", "price": 1.0})
+        self.assertIs(first.category, second.category)
+
+    def test_components_are_frozen_and_picklable(self):
+        chain = ChainFactory.create_component({"id": "CH-SS", "category": "chain", "name": "Single-speed Chain", "base_price": 43.0})
+
+        with self.assertRaises(FrozenInstanceError):
+            chain.price = 0
+        self.assertEqual(pickle.loads(pickle.dumps(chain)), chain)
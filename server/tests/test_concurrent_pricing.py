@@ -0,0 +1,66 @@
+import asyncio
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+from server.services.quote_cache import QuoteCache
+
+SELECTIONS = {
+    ("T-DIAMOND", "F-SHINY", "W-ROAD", "C-BLACK", "CH-SS"): (True, 278.0),
+    ("T-FS", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S"): (True, 362.0),
+    ("T-FS", "F-SHINY", "W-FAT", "C-BLUE", "CH-SS"): (True, 318.0),
+    ("T-DIAMOND", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S"): (False, 0.0),
+    ("T-STEP", "F-SHINY", "W-FAT", "C-RED", "CH-SS"): (False, 0.0),
+}
+CATEGORIES = ("frame_type", "frame_finish", "wheels", "rim_color", "chain")
+
+
+class YieldingGateway(CatalogueGateway):
+    # Hands control back to the event loop whenever a quote decodes its
+    # selection, so that quotes running on a shared service interleave
+    # between the cache lookup and the cache write.
+    decoded = 0
+
+    async def decode_selection(self, codes):
+        self.decoded += 1
+        await asyncio.sleep(0)
+        return await super().decode_selection(codes)
+
+
+class TestConcurrentPricing(unittest.TestCase):
+
+    def setUp(self):
+        gateway = YieldingGateway()
+        self.shared_calculator = PriceCalculator(strategy=StandardPricingStrategy())
+        self.services = [
+            BikeConfiguratorService(gateway, self.shared_calculator, gateway.pricing_rule_applicator),
+            BikeConfiguratorService(gateway, self.shared_calculator, gateway.pricing_rule_applicator, quote_cache=QuoteCache(maxsize=3)),
+        ]
+
+    async def _fire(self, service, keys):
+        async def quote(key):
+            bike = await service.create_bike_from_selection(dict(zip(CATEGORIES, key)))
+            return key, bike.is_valid, bike.price
+
+        return await asyncio.gather(*(quote(key) for key in keys))
+
+    def _run_batch(self, service, seed):
+        rng = random.Random(seed)
+        keys = [rng.choice(list(SELECTIONS)) for _ in range(1000)]
+        return asyncio.run(self._fire(service, keys))
+
+    def test_interleaved_quotes_on_shared_services(self):
+        for service in self.services:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                batches = list(pool.map(lambda seed: self._run_batch(service, seed), range(4)))
+
+            results = [result for batch in batches for result in batch]
+            self.assertEqual(len(results), 4000)
+            for key, is_valid, price in results:
+                self.assertEqual((is_valid, price), SELECTIONS[key], key)
+
+        # The yield point sits on the path quotes actually take.
+        self.assertGreater(self.services[0].catalogue.decoded, 0)
@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.configuration_enumerator import ConfigurationEnumerator
+
+CATEGORIES = ["frame_type", "frame_finish", "wheels", "rim_color", "chain"]
+
+
+def write_synthetic_catalogue(path: Path, seed: int = 3):
+    rng = random.Random(seed)
+    components = [
+        {"id": f"{cat}-{i}", "category": cat, "name": f"{cat} {i}", "price": float(rng.randint(10, 200))}
+        for cat in CATEGORIES for i in range(4)
+    ]
+    rules = []
+    for number in range(25):
+        affects, selector = rng.sample(CATEGORIES, 2)
+        kind = rng.choice(["include", "exclude"])
+        rules.append({
+            "rule_id": f"R{number}",
+            "affects_category": affects,
+            "conditions": [{
+                "selector": {"category": selector, "id": f"{selector}-{rng.randrange(4)}"},
+                "result_set": {affects: {kind: [f"{affects}-{i}" for i in rng.sample(range(4), 2)]}},
+            }],
+        })
+    pricing_rules = [
+        {"rule_id": "P1", "selectors": [{"category": "frame_type", "id": "frame_type-0"}],
+         "effect": {"target_category": "wheels", "type": "PERCENT_OFF", "value": 25}},
+        {"rule_id": "P2", "selectors": [{"category": "wheels", "id": "wheels-1"}, {"category": "chain", "id": "chain-2"}],
+         "effect": {"type": "AMOUNT_OFF", "value": 30}},
+    ]
+    for name, data in (("components.json", components), ("compatibility_rules.json", rules), ("pricing_rules.json", pricing_rules)):
+        (path / name).write_text(json.dumps(data))
+
+
+class TestConfigurationEnumerator(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        write_synthetic_catalogue(self.tmp_dir)
+        self.gateways = [CatalogueGateway(), CatalogueGateway(data_path=self.tmp_dir)]
+
+    async def _brute_force(self, gateway):
+        expected = {}
+        for combo in itertools.product(*gateway.components_by_category.values()):
+            selection = {c.category: c for c in combo}
+            if not await gateway.check_compatibility_of_selection(selection):
+                expected[tuple(c.id for c in combo)] = gateway.pricing_rule_applicator.apply_rules(list(combo))
+        return expected
+
+    async def test_enumeration_matches_cartesian_product(self):
+        for gateway in self.gateways:
+            enumerated = {tuple(selection.values()): price for selection, price in ConfigurationEnumerator(gateway).iter_valid()}
+            self.assertEqual(enumerated, await self._brute_force(gateway))
+
+    async def test_price_queries(self):
+        for gateway in self.gateways:
+            prices = sorted((await self._brute_force(gateway)).values())
+            enumerator = ConfigurationEnumerator(gateway)
+
+            self.assertEqual(enumerator.price_range(), (prices[0], prices[-1]))
+            self.assertEqual([price for _, price in enumerator.cheapest(3)], prices[:3])
+            self.assertEqual([price for _, price in enumerator.most_expensive(2)], prices[::-1][:2])
+
+    async def test_bounded_search_matches_a_full_scan(self):
+        for gateway in self.gateways:
+            enumerator = ConfigurationEnumerator(gateway)
+            first_category, first_components = next(iter(gateway.components_by_category.items()))
+
+            for fixed in (None, {first_category: first_components[-1].id}):
+                valid = list(enumerator.iter_valid(fixed))
+                for k in (1, 5, len(valid) + 1):
+                    self.assertEqual(enumerator.cheapest(k, fixed), heapq.nsmallest(k, valid, key=lambda priced: priced[1]))
+                    self.assertEqual(enumerator.most_expensive(k, fixed), heapq.nlargest(k, valid, key=lambda priced: priced[1]))
+
+    async def test_fixed_prefix_and_from_prices(self):
+        enumerator = ConfigurationEnumerator(self.gateways[0])
+
+        self.assertTrue(all(s["wheels"] == "W-MTN" and s["frame_type"] == "T-FS" for s, _ in enumerator.iter_valid({"wheels": "W-MTN"})))
+        self.assertEqual(list(enumerator.iter_valid({"wheels": "W-MTN", "frame_type": "T-STEP"})), [])
+        self.assertEqual(enumerator.from_prices("frame_type"), {"T-FS": 303.0, "T-DIAMOND": 273.0, "T-STEP": 283.0})
+        self.assertIsNone(enumerator.price_range({"wheels": "W-MTN", "frame_type": "T-STEP"}))
+        with self.assertRaisesRegex(ValueError, "Unknown category 'saddle'"):
+            enumerator.from_prices("saddle")
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.tmp_dir)
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+from server.services.quote_cache import QuoteCache
+from server.services.rule_diff import diff_rules
+from server.services.storage.json_store import DATA_PATH, COMPATIBILITY_RULES_FILE, PRICING_RULES_FILE
+
+FS_MATTE = {"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"}
+DIAMOND_ROAD = {"frame_type": "T-DIAMOND", "frame_finish": "F-SHINY", "wheels": "W-ROAD", "rim_color": "C-RED", "chain": "CH-SS"}
+
+
+class TestRuleDiff(unittest.TestCase):
+
+    def test_added_changed_removed_and_moved_rules(self):
+        old = [{"rule_id": "A", "v": 1}, {"rule_id": "B", "v": 1}, {"rule_id": "C", "v": 1}, {"rule_id": "D", "v": 1}]
+        new = [{"rule_id": "A", "v": 2}, {"rule_id": "D", "v": 1}, {"rule_id": "B", "v": 1}, {"rule_id": "E", "v": 1}]
+
+        diff = diff_rules(old, new)
+
+        self.assertEqual(diff.added, {"E"})
+        self.assertEqual(diff.removed, {"C"})
+        # D moved ahead of B, which changes their relative order.
+        self.assertEqual(diff.changed, {"A", "B", "D"})
+        self.assertTrue(diff_rules(new, new).is_empty)
+
+
+class TestIncrementalRules(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        for source in DATA_PATH.glob("*.json"):
+            shutil.copy(source, self.tmp_dir / source.name)
+
+        self.provider = CatalogueProvider(data_path=self.tmp_dir, check_interval=0)
+        self.cache = QuoteCache()
+        self.provider.subscribe(
+            lambda snapshot: self.cache.invalidate_all(snapshot.revision) if snapshot.affected_component_ids is None
+            else self.cache.invalidate(snapshot.affected_component_ids, snapshot.revision),
+            before_swap=True,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _edit(self, filename, edit):
+        file_path = self.tmp_dir / filename
+        data = json.loads(file_path.read_text())
+        edit(data)
+        file_path.write_text(json.dumps(data))
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def _service(self, gateway):
+        return BikeConfiguratorService(
+            catalogue_gateway=gateway,
+            price_calculator=PriceCalculator(strategy=StandardPricingStrategy()),
+            pricing_rules_app=gateway.pricing_rule_applicator,
+            quote_cache=self.cache,
+        )
+
+    async def test_rule_edit_recompiles_only_touched_rules(self):
+        first = self.provider.get_snapshot()
+        self._edit(PRICING_RULES_FILE, lambda rules: rules[0]["effect"].update(value=40.0))
+        second = self.provider.get_snapshot()
+
+        self.assertIs(second.components_by_id, first.components_by_id)
+        self.assertIs(second.compatibility_index.conditions_by_rule["R001"], first.compatibility_index.conditions_by_rule["R001"])
+        self.assertIsNot(second.pricing_rule_applicator.compiled_by_key["P001"], first.pricing_rule_applicator.compiled_by_key["P001"])
+        self.assertEqual(second.affected_component_ids, {"T-FS", "F-MATTE"})
+        self.assertEqual(second.rule_changes_since, {first.version: {"T-FS", "F-MATTE"}})
+        self.assertEqual(second.quote_lineage, first.quote_lineage)
+
+        # The incremental snapshot matches one built from scratch.
+        fresh = CatalogueGateway(data_path=self.tmp_dir)
+        self.assertEqual(second.compatibility_index.conditions_by_selector, fresh.compatibility_index.conditions_by_selector)
+        self.assertEqual(second.pricing_rule_applicator.compiled_rules, fresh.pricing_rule_applicator.compiled_rules)
+        self.assertEqual(second.compatibility_constraints, fresh.compatibility_constraints)
+
+    async def test_compatibility_edit_rebuilds_its_constraints(self):
+        self.provider.get_snapshot()
+        self._edit(COMPATIBILITY_RULES_FILE, lambda rules: rules.insert(0, {
+            "rule_id": "R000",
+            "affects_category": "chain",
+            "conditions": [{"selector": {"category": "frame_type", "id": "T-STEP"}, "result_set": {"chain": {"exclude": ["CH-8S"]}}}],
+        }))
+        second = self.provider.get_snapshot()
+        fresh = CatalogueGateway(data_path=self.tmp_dir)
+
+        self.assertEqual(second.affected_component_ids, {"T-STEP"})
+        self.assertEqual(second.compatibility_constraints, fresh.compatibility_constraints)
+        self.assertEqual(await second.check_compatibility_of_selection({"frame_type": second.components_by_id["T-STEP"], "chain": second.components_by_id["CH-8S"]}),
+                         await fresh.check_compatibility_of_selection({"frame_type": fresh.components_by_id["T-STEP"], "chain": fresh.components_by_id["CH-8S"]}))
+
+    async def test_only_affected_quotes_are_invalidated(self):
+        first = self.provider.get_snapshot()
+        old_service = self._service(first)
+        self.assertEqual((await old_service.create_bike_from_selection(FS_MATTE)).price, 362.0)
+        unaffected = await old_service.create_bike_from_selection(DIAMOND_ROAD)
+
+        self._edit(PRICING_RULES_FILE, lambda rules: rules[0]["effect"].update(value=40.0))
+        new_service = self._service(self.provider.get_snapshot())
+
+        self.assertIs(await new_service.create_bike_from_selection(DIAMOND_ROAD), unaffected)
+        self.assertEqual((await new_service.create_bike_from_selection(FS_MATTE)).price, 352.0)
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    async def test_late_write_from_an_older_snapshot_is_rejected(self):
+        first = self.provider.get_snapshot()
+        self._edit(PRICING_RULES_FILE, lambda rules: rules[0]["effect"].update(value=40.0))
+        second = self.provider.get_snapshot()
+
+        # A request that resolved the old snapshot finishes after the swap.
+        await self._service(first).create_bike_from_selection(FS_MATTE)
+        self.assertEqual(self.cache.stats()["rejected_writes"], 1)
+        self.assertEqual((await self._service(second).create_bike_from_selection(FS_MATTE)).price, 352.0)
+
+    async def test_component_edit_rebuilds_everything(self):
+        first = self.provider.get_snapshot()
+        self._edit("components.json", lambda components: components[0].update(price=999.0))
+        second = self.provider.get_snapshot()
+
+        self.assertIsNot(second.components_by_id, first.components_by_id)
+        self.assertIsNone(second.affected_component_ids)
+        self.assertNotEqual(second.quote_lineage, first.quote_lineage)
+        self.assertEqual(second.rule_changes_since, {})
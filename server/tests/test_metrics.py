@@ -0,0 +1,67 @@
+import unittest
+from server.services.metrics import NOOP_SPAN, MetricsRegistry, metrics
+from fastapi.testclient import TestClient
+from server.main import app
+from server.controllers import api_configurator
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        registry.inc("hits_total")
+        registry.observe("latency_seconds", 0.1)
+
+        self.assertIs(registry.span("work"), NOOP_SPAN)
+        self.assertEqual(registry.render(), "\n")
+
+    def test_render_uses_the_prometheus_text_format(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.inc("hits_total", 2, route="/a")
+        registry.inc("hits_total", route="/a")
+        registry.observe("latency_seconds", 0.003, route='quo"te')
+        registry.observe("latency_seconds", 20.0, route='quo"te')
+
+        text = registry.render()
+
+        self.assertIn("# TYPE bikeshop_hits_total counter", text)
+        self.assertIn('bikeshop_hits_total{route="/a"} 3', text)
+        self.assertIn('bikeshop_latency_seconds_bucket{route="quo\\"te",le="0.005"} 1', text)
+        self.assertIn('bikeshop_latency_seconds_bucket{route="quo\\"te",le="+Inf"} 2', text)
+        self.assertIn('bikeshop_latency_seconds_count{route="quo\\"te"} 2', text)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = metrics.enabled
+        metrics.enabled = True
+        metrics.reset()
+        if api_configurator.quote_cache is not None:
+            api_configurator.quote_cache.clear()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        metrics.enabled = self.enabled
+
+    def test_price_check_is_instrumented(self):
+        # The second incompatible quote is served from the cache.
+        for _ in range(2):
+            self.client.post("/price/check", json={"component_ids": ["T-DIAMOND", "F-SHINY", "W-MTN", "C-BLACK", "CH-SS"], "client_total": 0})
+        self.client.post("/price/check", json={"component_ids": ["NOPE"], "client_total": 0})
+
+        response = self.client.get("/metrics")
+        text = response.text
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        for span in ("map_ids", "resolve_components", "check_compatibility", "serialize"):
+            self.assertIn(f'span="{span}"', text)
+        self.assertIn('bikeshop_validation_failures_total{reason="incompatible"} 2', text)
+        self.assertIn('bikeshop_validation_failures_total{reason="unmapped_ids"} 1', text)
+        self.assertNotIn('reason="price_mismatch"', text)
+        self.assertIn('method="POST",route="/price/check",status="200"', text)
+
+    def test_metrics_endpoint_is_hidden_when_disabled(self):
+        metrics.enabled = False
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
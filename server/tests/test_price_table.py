@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from server.jobs.precompute_prices import precompute_prices
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.configuration_enumerator import ConfigurationEnumerator
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+from server.services.pricing.price_table import FORMAT_VERSION, HEADER, MAGIC, PriceTable, PriceTableWriter, SelectionCodec, open_price_table
+
+
+class TestPriceTable(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = Path(tempfile.mkdtemp())
+        cls.table_path = cls.tmp_dir / "prices.bin"
+        cls.priced = precompute_prices(cls.table_path, workers=2)
+
+    def setUp(self):
+        self.gateway = CatalogueGateway()
+        self.table = PriceTable(self.table_path)
+
+    def test_codec_round_trip(self):
+        codec = SelectionCodec.from_catalogue(self.gateway.components_by_category)
+        for code in range(codec.size):
+            self.assertEqual(codec.encode(codec.decode(code)), code)
+
+    def test_table_matches_enumerator(self):
+        valid = list(ConfigurationEnumerator(self.gateway).iter_valid())
+
+        self.assertEqual(self.priced, len(valid))
+        for selection, price in valid:
+            self.assertEqual(self.table.lookup(selection), price)
+
+        invalid_codes = [code for code in range(self.table.codec.size) if self.table.price_of_code(code) is None]
+        self.assertEqual(len(invalid_codes), self.table.codec.size - len(valid))
+        # Only valid configurations take space in the file.
+        self.assertEqual(self.table.entries, len(valid))
+        self.assertLess(self.table_path.stat().st_size, 4096 + 16 * len(valid))
+
+    def test_writer_sorts_runs_and_merges_them(self):
+        codec = SelectionCodec(["a", "b"], {"a": ["A0", "A1"], "b": ["B0", "B1", "B2"]})
+        path = self.tmp_dir / "merged.bin"
+        writer = PriceTableWriter(path, codec, "v1")
+        writer.write([5, 1], [50.0, 10.0])
+        writer.write([0, 3], [0.5, 30.0])
+        writer.close()
+
+        table = PriceTable(path)
+        self.assertEqual([table.price_of_code(code) for code in range(codec.size)], [0.5, 10.0, None, 30.0, None, 50.0])
+        table.close()
+
+    def test_rewrites_replace_the_file_readers_have_mapped(self):
+        codec = SelectionCodec(["a"], {"a": ["A0", "A1"]})
+        path = self.tmp_dir / "replaced.bin"
+        writer = PriceTableWriter(path, codec, "v1")
+        writer.write([0, 1], [1.0, 2.0])
+        writer.close()
+        mapped = PriceTable(path)
+
+        writer = PriceTableWriter(path, codec, "v2")
+        writer.write([0], [9.0])
+        writer.close()
+
+        self.assertEqual([mapped.price_of_code(code) for code in range(2)], [1.0, 2.0])
+        replaced = PriceTable(path)
+        self.assertEqual((replaced.catalogue_version, replaced.price_of_code(0)), ("v2", 9.0))
+        replaced.close()
+        self.assertFalse(path.with_name(path.name + ".tmp").exists())
+        mapped.close()
+
+    def test_failed_precompute_keeps_the_published_table(self):
+        published = self.table_path.read_bytes()
+
+        with mock.patch("server.jobs.precompute_prices.ProcessPoolExecutor", side_effect=OSError("no workers")):
+            with self.assertRaises(OSError):
+                precompute_prices(self.table_path)
+
+        self.assertEqual(self.table_path.read_bytes(), published)
+
+    def test_damaged_tables_are_rejected(self):
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, b"v1", 8, 0)
+        metadata = b'{"categories":[],"ids_by_category":{}}'
+        damaged = {
+            "empty.bin": b"",
+            "short.bin": b"BKPT",
+            "metadata.bin": header + b"{broken}",
+            "keys.bin": header + b'{"a": 1}',
+            "truncated.bin": HEADER.pack(MAGIC, FORMAT_VERSION, b"v1", len(metadata), 10) + metadata,
+        }
+        for name, content in damaged.items():
+            path = self.tmp_dir / name
+            path.write_bytes(content)
+            with self.assertRaises(ValueError):
+                PriceTable(path)
+            self.assertIsNone(open_price_table(str(path), "v1"))
+
+    def test_table_for_another_catalogue_is_ignored(self):
+        self.assertIsNotNone(open_price_table(str(self.table_path), self.gateway.version))
+        self.assertIsNone(open_price_table(str(self.table_path), "someothervers"))
+        self.assertIsNone(open_price_table(str(self.tmp_dir / "missing.bin"), self.gateway.version))
+
+    def test_table_outlives_rule_only_edits(self):
+        version = self.gateway.version
+        table = open_price_table(str(self.table_path), "newerversion", {version: frozenset({"T-FS"})})
+        selection = {"frame_type": "T-DIAMOND", "frame_finish": "F-SHINY", "wheels": "W-ROAD", "rim_color": "C-RED", "chain": "CH-SS"}
+
+        self.assertEqual(table.excluded_ids, {"T-FS"})
+        self.assertIsNotNone(table.lookup(selection))
+        self.assertIsNone(table.lookup({**selection, "frame_type": "T-FS"}))
+        self.assertIsNone(open_price_table(str(self.table_path), "newerversion", {version: None}))
+        table.close()
+
+    async def test_service_prices_from_table(self):
+        service = BikeConfiguratorService(
+            self.gateway, PriceCalculator(StandardPricingStrategy()), self.gateway.pricing_rule_applicator, price_table=self.table
+        )
+        valid = await service.create_bike_from_selection({"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"})
+        invalid = await service.create_bike_from_selection({"frame_type": "T-DIAMOND", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"})
+
+        self.assertEqual((valid.is_valid, valid.price), (True, 362.0))
+        self.assertFalse(invalid.is_valid)
+        self.assertTrue(any("(R001):" in error for error in invalid.compatibility_errors))
+
+    def tearDown(self):
+        self.table.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
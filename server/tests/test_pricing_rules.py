@@ -0,0 +1,78 @@
+import unittest
+from server.components.abc_components import BikeComponent
+from server.services.pricing.pricing_rule_applicator import PricingRuleApplicator
+
+FRAME = BikeComponent(id="T-FS", name="Full-suspension Frame", category="frame_type", price=130.0)
+FINISH = BikeComponent(id="F-MATTE", name="Matte", category="frame_finish", price=30.0)
+WHEELS = BikeComponent(id="W-MTN", name="Mountain Wheels", category="wheels", price=90.0)
+CHAIN = BikeComponent(id="CH-8S", name="8-speed Chain", category="chain", price=67.0)
+
+BIKE = [FRAME, FINISH, WHEELS, CHAIN]
+
+
+def rule(rule_id, selectors, effect_type, value, target_category=None, target_id=None, **extra):
+    effect = {"type": effect_type, "value": value}
+    if target_category:
+        effect["target_category"] = target_category
+    if target_id:
+        effect["target_id"] = target_id
+    return {"rule_id": rule_id, "selectors": selectors, "effect": effect, **extra}
+
+
+class TestPricingRuleApplicator(unittest.TestCase):
+
+    def test_selectors_must_match(self):
+        applicator = PricingRuleApplicator([
+            rule("P001", [{"category": "frame_type", "id": "T-DIAMOND"}], "FIXED_PRICE", 50.0, "frame_finish", "F-MATTE")
+        ])
+        self.assertEqual(applicator.apply_rules(BIKE), 317.0)
+
+    def test_percent_and_amount_off(self):
+        applicator = PricingRuleApplicator([
+            rule("P001", [{"category": "frame_type", "id": "T-FS"}], "PERCENT_OFF", 10, "wheels"),
+            rule("P002", [{"category": "frame_type", "id": "T-FS"}], "AMOUNT_OFF", 100, "chain"),
+        ])
+        final_prices, combo_adjustment = applicator.price_breakdown(BIKE)
+
+        self.assertAlmostEqual(final_prices["wheels"], 81.0)
+        self.assertEqual(final_prices["chain"], 0.0)
+        self.assertEqual(combo_adjustment, 0.0)
+        self.assertEqual(applicator.price_selection({c.category: c for c in BIKE}), applicator.apply_rules(BIKE))
+
+    def test_fixed_price_runs_before_discounts_regardless_of_file_order(self):
+        applicator = PricingRuleApplicator([
+            rule("P001", [], "PERCENT_OFF", 50, "frame_finish"),
+            rule("P002", [{"category": "frame_type", "id": "T-FS"}], "FIXED_PRICE", 50.0, "frame_finish", "F-MATTE"),
+        ])
+        self.assertEqual(applicator.price_breakdown(BIKE)[0]["frame_finish"], 25.0)
+
+    def test_explicit_priority_overrides_default_order(self):
+        applicator = PricingRuleApplicator([
+            rule("P001", [], "PERCENT_OFF", 50, "frame_finish", priority=0),
+            rule("P002", [], "FIXED_PRICE", 50.0, "frame_finish"),
+        ])
+        self.assertEqual(applicator.price_breakdown(BIKE)[0]["frame_finish"], 50.0)
+
+    def test_combo_effects_need_every_selector(self):
+        combo = [{"category": "frame_type", "id": "T-FS"}, {"category": "wheels", "id": "W-MTN"}]
+        applicator = PricingRuleApplicator([
+            rule("P001", combo, "COMBO_PRICE", 200.0),
+            rule("P002", [{"category": "frame_type", "id": "T-FS"}, {"category": "wheels", "id": "W-ROAD"}], "COMBO_PRICE", 1.0),
+        ])
+        self.assertEqual(applicator.apply_rules(BIKE), 200.0 + 30.0 + 67.0)
+
+        applicator = PricingRuleApplicator([rule("P003", combo, "AMOUNT_OFF", 20)])
+        self.assertEqual(applicator.apply_rules(BIKE), 317.0 - 20)
+
+    def test_unsupported_effects_are_skipped(self):
+        applicator = PricingRuleApplicator([rule("P001", [], "BUY_ONE_GET_ONE", 1, "chain")])
+        self.assertEqual(applicator.compiled_rules, [])
+        self.assertEqual(applicator.apply_rules(BIKE), 317.0)
+
+    def test_malformed_priority_skips_only_that_rule(self):
+        applicator = PricingRuleApplicator([
+            rule("P001", [], "AMOUNT_OFF", 7, "chain", priority="first"),
+            rule("P002", [], "AMOUNT_OFF", 10, "chain"),
+        ])
+        self.assertEqual([compiled.rule_id for compiled in applicator.compiled_rules], ["P002"])
+        self.assertEqual(applicator.apply_rules(BIKE), 307.0)
@@ -0,0 +1,140 @@
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from server.services.profiler import RequestProfiler
+from fastapi.testclient import TestClient
+from server.main import app
+from server.controllers import api_configurator
+
+
+def busy_pricing_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.profiler = RequestProfiler(self.tmp_dir, token="secret", interval=0.0005, max_profiles=2, top_n=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def profile(self, path: str = "/price/check"):
+        session = self.profiler.start(path, sys._getframe())
+        busy_pricing_loop(0.05)
+        return self.profiler.stop(session).result(timeout=5)
+
+    def test_only_privileged_or_sampled_requests_are_profiled(self):
+        token = [(b"x-profile", b"secret")]
+
+        self.assertTrue(self.profiler.wants("/price/check", token))
+        self.assertTrue(self.profiler.wants("/catalogue/full", token))
+        self.assertFalse(self.profiler.wants("/price/check", [(b"x-profile", b"wrong")]))
+        self.assertFalse(self.profiler.wants("/price/check", []))
+        self.assertFalse(self.profiler.wants("/metrics", token))
+        self.assertFalse(self.profiler.wants("/catalogue/events", token))
+        self.assertFalse(RequestProfiler(self.tmp_dir).wants("/price/check", [(b"x-profile", b"")]))
+
+        self.profiler.enabled = True
+        self.profiler.sample_rate = 1.0
+        self.assertTrue(self.profiler.wants("/price/check", []))
+
+    def test_profile_writes_collapsed_stacks_and_summary(self):
+        folded = self.profile()
+
+        lines = folded.read_text().splitlines()
+        summary = (self.tmp_dir / folded.name.replace(".folded", ".top.txt")).read_text()
+
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith(f"{__name__}.TestRequestProfiler.profile"))
+        self.assertIn("busy_pricing_loop", stack)
+        self.assertGreater(int(count), 0)
+        self.assertIn("top 5 by self samples:", summary)
+        self.assertIn(f"{__name__}.busy_pricing_loop", summary)
+
+    def test_profiles_are_written_by_the_sampler_thread(self):
+        writers = []
+        write = self.profiler._write
+        self.profiler._write = lambda session, elapsed: writers.append(threading.current_thread().name) or write(session, elapsed)
+
+        self.assertTrue(self.profile().exists())
+        self.assertEqual(writers, ["request-profiler"])
+
+    def test_retention_keeps_the_newest_profiles(self):
+        written = [self.profile() for _ in range(3)]
+
+        self.assertEqual(sorted(self.tmp_dir.glob("*.folded")), written[1:])
+        self.assertEqual(len(list(self.tmp_dir.glob("*.top.txt"))), 2)
+
+    def test_sampler_stops_and_restores_switch_interval(self):
+        switch_interval = sys.getswitchinterval()
+        self.profile()
+
+        deadline = time.monotonic() + 1
+        while self.profiler._sampler is not None and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        self.assertIsNone(self.profiler._sampler)
+        self.assertEqual(sys.getswitchinterval(), switch_interval)
+
+
+class TestProfilingEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = api_configurator.request_profiler
+        self.original = (self.profiler.token, self.profiler.enabled, self.profiler.sample_rate, self.profiler.output_dir)
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.profiler.output_dir = self.tmp_dir
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.profiler.token, self.profiler.enabled, self.profiler.sample_rate, self.profiler.output_dir = self.original
+        shutil.rmtree(self.tmp_dir)
+
+    def test_admin_toggle_requires_the_token(self):
+        self.profiler.token = b""
+        self.assertEqual(self.client.get("/admin/profiling").status_code, 404)
+
+        self.profiler.token = b"secret"
+        self.assertEqual(self.client.get("/admin/profiling", headers={"X-Profile": "wrong"}).status_code, 403)
+
+        response = self.client.post("/admin/profiling", json={"enabled": True, "sample_rate": 0.5}, headers={"X-Profile": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["enabled"], response.json()["sample_rate"]), (True, 0.5))
+        self.assertEqual(self.client.post("/admin/profiling", json={"enabled": True, "sample_rate": 2}, headers={"X-Profile": "secret"}).status_code, 422)
+
+    def test_catalogue_reload_requires_the_token(self):
+        self.profiler.token = b""
+        self.assertEqual(self.client.post("/catalogue/reload").status_code, 404)
+
+        self.profiler.token = b"secret"
+        self.assertEqual(self.client.post("/catalogue/reload").status_code, 403)
+        response = self.client.post("/catalogue/reload", headers={"X-Profile": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("version", response.json())
+
+    def test_privileged_header_profiles_the_request(self):
+        self.profiler.token = b"secret"
+        profiled = self.profiler.profiled
+
+        response = self.client.post(
+            "/price/check",
+            json={"component_ids": ["T-DIAMOND", "F-SHINY", "W-ROAD", "C-BLACK", "CH-SS"], "client_total": 278.0},
+            headers={"X-Profile": "secret"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profiler.profiled, profiled + 1)
+        self.assertEqual(self.profiler.stats()["active"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
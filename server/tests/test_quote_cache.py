@@ -0,0 +1,83 @@
+import dataclasses
+import unittest
+from unittest import mock
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+from server.services.quote_cache import QuoteCache
+
+SELECTION_OK = {"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"}
+SELECTION_NOK = {"frame_type": "T-DIAMOND", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"}
+
+
+class TestQuoteCache(unittest.TestCase):
+
+    def test_key_ignores_selection_order(self):
+        index = CatalogueGateway().category_index
+        reordered = dict(reversed(list(SELECTION_OK.items())))
+        codes = index.encode(SELECTION_OK)
+
+        self.assertEqual(QuoteCache.make_key("v1", codes), QuoteCache.make_key("v1", index.encode(reordered)))
+        self.assertEqual(QuoteCache.make_key("v1", codes), QuoteCache.make_key("v1", index.encode_ids(reversed(list(SELECTION_OK.values())))))
+        self.assertNotEqual(QuoteCache.make_key("v1", codes), QuoteCache.make_key("v2", codes))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QuoteCache(maxsize=2)
+        cache.put("a", "bike-a")
+        cache.put("b", "bike-b")
+        cache.get("a")
+        cache.put("c", "bike-c")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "bike-a")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = QuoteCache(ttl=10)
+        with mock.patch("server.services.quote_cache.time.monotonic", return_value=100.0):
+            cache.put("a", "bike-a")
+        with mock.patch("server.services.quote_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (0, 1, 1))
+
+
+class TestCachedConfigurator(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        gateway = CatalogueGateway()
+        self.cache = QuoteCache()
+        self.service = BikeConfiguratorService(
+            catalogue_gateway=gateway,
+            price_calculator=PriceCalculator(strategy=StandardPricingStrategy()),
+            pricing_rules_app=gateway.pricing_rule_applicator,
+            quote_cache=self.cache,
+        )
+
+    async def test_valid_and_invalid_quotes_are_cached(self):
+        for selection in (SELECTION_OK, SELECTION_NOK):
+            first = await self.service.create_bike_from_selection(selection)
+            second = await self.service.create_bike_from_selection(selection)
+            self.assertIs(first, second)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 2, 2))
+
+    async def test_cached_bikes_cannot_be_mutated(self):
+        bike = await self.service.create_bike_from_selection(SELECTION_NOK)
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            bike.price = 1.0
+        with self.assertRaises(TypeError):
+            bike.components["chain"] = None
+        with self.assertRaises(AttributeError):
+            bike.compatibility_errors.append("later request")
+
+        self.assertEqual(await self.service.create_bike_from_selection(SELECTION_NOK), bike)
+
+    async def test_incomplete_selection_is_not_cached(self):
+        with self.assertRaises(ValueError):
+            await self.service.create_bike_from_selection({"frame_type": "T-FS"})
+        self.assertEqual(self.cache.stats()["size"], 0)
@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from server.benchmarks.synthetic import Scale, StaticCatalogueStore, synthetic_source
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.single_flight import SingleFlight
+
+
+class SlowStore(StaticCatalogueStore):
+    def __init__(self, source):
+        super().__init__(source)
+        self.reads = 0
+
+    def read_sources(self):
+        self.reads += 1
+        time.sleep(0.05)
+        return super().read_sources()
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_threads_share_one_call_and_its_error(self):
+        flight = SingleFlight("test")
+        runs = []
+
+        def compute():
+            runs.append(1)
+            deadline = time.monotonic() + 2
+            while flight.coalesced < 7 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            raise ValueError("boom")
+
+        def call(_):
+            try:
+                flight.do("k", compute)
+            except ValueError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            errors = list(pool.map(call, range(8)))
+
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(flight.do("k", lambda: "ok"), "ok")
+
+
+class TestCoalescedCallers(unittest.TestCase):
+
+    def test_concurrent_cold_start_builds_one_snapshot(self):
+        store = SlowStore(synthetic_source(Scale(skus=50, categories=5, rules=5)))
+        provider = CatalogueProvider(check_interval=3600, store=store)
+        barrier = threading.Barrier(8)
+
+        def get_snapshot(_):
+            barrier.wait()
+            return provider.get_snapshot()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            snapshots = list(pool.map(get_snapshot, range(8)))
+
+        self.assertEqual(store.reads, 1)
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
+
+
+if __name__ == "__main__":
+    unittest.main()
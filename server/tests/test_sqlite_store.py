@@ -0,0 +1,136 @@
+import asyncio
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from server.services.bike_configurator import BikeConfiguratorService
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.catalogue_provider import CatalogueProvider
+from server.services.pricing.price_calculator import PriceCalculator
+from server.services.pricing.price_strategy import StandardPricingStrategy
+from server.services.step_options import StepOptionsService
+from server.services.storage import SqliteCatalogueStore, open_catalogue_store
+from server.services.storage.json_store import DATA_PATH, COMPONENTS_FILE
+from server.services.storage.sqlite_store import ConnectionPool, import_json_catalogue
+
+
+class TestSqliteCatalogueStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.db_path = self.tmp_dir / "catalogue.db"
+        import_json_catalogue(self.db_path)
+        self.store = SqliteCatalogueStore(self.db_path, pool_size=2)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_snapshot_matches_the_json_catalogue(self):
+        from_json = CatalogueGateway()
+        from_sqlite = CatalogueGateway(store=self.store)
+
+        self.assertEqual(from_sqlite.version, from_json.version)
+        self.assertEqual(from_sqlite.components_version, from_json.components_version)
+        self.assertEqual(from_sqlite.rules_raw, from_json.rules_raw)
+        self.assertEqual(from_sqlite.pricing_rules, from_json.pricing_rules)
+        self.assertEqual(from_sqlite.compatibility_constraints, from_json.compatibility_constraints)
+        self.assertEqual(from_sqlite.category_index.layout(), from_json.category_index.layout())
+        # The whole catalogue is only read when something asks for it.
+        self.assertNotIn("components_by_category", from_sqlite.__dict__)
+        self.assertEqual(from_sqlite.components_by_category, from_json.components_by_category)
+
+    def test_requests_are_served_from_indexed_lookups(self):
+        from_json = CatalogueGateway()
+        gateway = CatalogueGateway(store=self.store)
+        ids = ["T-FS", "F-MATTE", "W-MTN", "C-BLACK", "CH-8S", "W-ROAD", "NOPE"]
+
+        codes = gateway.category_index.encode_ids(ids)
+        self.assertEqual(codes, from_json.category_index.encode_ids(ids))
+        self.assertEqual(gateway.category_index.components_of(codes), from_json.category_index.components_of(codes))
+        self.assertEqual(asyncio.run(gateway.resolve_selection(ids)), asyncio.run(from_json.resolve_selection(ids)))
+        self.assertEqual(list(asyncio.run(gateway.decode_selection(codes)).values()), list(from_json.category_index.components_of(codes).values()))
+        self.assertIsNone(asyncio.run(gateway.get_component_by_id("NOPE")))
+        self.assertEqual([c.id for c in asyncio.run(gateway.get_components_by_category("frame_type"))], ["T-FS", "T-DIAMOND", "T-STEP"])
+        self.assertEqual(asyncio.run(gateway.get_all_components_payload()).body, from_json._payloads["components"].body)
+        self.assertEqual(asyncio.run(gateway.get_components_by_category_payload("wheels")).body, from_json._payloads["category:wheels"].body)
+
+        service = BikeConfiguratorService(gateway, PriceCalculator(StandardPricingStrategy()), gateway.pricing_rule_applicator)
+        bike = asyncio.run(service.create_bike_from_selection({"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"}))
+        options = StepOptionsService(gateway).next_options({"frame_type": "T-FS"})
+        self.assertEqual((bike.is_valid, bike.price), (True, 362.0))
+        self.assertEqual(options, StepOptionsService(from_json).next_options({"frame_type": "T-FS"}))
+        self.assertNotIn("components_by_id", gateway.__dict__)
+
+    def test_async_reads_leave_the_event_loop_thread(self):
+        gateway = CatalogueGateway(store=self.store)
+        service = BikeConfiguratorService(gateway, PriceCalculator(StandardPricingStrategy()), gateway.pricing_rule_applicator)
+        lookup = gateway.lookup
+        reading_threads = set()
+
+        def recording(method):
+            def read(*args):
+                reading_threads.add(threading.get_ident())
+                return method(*args)
+            return read
+
+        for name in ("slots", "components_at", "components_by_ids", "components_in_category"):
+            setattr(lookup, name, recording(getattr(lookup, name)))
+
+        async def handle_requests():
+            await gateway.get_component_by_id("T-FS")
+            await gateway.get_components_by_category("wheels")
+            await gateway.resolve_selection(["T-FS", "W-MTN"])
+            await service.create_bike_from_selection({"frame_type": "T-FS", "frame_finish": "F-MATTE", "wheels": "W-MTN", "rim_color": "C-BLACK", "chain": "CH-8S"})
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(handle_requests())
+        self.assertTrue(reading_threads)
+        self.assertNotIn(loop_thread, reading_threads)
+
+    def test_pool_is_shared_by_threads(self):
+        _, lookup = self.store.open_revision()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: len(lookup.components_by_ids(["T-FS", "C-RED"])), range(64)))
+
+        self.assertEqual(results, [2] * 64)
+        self.assertLessEqual(self.store.pool._created, 2)
+
+    def test_connections_checked_out_across_a_close_are_not_pooled_again(self):
+        pool = ConnectionPool(self.db_path, size=1)
+        with pool.connection() as connection:
+            pool.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+        self.assertEqual(pool._idle.qsize(), 0)
+
+        with pool.connection():
+            pass
+        self.assertEqual((pool._created, pool._idle.qsize()), (1, 1))
+
+    def test_provider_picks_up_a_new_import(self):
+        provider = CatalogueProvider(check_interval=0, store=self.store)
+        first = provider.get_snapshot()
+
+        data_dir = self.tmp_dir / "data"
+        shutil.copytree(DATA_PATH, data_dir)
+        components = json.loads((data_dir / COMPONENTS_FILE).read_text())
+        components[0]["price"] = 999.0
+        (data_dir / COMPONENTS_FILE).write_text(json.dumps(components))
+        import_json_catalogue(self.db_path, data_dir)
+
+        second = provider.get_snapshot()
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(asyncio.run(second.get_component_by_id("T-FS")).price, 999.0)
+        # The old snapshot still reads the revision it was built from.
+        self.assertEqual(asyncio.run(first.get_component_by_id("T-FS")).price, 130.0)
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            open_catalogue_store("postgres")
+        with self.assertRaises(ValueError):
+            open_catalogue_store("sqlite")
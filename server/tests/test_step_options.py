@@ -0,0 +1,65 @@
+import unittest
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.step_options import StepOptionsService
+from fastapi.testclient import TestClient
+from server.main import app
+
+
+class TestStepOptionsService(unittest.TestCase):
+
+    def setUp(self):
+        self.gateway = CatalogueGateway()
+        self.service = StepOptionsService(self.gateway)
+
+    def _ids(self, result):
+        return [option["id"] for option in result["options"]]
+
+    def test_first_step_lists_every_frame(self):
+        result = self.service.next_options({})
+        self.assertEqual(result["category"], "frame_type")
+        self.assertEqual(self._ids(result), ["T-FS", "T-DIAMOND", "T-STEP"])
+
+    def test_options_are_filtered_in_both_directions(self):
+        # R001 forward: mountain wheels only allow the full-suspension frame.
+        result = self.service.next_options({"wheels": "W-MTN"}, category="frame_type")
+        self.assertEqual(self._ids(result), ["T-FS"])
+
+        # R001 backward: with a diamond frame, mountain wheels are not offered.
+        result = self.service.next_options({"frame_type": "T-DIAMOND", "frame_finish": "F-SHINY"})
+        self.assertEqual(result["category"], "wheels")
+        self.assertEqual(self._ids(result), ["W-ROAD", "W-FAT"])
+
+        # R002: fat wheels exclude red rims.
+        result = self.service.next_options({"frame_type": "T-FS", "frame_finish": "F-SHINY", "wheels": "W-FAT"})
+        self.assertEqual(self._ids(result), ["C-BLACK", "C-BLUE"])
+
+    def test_options_carry_rule_adjusted_prices(self):
+        result = self.service.next_options({"frame_type": "T-FS"})
+        matte = next(option for option in result["options"] if option["id"] == "F-MATTE")
+
+        self.assertEqual((matte["list_price"], matte["price"], matte["running_total"]), (30.0, 50.0, 180.0))
+
+    def test_invalid_prefix_reports_errors(self):
+        result = self.service.next_options({"frame_type": "T-DIAMOND", "wheels": "W-MTN"})
+
+        self.assertFalse(result["valid"])
+        self.assertEqual(result["options"], [])
+        self.assertTrue(any("(R001):" in error for error in result["errors"]))
+
+    def test_prefix_states_and_payloads_are_reused(self):
+        first = self.service.next_options_payload({"frame_type": "T-FS", "frame_finish": "F-MATTE"})
+        second = self.service.next_options_payload({"frame_finish": "F-MATTE", "frame_type": "T-FS"})
+
+        self.assertIs(first, second)
+        self.assertIn((("frame_type", "T-FS"),), self.service._states)
+
+
+class TestNextOptionsApi(unittest.TestCase):
+
+    def test_next_options_endpoint(self):
+        client = TestClient(app)
+        response = client.get("/catalogue/next_options", params=[("component_ids", "T-DIAMOND"), ("component_ids", "F-SHINY")])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([option["id"] for option in response.json()["options"]], ["W-ROAD", "W-FAT"])
+        self.assertEqual(client.get("/catalogue/next_options", params={"category": "bells"}).status_code, 404)
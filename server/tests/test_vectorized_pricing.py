@@ -0,0 +1,180 @@
+import csv
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from server.benchmarks.synthetic import SCALES, StaticCatalogueStore, random_selections, synthetic_source
+from server.jobs.reprice_orders import reprice_orders
+from server.services.catalogue_gateway import CatalogueGateway
+from server.services.configuration_enumerator import ConfigurationEnumerator
+from server.services.pricing.pricing_rule_applicator import PricingRuleApplicator
+from server.services.pricing.vectorized_pricing import SelectionMatrixEncoder, VectorizedPricer, builtin_sum, np
+from server.services.storage.json_store import DATA_PATH, PRICING_RULES_FILE
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorizedPricing(unittest.TestCase):
+
+    def assert_matches_apply_rules(self, gateway, selections, applicator=None):
+        applicator = applicator or gateway.pricing_rule_applicator
+        encoder = SelectionMatrixEncoder(gateway.components_by_category)
+        codes = encoder.encode(selections)
+        totals = VectorizedPricer(encoder, applicator).price(codes).totals.tolist()
+
+        for selection, total in zip(selections, totals):
+            components = [gateway.components_by_id[selection[category]] for category in encoder.categories if category in selection]
+            self.assertEqual(total, applicator.apply_rules(components), selection)
+
+    def test_matches_apply_rules_on_every_valid_configuration(self):
+        gateway = CatalogueGateway()
+        selections = [selection for selection, _ in ConfigurationEnumerator(gateway).iter_valid()]
+        self.assert_matches_apply_rules(gateway, selections)
+
+    def test_matches_apply_rules_on_synthetic_rules(self):
+        gateway = CatalogueGateway(store=StaticCatalogueStore(synthetic_source(SCALES[2])))
+        selections = random_selections(gateway.components_by_category, 2000)
+
+        # Drop a few categories so unselected components and combos over
+        # partial bikes are covered too.
+        rng = random.Random(3)
+        for selection in selections[::3]:
+            for category in rng.sample(sorted(selection), 3):
+                del selection[category]
+
+        self.assert_matches_apply_rules(gateway, selections)
+
+    def test_matches_apply_rules_with_int_prices(self):
+        source = synthetic_source(SCALES[1])
+        for component in source.components[::2]:
+            component["price"] = int(component["price"])
+        source.pricing_rules.append({"rule_id": "ALL", "selectors": [], "effect": {"type": "COMBO_PRICE", "value": 999}})
+        gateway = CatalogueGateway(store=StaticCatalogueStore(source))
+
+        self.assert_matches_apply_rules(gateway, random_selections(gateway.components_by_category, 2000))
+
+    def test_rule_impacts(self):
+        gateway = CatalogueGateway()
+        encoder = SelectionMatrixEncoder(gateway.components_by_category)
+        selections = [selection for selection, _ in ConfigurationEnumerator(gateway).iter_valid()]
+        result = VectorizedPricer(encoder, gateway.pricing_rule_applicator).price(encoder.encode(selections))
+
+        matching = [s for s in selections if s["frame_type"] == "T-FS" and s["frame_finish"] == "F-MATTE"]
+        impact = result.impacts["P001"]
+        self.assertEqual(impact.matched_orders, len(matching))
+        self.assertEqual(impact.revenue_effect, sum(50.0 - gateway.components_by_id["F-MATTE"].price for _ in matching))
+
+    def test_builtin_sum_matches_sum(self):
+        # Inputs where plain, compensated and int-first additions round
+        # differently; None is a category left unselected.
+        rows = [
+            [1e16, 1.0, -1e16, 1.0],
+            [0.1] * 10,
+            [3, 0.1, 0.2, 0.3, 1e15, -1e15],
+            [1.0, 1e100, 1.0, -1e100],
+            [7, 2, 0.1, 5, 0.7, 1, 1e-9],
+            [0.1, None, 0.2, None, 0.3, 1e16, -1e16],
+            [2**52, 1, 0.5, 0.5, 0.25],
+            [None, None],
+            [123.45, 67.89, 10.01, 999.99, 0.01],
+        ]
+        width = max(len(row) for row in rows)
+        padded = [row + [None] * (width - len(row)) for row in rows]
+        prices = np.array([[0.0 if value is None else float(value) for value in row] for row in padded])
+        is_float = np.array([[isinstance(value, float) for value in row] for row in padded])
+        present = np.array([[value is not None for value in row] for row in padded])
+
+        totals = builtin_sum(prices, is_float, present, range(width)).tolist()
+
+        for row, total in zip(rows, totals):
+            expected = sum(value for value in row if value is not None)
+            self.assertEqual(total, expected, row)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestRepriceOrdersJob(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.gateway = CatalogueGateway()
+        self.selections = [selection for selection, _ in ConfigurationEnumerator(self.gateway).iter_valid()]
+
+        self.orders_path = self.tmp_dir / "orders.csv"
+        categories = list(self.gateway.components_by_category)
+        with open(self.orders_path, "w", newline="") as orders_file:
+            writer = csv.DictWriter(orders_file, fieldnames=["order_id"] + categories)
+            writer.writeheader()
+            for number, selection in enumerate(self.selections):
+                writer.writerow({"order_id": number, **selection})
+            writer.writerow({"order_id": "gone", **self.selections[0], "chain": "CH-DISCONTINUED"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_report_deltas(self):
+        current_rules = json.loads((DATA_PATH / PRICING_RULES_FILE).read_text())
+        candidate_rules = current_rules + [{
+            "rule_id": "P900",
+            "selectors": [{"category": "wheels", "id": "W-ROAD"}],
+            "effect": {"target_category": "wheels", "type": "PERCENT_OFF", "value": 10},
+        }]
+
+        report = reprice_orders(self.orders_path, candidate_rules, chunk_size=7, validate_sample=3, seed=1)
+
+        applicator = PricingRuleApplicator(candidate_rules)
+        current = [self.gateway.pricing_rule_applicator.apply_rules([self.gateway.components_by_id[cid] for cid in s.values()]) for s in self.selections]
+        candidate = [applicator.apply_rules([self.gateway.components_by_id[cid] for cid in s.values()]) for s in self.selections]
+        road_orders = [s for s in self.selections if s["wheels"] == "W-ROAD"]
+
+        self.assertEqual(report["orders"], len(self.selections))
+        self.assertEqual(report["skipped_orders"], 1)
+        self.assertEqual(report["orders_repriced"], len(road_orders))
+        self.assertAlmostEqual(report["current_revenue"], sum(current), places=6)
+        self.assertAlmostEqual(report["revenue_delta"], sum(candidate) - sum(current), places=6)
+        self.assertEqual(report["rules"]["P001"]["matched_orders_delta"], 0)
+        self.assertEqual(report["rules"]["P900"]["current"]["matched_orders"], 0)
+        self.assertEqual(report["rules"]["P900"]["candidate"]["matched_orders"], len(road_orders))
+        self.assertAlmostEqual(report["rules"]["P900"]["revenue_effect_delta"], sum(candidate) - sum(current), places=6)
+        self.assertGreater(report["validation"]["checked"], 0)
+        self.assertEqual(report["validation"]["mismatched_orders"], [])
+
+    def test_mismatches_are_reported_by_row_number(self):
+        orders_path = self.tmp_dir / "mixed.csv"
+        categories = list(self.gateway.components_by_category)
+        with open(orders_path, "w", newline="") as orders_file:
+            writer = csv.DictWriter(orders_file, fieldnames=categories)
+            writer.writeheader()
+            writer.writerow({**self.selections[0], "chain": "CH-DISCONTINUED"})
+            for selection in self.selections[:5]:
+                writer.writerow(selection)
+
+        # Every sampled order disagrees, so every priced row is reported.
+        with mock.patch.object(VectorizedPricer, "validate", lambda pricer, codes, applicator, sample: list(sample)):
+            report = reprice_orders(orders_path, [], chunk_size=2, validate_sample=10)
+
+        self.assertEqual(report["skipped_orders"], 1)
+        self.assertEqual(report["validation"]["mismatched_orders"], [2, 3, 4, 5, 6])
+
+    def test_parquet_orders(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet as pq
+        except ImportError:
+            with self.assertRaises(ValueError):
+                reprice_orders(self.tmp_dir / "orders.parquet", [])
+            return
+
+        with open(self.orders_path, newline="") as orders_file:
+            rows = list(csv.DictReader(orders_file))
+        parquet_path = self.tmp_dir / "orders.parquet"
+        pq.write_table(pyarrow.Table.from_pylist(rows), parquet_path)
+
+        from_parquet = reprice_orders(parquet_path, [], chunk_size=7, validate_sample=3, seed=1)
+        from_csv = reprice_orders(self.orders_path, [], chunk_size=7, validate_sample=3, seed=1)
+        self.assertEqual(from_parquet, from_csv)
+
+
+if __name__ == "__main__":
+    unittest.main()